@@ -0,0 +1,1342 @@
+#!/usr/bin/env python3
+# bench.py — quick timing harness for the sorter / web helpers
+#   python bench.py load --rows 100000
+#   python bench.py ocr --dir ../captures
+#   python bench.py web --seconds 5 --clients 8
+#   python bench.py sql --rows 500000
+#   python bench.py piles --rows 1000000
+#   python bench.py micro
+#   python bench.py snapshot --rows 1000000
+#   python bench.py catalog --rows 1000000
+#   python bench.py asgi --delay 0.2 --clients 32
+#   python bench.py http
+import argparse
+import contextlib
+import gc
+import glob
+import io
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import timeit
+import tracemalloc
+import uuid
+
+
+def _timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, time.perf_counter() - t0
+
+
+def _synthetic_catalog(rows: int, pileNum: int = 40, vBins: int = 5120) -> dict:
+    types = ["Instant", "Sorcery", "Creature — Goblin", "Artifact", "Enchantment", "Legendary Creature — Elf"]
+    colors = ["W", "U", "B", "R", "G", "C", "UR", "BG", "WU"]
+    cards = []
+    for i in range(rows):
+        cards.append({
+            "name": f"Card {i}",
+            "setCode": "tst",
+            "collectNum": i % 400,
+            "colors": colors[i % len(colors)],
+            "mValue": i % 8,
+            "type": types[i % len(types)],
+            "oracleID": str(uuid.UUID(int=i + 1)),
+            "amount": 1 + i % 4,
+        })
+    return {"pileNum": pileNum, "vBins": vBins, "cards": cards, "landCards": []}
+
+
+# -------------------- sort.py: load() --------------------
+def bench_load(args):
+    import sort
+
+    print(f"{'rows':>10} {'seconds':>10} {'us/row':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = os.path.join(tmp, f"catalog_{rows}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(_synthetic_catalog(rows), f)
+            with contextlib.redirect_stdout(io.StringIO()):
+                _, dt = _timed(sort.load, path, 40, 5120)
+            print(f"{rows:>10} {dt:>10.3f} {dt / rows * 1e6:>10.2f}")
+
+
+# -------------------- sort.py: OCR paths --------------------
+def bench_ocr(args):
+    import cv2
+    import easyocr
+    import sort
+
+    paths = sorted(glob.glob(os.path.join(args.dir, "full_*.png")))
+    if not paths:
+        raise SystemExit(f"no full_*.png frames in {args.dir}")
+    reader = easyocr.Reader(["en"])
+    full = sort.OCRCamera(0, title_mode=False)
+    title = sort.OCRCamera(0, title_mode=True, title_height=args.title_height)
+    full.reader = title.reader = reader
+
+    print(f"{'frame':<28} {'locate ms':>9} {'full ms':>9} {'title ms':>9}  full text | title text")
+    tot_full = tot_title = 0.0
+    for p in paths:
+        frame = cv2.imread(p)
+        _, dt_loc = _timed(sort.locate_title_band, frame)
+        (t_full, _, _), dt_full = _timed(full.read_text, frame)
+        (t_title, _, _), dt_title = _timed(title.read_text, frame)
+        tot_full += dt_full
+        tot_title += dt_title
+        print(f"{os.path.basename(p):<28} {dt_loc * 1e3:>9.1f} {dt_full * 1e3:>9.1f} {dt_title * 1e3:>9.1f}"
+              f"  {t_full!r} | {t_title!r}")
+    print(f"\ntotal: full {tot_full:.2f}s, title {tot_title:.2f}s ({tot_full / max(tot_title, 1e-9):.1f}x)")
+
+
+# -------------------- magisort_web.py: load test --------------------
+def _seed_db(w, rows: int):
+    colors = ["W", "U", "B", "R", "G", "C", "RU", "BG"]
+    types = ["Instant", "Sorcery", "Creature — Elf", "Artifact", "Legendary Creature — Elf Druid"]
+    w.init_db_if_needed()
+    conn = w.connect_db()
+    piles, _, _ = w.read_config(conn)
+    with conn:
+        conn.executemany(
+            "INSERT INTO cards (name, set_code, collector_number, scryfall_id, colors, mana_value, type_line, "
+            "pile_index, image_url, added_at) VALUES (?,?,?,?,?,?,?,?,?,?)",
+            ((f"Card {i}", "tst", str(i % 400), str(uuid.UUID(int=i + 1)), colors[i % len(colors)], i % 8,
+              types[i % len(types)], i % piles, None, "2025-01-01T00:00:00Z") for i in range(rows))
+        )
+    conn.close()
+    return piles
+
+
+def _open_fds() -> int:
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return -1
+
+
+def _hammer(base: str, paths: list, seconds: float, clients: int):
+    import requests
+
+    done = [0] * clients
+    errors = [0] * clients
+    stop = time.perf_counter() + seconds
+
+    def worker(k):
+        s = requests.Session()
+        rnd = random.Random(k)
+        while time.perf_counter() < stop:
+            r = s.get(base + rnd.choice(paths))
+            if r.status_code == 200:
+                done[k] += 1
+            else:
+                errors[k] += 1
+
+    threads = [threading.Thread(target=worker, args=(k,)) for k in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sum(done), sum(errors)
+
+
+def bench_web(args):
+    import logging
+    from werkzeug.serving import make_server
+    import magisort_web as w
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        w.DB_PATH = os.path.join(tmp, "bench.db")
+        w.CACHE_PATH = None
+        piles = _seed_db(w, args.rows)
+        paths = [f"/api/list?pile={i}" for i in range(piles)] + ["/api/stats", "/api/preview/1"]
+
+        srv = make_server("127.0.0.1", 0, w.app, threaded=True)
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{srv.server_port}"
+
+        print(f"{'pool':>6} {'req/s':>10} {'errors':>7} {'fds before':>11} {'fds after':>10} {'conns opened':>13}")
+        for size in (0, w.DB_POOL_SIZE):
+            w.db_pool.close_all()
+            w.db_pool = w.ConnectionPool(size)
+            fds0 = _open_fds()
+            n, err = _hammer(base, paths, args.seconds, args.clients)
+            print(f"{size:>6} {n / args.seconds:>10.0f} {err:>7} {fds0:>11} {_open_fds():>10} {w.db_pool.created:>13}")
+        srv.shutdown()
+        w.db_pool.close_all()
+
+
+# -------------------- magisort_web.py: indexes --------------------
+# query -> index EXPLAIN QUERY PLAN must mention once INDEX_SQL is applied
+PLAN_EXPECT = [
+    ("SELECT id, name FROM cards WHERE pile_index = 3 ORDER BY name COLLATE NOCASE", "idx_cards_pile_name"),
+    ("SELECT id, name FROM cards WHERE pile_index = 3 AND name >= 'm' COLLATE NOCASE "
+     "AND (name > 'm' COLLATE NOCASE OR id > 10) ORDER BY name COLLATE NOCASE, id LIMIT 200",
+     "idx_cards_pile_name (pile_index=? AND name>?)"),
+    ("SELECT pile_index, colors, SUM(qty) FROM cards GROUP BY pile_index, colors", "COVERING INDEX idx_cards_pile_colors_qty"),
+    ("SELECT id FROM cards WHERE scryfall_id = 'x'", "idx_cards_printing"),
+    ("SELECT id FROM cards WHERE colors IN ('U', 'RU') AND mana_value <= 2", "idx_cards_colors_mv"),
+    ("SELECT id FROM cards WHERE set_code = 'tst'", "idx_cards_set"),
+    ("SELECT id FROM cards WHERE id IN (SELECT rowid FROM cards_types WHERE cards_types MATCH '\"elf\"')",
+     "INTEGER PRIMARY KEY"),
+]
+
+# (query string, predicate over a seeded row) pairs checked against /api/search
+SEARCH_CASES = [
+    ("colors=U&type=instant&mv_max=2", lambda r: "U" in r["colors"] and "Instant" in r["type_line"] and r["mana_value"] <= 2),
+    ("colors=C", lambda r: r["colors"] == "C"),
+    ("type=creature,elf&mv_min=3", lambda r: "Elf" in r["type_line"] and r["mana_value"] >= 3),
+    ("colors=RU&set=TST", lambda r: r["colors"] == "RU"),
+]
+
+
+def _plan(conn, sql: str) -> str:
+    return " | ".join(r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sql))
+
+
+def bench_sql(args):
+    import magisort_web as w
+
+    with tempfile.TemporaryDirectory() as tmp:
+        w.DB_PATH = os.path.join(tmp, "bench.db")
+        w.CACHE_PATH = None
+        _, dt = _timed(_seed_db, w, args.rows)
+        print(f"seeded {args.rows} rows in {dt:.1f}s")
+        client = w.app.test_client()
+        conn = w.connect_db()
+
+        # a cursor ~90% of the way through pile 0, to show deep pages cost the same as the first
+        deep = conn.execute("SELECT name, id FROM cards WHERE pile_index = 0 ORDER BY name COLLATE NOCASE, id "
+                            "LIMIT 1 OFFSET ?", (int(args.rows / w.DEFAULT_PILES * 0.9),)).fetchone()
+        deep_cursor = w.encode_cursor(deep["name"], deep["id"])
+
+        def run(label):
+            _, dt_first = _timed(lambda: [client.get(f"/api/list?pile={i}") for i in range(args.piles)])
+            _, dt_deep = _timed(client.get, f"/api/list?pile=0&cursor={deep_cursor}")
+            _, dt_full = _timed(lambda: client.get("/api/list?pile=0&format=ndjson").data)
+            _, dt_stats = _timed(w.compute_stats, conn)
+            print(f"{label:<10} first page {dt_first / args.piles * 1e3:>7.1f} ms   deep page {dt_deep * 1e3:>7.1f} ms"
+                  f"   ndjson pile {dt_full * 1e3:>7.1f} ms   stats {dt_stats * 1e3:>7.1f} ms")
+
+        for name in ("idx_cards_pile_name", "idx_cards_pile_colors_qty", "idx_cards_printing"):
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+        run("no index")
+        _, dt = _timed(conn.executescript, w.INDEX_SQL)
+        print(f"indexes built in {dt:.1f}s")
+        conn.execute("ANALYZE")
+        run("indexed")
+
+        for sql, idx in PLAN_EXPECT:
+            plan = _plan(conn, sql)
+            print(f"  {plan}")
+            assert idx in plan, f"{idx} not used: {plan}"
+
+        rows = conn.execute("SELECT id, colors, mana_value, type_line, pile_index, qty FROM cards").fetchall()
+        for query, pred in SEARCH_CASES:
+            want = [r for r in rows if pred(r)]
+            (resp, dt) = _timed(client.get, f"/api/search?{query}&limit=5")
+            data = resp.get_json()
+            piles = {}
+            for r in want:
+                piles.setdefault(str(r["pile_index"]), 0)
+                piles[str(r["pile_index"])] += r["qty"]
+            assert data["total"] == len(want), (query, data["total"], len(want))
+            assert {p: v["copies"] for p, v in data["piles"].items()} == piles, query
+            print(f"  /api/search?{query:<32} {len(want):>8} matches {dt * 1e3:>7.1f} ms")
+        conn.close()
+
+
+# -------------------- batch pile assignment --------------------
+def _random_keys(rnd: random.Random, n: int):
+    """Card keys with the awkward cases mixed in: split names, punctuation, None/fractional MV, list colors."""
+    words = ["Fire", "Ice", "Lightning", "Bolt", "Ajani's", "Æther", "Shakedown", "Heavy", "Jötun", "Grunt"]
+    types = ["Instant", "Sorcery", "Creature — Goblin", "Legendary Creature — Elf Druid", "Artifact", ""]
+    names, mvs, colors, type_lines, oracles = [], [], [], [], []
+    for _ in range(n):
+        name = " ".join(rnd.choice(words) for _ in range(rnd.randint(1, 3)))
+        if rnd.random() < 0.05:
+            name += " // " + rnd.choice(words)
+        names.append(name)
+        mvs.append(rnd.choice([None, 0, 1, 2.0, 2.5, 3, 7, 16]))
+        c = rnd.sample("WUBRG", rnd.randint(0, 3))
+        colors.append(c if rnd.random() < 0.5 else "".join(c))
+        type_lines.append(rnd.choice(types))
+        oracles.append(str(uuid.UUID(int=rnd.getrandbits(128))).upper() if rnd.random() < 0.1
+                       else str(uuid.UUID(int=rnd.getrandbits(128))))
+    return names, mvs, colors, type_lines, oracles
+
+
+def bench_piles(args):
+    import magisort_web as w
+    import sort
+
+    # equivalence: batch == scalar for every card, across several configs
+    rnd = random.Random(args.seed)
+    for trial in range(args.trials):
+        K, vbins, salt = rnd.randint(1, 64), rnd.choice([64, 1024, 5120]), f"salt-{trial}"
+        names, mvs, colors, type_lines, oracles = _random_keys(rnd, 2000)
+        batch = w.compute_vbins(names, mvs, colors, type_lines, virtual_bins=vbins, salt=salt) % K
+        scalar = [w.compute_pile_index(name=n, mana_value=m, colors=c, type_line=t, K=K, virtual_bins=vbins, salt=salt)
+                  for n, m, c, t in zip(names, mvs, colors, type_lines)]
+        assert batch.tolist() == scalar, f"compute_vbins differs (trial {trial})"
+        batch = sort.pile_indices_oracle(oracles, K, vbins)
+        assert batch.tolist() == [sort.pile_index_oracle(o, K, vbins) for o in oracles], \
+            f"pile_indices_oracle differs (trial {trial})"
+    print(f"equivalence: {args.trials} trials x 2000 cards OK")
+
+    # throughput on a realistic shape: ~30k distinct names, few distinct types/colors/MVs
+    n = args.rows
+    names, mvs, colors, type_lines, _ = _random_keys(random.Random(1), 30_000)
+    idx = [i % 30_000 for i in range(n)]
+    names, mvs = [names[i] for i in idx], [mvs[i] for i in idx]
+    colors, type_lines = ["".join(colors[i]) for i in idx], [type_lines[i] for i in idx]
+    oracles = [str(uuid.UUID(int=i + 1)) for i in range(n)]
+    kw = dict(K=w.DEFAULT_PILES, virtual_bins=w.DEFAULT_VBINS, salt=w.DEFAULT_SALT)
+
+    sample = min(n, 100_000)
+    _, dt = _timed(lambda: [w.compute_pile_index(name=names[i], mana_value=mvs[i], colors=colors[i],
+                                                 type_line=type_lines[i], **kw) for i in range(sample)])
+    scalar_web = dt * n / sample
+    _, batch_web = _timed(lambda: w.compute_vbins(names, mvs, colors, type_lines, virtual_bins=kw["virtual_bins"],
+                                                  salt=kw["salt"]) % kw["K"])
+    _, dt = _timed(lambda: [sort.pile_index_oracle(o, 40, 5120) for o in oracles[:sample]])
+    scalar_oracle = dt * n / sample
+    _, batch_oracle = _timed(sort.pile_indices_oracle, oracles, 40, 5120)
+
+    print(f"{n} cards (scalar extrapolated from {sample})")
+    print(f"  compute_pile_index   scalar {scalar_web:6.2f}s   batch {batch_web:6.2f}s   ({scalar_web / batch_web:.1f}x)")
+    print(f"  pile_index_oracle    scalar {scalar_oracle:6.2f}s   batch {batch_oracle:6.2f}s   "
+          f"({scalar_oracle / batch_oracle:.1f}x)")
+
+
+# -------------------- micro-benchmarks: hot lookup path --------------------
+def _ns(fn, args_list, repeat: int = 5) -> float:
+    """Best-of-`repeat` ns per call of fn over args_list."""
+    t = min(timeit.repeat(lambda: [fn(*a) for a in args_list], number=1, repeat=repeat))
+    return t / len(args_list) * 1e9
+
+
+def _row(label: str, raw, miss: float, hit: float):
+    raw = f"{raw:>9.0f}" if raw is not None else f"{'-':>9}"
+    print(f"  {label:<34} {raw} {miss:>9.0f} {hit:>9.0f}")
+
+
+def _memo_case(label, fn, distinct):
+    """fn uncached (__wrapped__), memoized on all-distinct input (miss), memoized on repeated input (hit)."""
+    raw = _ns(fn.__wrapped__, distinct)
+    fn.cache_clear()
+    miss = _ns(fn, distinct, repeat=1)
+    hit = _ns(fn, [distinct[0]] * len(distinct))
+    _row(label, raw, miss, hit)
+
+
+def bench_micro(args):
+    import magisort_web as w
+    import sort
+
+    n = args.n
+    names = [(f"Shakedown Heavy {i}",) for i in range(n)]
+    oracles = [str(uuid.UUID(int=i + 1)) for i in range(n)]
+    payloads = [(f"oracle:{o}",) for o in oracles]
+    types = [(f"Legendary Creature — Elf {i}",) for i in range(n)]
+
+    print(f"{'ns/call':<36} {'uncached':>9} {'miss':>9} {'hit':>9}")
+    for mod_name, mod in (("sort", sort), ("magisort_web", w)):
+        _memo_case(f"{mod_name}.norm", mod.norm, names)
+        _memo_case(f"{mod_name}.h32", mod.h32, payloads)
+    _memo_case("sort.is_basic_land", sort.is_basic_land, types)
+
+    # whole pile computations: miss = memos cleared, every card new; hit = same card again
+    kw = dict(K=w.DEFAULT_PILES, virtual_bins=w.DEFAULT_VBINS, salt=w.DEFAULT_SALT)
+    cards = [(f"Card {i}", i % 8, "UR", "Instant") for i in range(n)]
+    pile = lambda nm, mv, c, t: w.compute_pile_index(name=nm, mana_value=mv, colors=c, type_line=t, **kw)
+    for f in (w.norm, w.h32, w._vbin):
+        f.cache_clear()
+    miss = _ns(pile, cards, repeat=1)
+    hit = _ns(pile, [cards[0]] * n)
+    _row("magisort_web.compute_pile_index", None, miss, hit)
+
+    sort.norm.cache_clear()
+    sort.h32.cache_clear()
+    one = lambda o: sort.pile_index_oracle(o, 40, 5120)
+    miss = _ns(one, [(o,) for o in oracles], repeat=1)
+    hit = _ns(one, [(oracles[0],)] * n)
+    _row("sort.pile_index_oracle", None, miss, hit)
+
+    # catalog operations reusing the same card objects (bin and land flag cached on the card)
+    with contextlib.redirect_stdout(io.StringIO()):
+        cat = sort.catalog(40, 5120)
+    objs = [(sort.card(f"Card {i}", "tst", i, "R", 1, "Instant", o, 1),) for i, o in enumerate(oracles)]
+    sort.h32.cache_clear()
+    print(f"\n{'catalog op, ns/call':<36} {'1st pass':>9} {'2nd pass':>9}")
+    for label, op in (("insert", cat.insert), ("retrieve", cat.retrieve), ("remove", cat.remove)):
+        first = _ns(op, objs, repeat=1)
+        again = _ns(op, objs, repeat=1)
+        print(f"  {label:<34} {first:>9.0f} {again:>9.0f}")
+
+
+# -------------------- sort.py: JSON vs. columnar snapshots --------------------
+def _canonical(sort, cat) -> dict:
+    """_serialize_catalog with card lists sorted (pile iteration order doesn't matter) plus each card's pile."""
+    data = sort._serialize_catalog(cat)
+    data["rows"] = sorted(zip(*(values for _, values in sort._catalog_columns(cat).values())))
+    for k in ("cards", "landCards"):
+        data[k].sort(key=lambda d: (d["oracleID"], d["name"]))
+    data["unresolved"] = sorted(json.dumps(d, sort_keys=True) for d in cat.getUnresolved())
+    return data
+
+
+def bench_snapshot(args):
+    import sort
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # round trip: a catalog with lands, unresolved records and a non-default map survives .bin
+        seed = _synthetic_catalog(2000)
+        seed["landCards"] = [{"name": "Island", "setCode": "tst", "collectNum": 1, "colors": "",
+                              "mValue": 0, "type": "Basic Land — Island", "oracleID": "land-1", "amount": 7}]
+        seed["cards"].append({"name": "Nameless", "setCode": "tst", "collectNum": 0, "colors": "R",
+                              "mValue": 1, "type": "Instant", "oracleID": "", "amount": 1})
+        src = os.path.join(tmp, "seed.json")
+        with open(src, "w", encoding="utf-8") as f:
+            json.dump(seed, f)
+        with contextlib.redirect_stdout(io.StringIO()):
+            a = sort.convert_snapshot(src, os.path.join(tmp, "seed.bin"))
+            b = sort.load(os.path.join(tmp, "seed.bin"), 40, 5120, offline=True)
+            grown = sort.load(os.path.join(tmp, "seed.bin"), 41, 5120, offline=True)
+            sort.save(grown, os.path.join(tmp, "grown.bin"))
+            back = sort.load(os.path.join(tmp, "grown.bin"), 41, 5120, offline=True)
+        assert _canonical(sort, a) == _canonical(sort, b), "bin round trip changed the catalog"
+        assert _canonical(sort, grown) == _canonical(sort, back), "bin round trip lost the rebalanced map"
+        print("round trip: identical (lands, unresolved, rebalanced map)")
+
+        src = os.path.join(tmp, "big.json")
+        with open(src, "w", encoding="utf-8") as f:
+            json.dump(_synthetic_catalog(args.rows), f)
+        with contextlib.redirect_stdout(io.StringIO()):
+            cat = sort.load(src, 40, 5120, offline=True)
+
+        print(f"\n{args.rows} rows  {'save s':>8} {'load s':>8} {'MB':>8}")
+        for ext in (".json", ".bin"):
+            path = os.path.join(tmp, "out" + ext)
+            _, ts = _timed(sort.save, cat, path)
+            with contextlib.redirect_stdout(io.StringIO()):
+                _, tl = _timed(sort.load, path, 40, 5120, offline=True)
+            print(f"  {ext:<10} {ts:>8.2f} {tl:>8.2f} {os.path.getsize(path) / 1e6:>8.1f}")
+
+
+# -------------------- sort.py: object vs. columnar catalog --------------------
+def _fresh_catalog(sort, backend):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return backend(40, 5120)
+
+
+def _ops_agree(sort, rnd: random.Random, ops: int):
+    """Same random insert/remove/retrieve/search stream on both backends; every result and the end state match.
+    Copies of one oracle ID come in different printings (set codes), as they do in real collections."""
+    cats = [_fresh_catalog(sort, sort.catalog), _fresh_catalog(sort, sort.colcatalog)]
+    names = [("Island", "Basic Land — Island"), ("Bolt", "Instant"), ("Elf", "Creature — Elf")]
+    sets = ("m10", "2xm", "tst")
+    for _ in range(ops):
+        i = rnd.randrange(300)
+        name, type_ = names[i % 3]
+        op = rnd.choice(("insert", "insert", "remove", "retrieve", "search"))
+        if op == "search":
+            filters = rnd.choice(({}, {"setCode": rnd.choice(sets)}, {"colors": "r"}, {"types": ("elf",)},
+                                  {"mvMin": 2, "mvMax": 4, "setCode": rnd.choice(sets)}))
+            results = [cat.search(**filters) for cat in cats]
+            assert results[0] == results[1], (filters, results)
+            continue
+        c = sort.card(f"{name} {i}", rnd.choice(sets), i, "RG"[i % 2], i % 7, type_, f"o-{i}", rnd.randint(1, 3))
+        results = [getattr(cat, op)(sort.card(c.getName(), c.getSetCode(), c.getCollectNum(), c.getColors(),
+                                              c.getMValue(), c.getType(), c.getOracleID(), c.getAmount()))
+                   for cat in cats]
+        assert results[0] == results[1], (op, c.getName(), results)
+    a, b = (_canonical(sort, cat) for cat in cats)
+    assert a == b, "backends diverged"
+    for p in range(41):
+        assert sorted(cats[0].getPileAt(p).listCards()) == sorted(cats[1].getPileAt(p).listCards())
+
+
+def _retained_bytes(sort, backend, text: str) -> int:
+    """Bytes still allocated once the catalog is built from parsed JSON and the parse is dropped."""
+    gc.collect()
+    tracemalloc.start()
+    records = json.loads(text)["cards"]
+    cat = _fresh_catalog(sort, backend)
+    for d in records:
+        cat.insert(sort._dict_to_card(d, d["oracleID"]))
+    del records
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del cat
+    return size
+
+
+def bench_catalog(args):
+    import sort
+
+    rnd = random.Random(args.seed)
+    for _ in range(args.trials):
+        _ops_agree(sort, rnd, 2000)
+    print(f"{args.trials} random op streams: catalog and colcatalog agree")
+
+    text = json.dumps(_synthetic_catalog(args.rows))
+    print(f"\n{args.rows} cards   {'MB':>8} {'bytes/card':>11}")
+    for backend in (sort.catalog, sort.colcatalog):
+        size = _retained_bytes(sort, backend, text)
+        print(f"  {backend.__name__:<12} {size / 1e6:>8.1f} {size / args.rows:>11.0f}")
+
+
+# -------------------- magisort_asgi.py: slow-Scryfall load test --------------------
+def _stub_scryfall(delay: float):
+    """Local Scryfall stand-in whose every request takes `delay` seconds. -> (server, base url, hits per endpoint).
+    POST /cards/collection answers names starting with "Missing" as not_found, returns the
+    found cards in reverse order and records the largest batch seen as hits["max_batch"]."""
+    from collections import Counter
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, urlparse
+
+    hits = Counter()
+    lock = threading.Lock()
+
+    def fake_card(name: str, set_code: str = "tst", number: str = "1") -> dict:
+        ident = str(uuid.uuid5(uuid.NAMESPACE_URL, f"{name}/{set_code}/{number}"))
+        return {"object": "card", "id": ident, "oracle_id": ident, "name": name, "set": set_code,
+                "collector_number": number, "cmc": 2, "color_identity": ["U"], "type_line": "Instant"}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        wbufsize = 1 << 16      # headers + body in one send; split writes stall keep-alive on delayed ACKs
+
+        def log_message(self, *args):
+            pass
+
+        def reply(self, status: int, obj):
+            body = json.dumps(obj).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            q = {k: v[0] for k, v in parse_qs(url.query).items()}
+            parts = url.path.strip("/").split("/")
+            endpoint = parts[1] if len(parts) == 2 else "setnum"
+            with lock:
+                hits[endpoint] += 1
+            time.sleep(delay)
+            if endpoint == "autocomplete":
+                self.reply(200, {"object": "catalog", "data": [f"{q.get('q', '')} {i}" for i in range(5)]})
+            elif endpoint == "named":
+                self.reply(200, fake_card(q.get("fuzzy") or q.get("exact", "")))
+            elif len(parts) == 3:
+                self.reply(200, fake_card(f"Card {parts[2]}", parts[1], parts[2]))
+            else:
+                self.reply(404, {"object": "error", "details": "Not found"})
+
+        def do_POST(self):
+            idents = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0)))).get("identifiers", [])
+            with lock:
+                hits["collection"] += 1
+                hits["max_batch"] = max(hits["max_batch"], len(idents))
+            time.sleep(delay)
+            if self.path != "/cards/collection" or len(idents) > 75:
+                return self.reply(400, {"object": "error", "details": "At most 75 identifiers"})
+            found, missing = [], []
+            for x in idents:
+                if x.get("name", "").startswith("Missing"):
+                    missing.append(x)
+                elif "name" in x:
+                    found.append(fake_card(x["name"]))
+                else:
+                    found.append(fake_card(f"Card {x['collector_number']}", x["set"], x["collector_number"]))
+            self.reply(200, {"object": "list", "not_found": missing, "data": found[::-1]})
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, f"http://127.0.0.1:{srv.server_address[1]}", hits
+
+
+def _pooled_wsgi_server(app, workers: int):
+    """wsgiref server handing requests to a fixed pool of `workers` threads (a sync deployment)."""
+    from concurrent.futures import ThreadPoolExecutor
+    from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+    class Quiet(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    class Pooled(WSGIServer):
+        request_queue_size = 256
+        pool = ThreadPoolExecutor(max_workers=workers)
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self.work, request, client_address)
+
+        def work(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    srv = Pooled(("127.0.0.1", 0), Quiet)
+    srv.set_app(app)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, f"http://127.0.0.1:{srv.server_port}"
+
+
+def _uvicorn_server(app):
+    import socket
+    import uvicorn
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    srv = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on"))
+    threading.Thread(target=srv.run, daemon=True).start()
+    while not srv.started:
+        time.sleep(0.05)
+    return srv, f"http://127.0.0.1:{port}"
+
+
+def _distinct_lookups(base: str, seconds: float, clients: int, tag: str):
+    """Every request a never-seen prefix (no cache hits, nothing to coalesce). -> (latencies, errors, wall s)."""
+    import requests
+
+    lat, errors = [], [0]
+    t0 = time.perf_counter()
+    stop = t0 + seconds
+
+    def worker(k):
+        s = requests.Session()
+        i = 0
+        while time.perf_counter() < stop:
+            t0 = time.perf_counter()
+            r = s.get(f"{base}/api/autocomplete", params={"q": f"{tag} {k} {i}"})
+            if r.status_code == 200 and r.json().get("suggestions"):
+                lat.append(time.perf_counter() - t0)
+            else:
+                errors[0] += 1
+            i += 1
+
+    threads = [threading.Thread(target=worker, args=(k,)) for k in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return lat, errors[0], time.perf_counter() - t0
+
+
+def _burst_adds(base: str, rounds: int, clients: int, tag: str):
+    """Each round, `clients` simultaneous /api/add calls for one new card name. -> seconds per round."""
+    import requests
+
+    sessions = [requests.Session() for _ in range(clients)]
+    times = []
+    for n in range(rounds):
+        gate = threading.Barrier(clients)
+        statuses = []
+
+        def worker(k):
+            gate.wait()
+            statuses.append(sessions[k].post(f"{base}/api/add", json={"name": f"{tag} burst {n}"}).status_code)
+
+        threads = [threading.Thread(target=worker, args=(k,)) for k in range(clients)]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        times.append(time.perf_counter() - t0)
+        assert statuses == [200] * clients, statuses
+    return times
+
+
+def bench_asgi(args):
+    import magisort_asgi as wa
+    import magisort_web as w
+    import scryhttp
+
+    stub, stub_base, hits = _stub_scryfall(args.delay)
+    w.SCRY_NAMED_URL = stub_base + "/cards/named"
+    w.SCRY_SETNUM_URL = stub_base + "/cards/{code}/{number}"
+    w.SCRY_AUTOCOMPLETE_URL = stub_base + "/cards/autocomplete"
+    # measure the servers, not the 10/s Scryfall pacing: both sides get an unlimited bucket
+    unlimited = scryhttp.TokenBucket(rate=1e9, burst=1 << 20)
+    scryhttp.shared_session().bucket = unlimited
+    wa.scry.bucket = unlimited
+
+    with tempfile.TemporaryDirectory() as tmp:
+        w.DB_PATH = os.path.join(tmp, "bench.db")
+        w.CACHE_PATH = None
+        w.BULK_DATA_PATH = os.path.join(tmp, "no-bulk.json")
+        w.init_db_if_needed()
+
+        print(f"stub Scryfall: {args.delay * 1e3:.0f} ms per lookup, {args.clients} clients, "
+              f"sync side = {args.workers} worker threads")
+        print(f"{'server':<8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7} "
+              f"{'burst s/round':>14} {'upstream/round':>15}")
+        servers = (("wsgi", lambda: _pooled_wsgi_server(w.app, args.workers)), ("asgi", lambda: _uvicorn_server(wa.app)))
+        for label, start in servers:
+            srv, base = start()
+            lat, err, wall = _distinct_lookups(base, args.seconds, args.clients, label)
+            before = hits["named"]
+            rounds = _burst_adds(base, args.rounds, args.clients, label)
+            per_round = (hits["named"] - before) / args.rounds
+            lat.sort()
+            p50 = lat[len(lat) // 2] * 1e3 if lat else 0.0
+            p95 = lat[int(len(lat) * 0.95)] * 1e3 if lat else 0.0
+            print(f"{label:<8} {len(lat) / wall:>8.1f} {p50:>8.0f} {p95:>8.0f} {err:>7} "
+                  f"{sum(rounds) / len(rounds):>14.2f} {per_round:>15.1f}")
+            if label == "asgi":
+                srv.should_exit = True
+            else:
+                srv.shutdown()
+        stub.shutdown()
+
+
+# -------------------- scryhttp.py: keep-alive, retry, pacing --------------------
+def _scripted_server():
+    """Mock Scryfall: GET /script pops the next (status, headers) off `script` (200 once empty),
+    any other path answers 200; a "stall" header entry sleeps that long before answering.
+    -> (server, base url, script deque, counters)."""
+    from collections import Counter, deque
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    script = deque()
+    counts = Counter()
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        wbufsize = 1 << 16      # headers + body in one send; split writes stall keep-alive on delayed ACKs
+
+        def log_message(self, *args):
+            pass
+
+        def setup(self):
+            super().setup()
+            with lock:
+                counts["connections"] += 1
+
+        def do_GET(self):
+            with lock:
+                counts["requests"] += 1
+                status, headers = script.popleft() if script and self.path == "/script" else (200, {})
+            headers = dict(headers)
+            time.sleep(headers.pop("stall", 0))
+            body = json.dumps({"object": "card", "name": "Stub"} if status == 200 else
+                              {"object": "error", "status": status}).encode("utf-8")
+            self.send_response(status)
+            for k, v in headers.items():
+                self.send_header(k, v)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, f"http://127.0.0.1:{srv.server_address[1]}", script, counts
+
+
+def bench_http(args):
+    import requests
+    import scryhttp
+
+    srv, base, script, counts = _scripted_server()
+    fast = scryhttp.TokenBucket(rate=1e9, burst=1 << 20)
+    http = scryhttp.ScryfallSession(bucket=fast, stats=scryhttp.EndpointStats(), backoff=0.05)
+
+    # keep-alive: bare requests.get opens a connection per call, the session reuses one
+    for label, get in (("requests.get", lambda: requests.get(base + "/cards/named", timeout=5)),
+                       ("ScryfallSession", lambda: http.get(base + "/cards/named"))):
+        counts.clear()
+        _, dt = _timed(lambda: [get() for _ in range(args.n)])
+        print(f"{label:<16} {args.n} GETs {dt * 1e3 / args.n:>6.2f} ms/req  {counts['connections']:>4} connections")
+    assert counts["connections"] == 1, counts
+
+    # 429 with Retry-After, then 503, then success: two retries, and at least Retry-After waited
+    script.extend([(429, {"Retry-After": "1"}), (503, {}), (200, {})])
+    r, dt = _timed(http.get, base + "/script")
+    assert r.status_code == 200 and dt >= 1.0, (r.status_code, dt)
+    print(f"429(Retry-After: 1) -> 503 -> 200 in {dt:.2f}s")
+
+    # persistent 500s: gives up after 1 + retries attempts and returns the last response
+    counts.clear()
+    script.extend([(500, {})] * (http.retries + 1))
+    r = http.get(base + "/script")
+    assert r.status_code == 500 and counts["requests"] == http.retries + 1, (r.status_code, counts)
+    print(f"500 x {http.retries + 1}: gave up with 500 after {counts['requests']} attempts")
+
+    # interactive calls: fewer retries, and a timeout is raised instead of waited out again
+    counts.clear()
+    script.extend([(500, {})] * (scryhttp.INTERACTIVE_RETRIES + 1))
+    r = http.get(base + "/script", retries=scryhttp.INTERACTIVE_RETRIES, retry_timeouts=False)
+    assert r.status_code == 500 and counts["requests"] == scryhttp.INTERACTIVE_RETRIES + 1, counts
+    counts.clear()
+    script.append((200, {"stall": 0.5}))
+    try:
+        http.get(base + "/script", timeout=0.2, retries=scryhttp.INTERACTIVE_RETRIES, retry_timeouts=False)
+        raise AssertionError("timeout was swallowed")
+    except requests.Timeout:
+        assert counts["requests"] == 1, counts
+    print(f"interactive: 500 given up after {scryhttp.INTERACTIVE_RETRIES + 1} attempts, timeout raised after 1")
+
+    # connection refused: retried, then raised
+    dead = scryhttp.ScryfallSession(bucket=fast, stats=http.stats, retries=2, backoff=0.01)
+    try:
+        dead.get("http://127.0.0.1:9/cards/named", timeout=1)
+        raise AssertionError("connection error was swallowed")
+    except requests.ConnectionError:
+        print("connection refused: raised after 3 attempts")
+
+    # pacing: the default bucket (10/s, burst 2) spaces a burst out
+    paced = scryhttp.ScryfallSession(bucket=scryhttp.TokenBucket(), stats=http.stats)
+    _, dt = _timed(lambda: [paced.get(base + "/cards/autocomplete") for _ in range(args.paced)])
+    floor = (args.paced - scryhttp.DEFAULT_BURST) / scryhttp.DEFAULT_RATE
+    assert dt >= floor * 0.95, (dt, floor)
+    print(f"{args.paced} paced GETs in {dt:.2f}s (floor {floor:.2f}s at {scryhttp.DEFAULT_RATE:.0f}/s)")
+
+    print(f"\n{'endpoint':<24} {'requests':>8} {'retries':>8} {'errors':>7} {'p50 ms':>7} {'p95 ms':>7} {'max ms':>7}")
+    for ep, m in http.stats.snapshot().items():
+        print(f"  {ep:<22} {m['requests']:>8} {m['retries']:>8} {m['errors']:>7} "
+              f"{m['p50_ms']:>7.1f} {m['p95_ms']:>7.1f} {m['max_ms']:>7.1f}")
+    srv.shutdown()
+
+
+# ---- correctness checks (bench.py check) ----
+def check_collection():
+    """scryclient's batched resolver against the stub: <= 75 per POST, input order, None for misses."""
+    import scryclient
+
+    srv, base, hits = _stub_scryfall(0)
+    old_base = scryclient.SCRY_API_BASE
+    scryclient.SCRY_API_BASE = base
+    try:
+        idents = []
+        for i in range(200):
+            if i % 7 == 0:
+                idents.append(scryclient.identifier(name=f"Missing {i}"))
+            elif i % 5 == 0:
+                idents.append(scryclient.identifier(set_code="TST", number=i))
+            else:
+                idents.append(scryclient.identifier(name=f"Card {i}"))
+        idents += idents[:10]                       # repeats are asked once
+        out = scryclient.resolve_collection(idents)
+    finally:
+        scryclient.SCRY_API_BASE = old_base
+        srv.shutdown()
+    assert len(out) == len(idents)
+    for ident, card in zip(idents, out):
+        if ident.get("name", "").startswith("Missing"):
+            assert card is None, (ident, card)
+        elif "name" in ident:
+            assert card is not None and card["name"] == ident["name"], (ident, card)
+        else:
+            assert card is not None and card["collector_number"] == ident["collector_number"], (ident, card)
+    assert hits["max_batch"] <= scryclient.COLLECTION_BATCH and hits["collection"] == 3, hits
+    print(f"collection: {len(idents)} identifiers in {hits['collection']} POSTs "
+          f"(largest {hits['max_batch']}), input order kept, misses None")
+
+
+# a few bulk-data records covering the shapes CardStore has to handle
+_BULK_FIXTURE = [
+    {"object": "card", "id": "b-1", "oracle_id": "4457ED35-7C10-48C8-9776-456485FDF070", "name": "Lightning Bolt",
+     "set": "m10", "collector_number": "146", "cmc": 1.0, "colors": ["R"], "color_identity": ["R"],
+     "type_line": "Instant", "lang": "en", "legalities": {"modern": "legal"}, "prices": {"usd": "1.00"}},
+    {"object": "card", "id": "b-2", "oracle_id": "4457ed35-7c10-48c8-9776-456485fdf070", "name": "Lightning Bolt",
+     "set": "2xm", "collector_number": "117", "cmc": 1.0, "type_line": "Instant", "lang": "en"},
+    {"object": "card", "id": "fi-de", "oracle_id": "fire-ice", "name": "Fire // Ice", "set": "mh2",
+     "collector_number": "290", "cmc": 4.0, "type_line": "Instant // Instant", "lang": "de"},
+    {"object": "card", "id": "fi-en", "oracle_id": "fire-ice", "name": "Fire // Ice", "set": "mh2",
+     "collector_number": "290a", "cmc": 4.0, "type_line": "Instant // Instant", "lang": "en",
+     "card_faces": [{"name": "Fire", "image_uris": {"normal": "n", "small": "s"}}, {"name": "Ice"}]},
+    {"object": "card", "id": "dfc", "name": "Delver of Secrets // Insectile Aberration", "set": "isd",
+     "collector_number": "51", "type_line": "Creature — Human Wizard // Creature — Human Insect", "lang": "en",
+     "card_faces": [{"name": "Delver of Secrets", "oracle_id": "delver"}, {"name": "Insectile Aberration"}]},
+    {"object": "card", "id": "noname", "oracle_id": "noname", "set": "tst", "collector_number": "1"},
+    {"object": "related_card", "id": "rel", "name": "Not A Card"},
+]
+
+
+def check_cardstore():
+    """carddb.CardStore over a tiny bulk file: lookups by name / oracle ID / set+number, misses are None."""
+    import carddb
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bulk.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(_BULK_FIXTURE, f)
+        store = carddb.CardStore.from_file(path)
+
+    assert len(store) == 3, len(store)                  # bolt, fire // ice, delver
+    bolt = store.by_name("lightning bolt")
+    assert bolt["id"] == "b-1" and store.by_name("  LIGHTNING  Bolt!")["id"] == "b-1"
+    assert "legalities" not in bolt and "prices" not in bolt, sorted(bolt)     # slimmed
+    assert store.by_name("Fire")["id"] == "fi-en", "front face of a split card, English preferred"
+    assert store.by_name("Fire // Ice")["card_faces"][0]["image_uris"] == {"normal": "n"}
+    assert store.by_oracle("4457ed35-7c10-48c8-9776-456485fdf070")["id"] == "b-1"
+    assert store.by_oracle("4457ED35-7C10-48C8-9776-456485FDF070")["id"] == "b-1"
+    assert store.by_oracle("delver")["id"] == "dfc", "oracle_id taken from the faces"
+    assert store.by_set_number("2XM", 117)["id"] == "b-2"
+    for miss in (store.by_name("Lightning Bol"), store.by_name("Not A Card"), store.by_name(None),
+                 store.by_oracle("nope"), store.by_oracle(None), store.by_set_number("m10", "999")):
+        assert miss is None, miss
+    print(f"cardstore: {len(_BULK_FIXTURE)} fixture records -> {len(store)} cards, "
+          "name/oracle/set+number lookups OK, misses None")
+
+
+def check_scrycache():
+    """scrycache.LookupCache on a fake clock: TTL expiry, LRU eviction (memory and disk), counters."""
+    import scrycache
+
+    now = [1000.0]
+    clock = lambda: now[0]
+
+    # memory only: capacity 3, LRU order follows gets
+    c = scrycache.LookupCache(None, ttl=60, memory_entries=3, clock=clock)
+    for k in "abc":
+        c.put(k, k.upper())
+    assert c.get("a") == "A"                        # a is now most recent
+    c.put("d", "D")                                 # evicts b
+    assert c.get("b") is None and c.get("c") == "C" and c.get("d") == "D"
+    s = c.stats()
+    assert (s["hits"], s["misses"], s["evictions"], s["memory_entries"]) == (3, 1, 1, 3), s
+
+    # TTL: default and per-put, expiry is strict at expires_at
+    c.put("short", 1, ttl=5)
+    now[0] += 4.9
+    assert c.get("short") == 1
+    now[0] += 0.1
+    assert c.get("short") is None
+    now[0] += 55                                    # a, c, d were put at 1000 with ttl 60
+    assert c.get("a") is None and c.get("c") is None
+    s = c.stats()
+    assert (s["hits"], s["misses"]) == (4, 4) and s["hit_rate"] == 0.5, s
+
+    # disk tier: memory misses fall through to SQLite, disk LRU trims to 90% of the cap
+    with tempfile.TemporaryDirectory() as tmp:
+        now[0] = 1000.0
+        c = scrycache.LookupCache(os.path.join(tmp, "cache.db"), ttl=60, memory_entries=2,
+                                  disk_entries=10, clock=clock)
+        for i in range(10):
+            now[0] += 1
+            c.put(f"k{i}", i)
+        now[0] += 1
+        assert c.get("k0") == 0                     # from disk (memory holds k8, k9); k0 now recent
+        assert c.stats()["disk_hits"] == 1
+        now[0] += 1
+        c.put("k10", 10)                            # 11 > 10 on disk: trim to 9, oldest first
+        s = c.stats()
+        assert s["disk_entries"] == 9 and s["evictions"] >= 2, s
+        assert c.get("k1") is None and c.get("k2") is None and c.get("k3") == 3 and c.get("k0") == 0
+        c2 = scrycache.LookupCache(os.path.join(tmp, "cache.db"), ttl=60, clock=clock)
+        assert c2.stats()["disk_entries"] == 9 and c2.get("k10") == 10     # survives a reopen
+        now[0] += 61
+        c3 = scrycache.LookupCache(os.path.join(tmp, "cache.db"), ttl=60, clock=clock)
+        assert c3.stats()["disk_entries"] == 0                            # expired rows purged on open
+    print("scrycache: LRU order, TTL expiry (default and per-put), disk fall-through and trim, counters OK")
+
+
+def check_journal():
+    """sort.journal: interleaved insert/remove/resolve with periodic compaction, then reload
+    (replay) -> same catalog as applying the ops directly; torn and stale entries are ignored."""
+    import sort
+
+    rnd = random.Random(4)
+    types = ("Instant", "Creature — Elf", "Basic Land — Forest")
+    make = lambda i, n=None: sort.card(f"Card {i}", "tst", i, "RG"[i % 2], i % 7, types[i % 3], f"o-{i}",
+                                       n or rnd.randint(1, 3))
+    records = [dict(sort._card_to_dict(make(1000 + i, 1)), oracleID="") for i in range(40)]
+
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        path = os.path.join(tmp, "catalog.json")
+        seed = sort.catalog(12, 512)
+        for d in records:
+            seed.queueUnresolved(d)
+        sort.save(seed, path)
+
+        jr = sort.journal(path, compact_every=37)
+        cat = sort.load(path, 12, 512, jr=jr, offline=True)
+        ref = sort.catalog(12, 512)
+        for d in records:
+            ref.queueUnresolved(d)
+        pending = list(records)
+        for _ in range(600):
+            op = rnd.choice(("insert", "insert", "remove", "resolve"))
+            if op == "resolve" and pending:
+                d = pending.pop(rnd.randrange(len(pending)))
+                c = sort._dict_to_card(d, f"o-{d['collectNum']}")
+                for x in (cat, ref):
+                    assert x.dropUnresolved(d)
+                    x.insert(sort._dict_to_card(d, c.getOracleID()))
+                jr.append(cat, "resolve", c, record=d)
+            elif op == "remove":
+                c = make(rnd.randrange(60))
+                ok = cat.remove(c)
+                assert ok == ref.remove(make(c.getCollectNum(), c.getAmount()))
+                if ok:
+                    jr.append(cat, "remove", c)
+            else:
+                c = make(rnd.randrange(60))
+                cat.insert(c)
+                ref.insert(make(c.getCollectNum(), c.getAmount()))
+                jr.append(cat, "insert", c)
+        jr.close()
+        want = _canonical(sort, ref)
+        assert _canonical(sort, cat) == want, "live catalog diverged"
+
+        # restart: snapshot (last compaction) + journal tail
+        journal_path = path + ".journal"
+        with open(journal_path, encoding="utf-8") as f:
+            tail = sum(1 for _ in f)
+        assert 0 < tail < 37, tail
+        back = sort.load(path, 12, 512, jr=sort.journal(path), offline=True)
+        assert _canonical(sort, back) == want, "replay diverged"
+
+        # torn final write (crash mid-append) is ignored
+        with open(journal_path, "a", encoding="utf-8") as f:
+            f.write('{"gen": 1, "op": "ins')
+        back = sort.load(path, 12, 512, jr=sort.journal(path), offline=True)
+        assert _canonical(sort, back) == want, "torn entry applied"
+
+        # crash between compaction's save and its journal truncate: old-generation entries are skipped
+        jr = sort.journal(path)
+        back = sort.load(path, 12, 512, jr=jr, offline=True)
+        with open(journal_path, encoding="utf-8") as f:
+            stale = f.read()
+        jr.compact(back)
+        jr.close()
+        with open(journal_path, "w", encoding="utf-8") as f:
+            f.write(stale)
+        back = sort.load(path, 12, 512, jr=sort.journal(path), offline=True)
+        assert _canonical(sort, back) == want, "stale generation replayed"
+
+    resolved = len(records) - len(pending)
+    print(f"journal: 600 ops ({resolved} resolves) with compaction every 37, replay of a {tail}-entry tail, "
+          "torn and stale entries ignored: totals match")
+
+
+# (OCR text, name it must snap to); None = below MATCH_MIN_CONF, left for Scryfall's fuzzy lookup
+SNAP_CASES = [
+    ("Lightnlng Bolt", "lightning bolt"),
+    ("Counterspel1", "counterspell"),
+    ("Llanowar Elvcs", "llanowar elves"),
+    ("Brainstorrn", "brainstorm"),
+    ("Sw0rds to Plowshare5", "swords to plowshares"),
+    ("Shivan Dragn", "shivan dragon"),
+    ("Birds of Parad1se", "birds of paradise"),
+    ("Snapcaster Mage 2/1", "snapcaster mage"),
+    ("LIGHTNING BOLT,", "lightning bolt"),
+    ("Sol R1ng", None),
+    ("Bolt", None),
+    ("Serra", None),
+    ("Elves", None),
+    ("xq zzk", None),
+]
+SNAP_NAMES = ["Lightning Bolt", "Lightning Helix", "Lightning Strike", "Counterspell", "Counterbalance",
+              "Llanowar Elves", "Llanowar Wastes", "Sol Ring", "Sol Talisman", "Brainstorm", "Brainstone",
+              "Swords to Plowshares", "Shivan Dragon", "Serra Angel", "Birds of Paradise", "Snapcaster Mage",
+              "Delver of Secrets", "Fire // Ice", "Dark Ritual", "Wrath of God"]
+
+
+def check_names():
+    """carddb.NameIndex against OCR-style misspellings among ~35k names: expected snaps,
+    nothing snapped below MATCH_MIN_CONF, and per-lookup latency."""
+    import string
+
+    import carddb
+
+    rnd = random.Random(10)
+    filler = [" ".join("".join(rnd.choice(string.ascii_lowercase) for _ in range(rnd.randint(3, 9)))
+                       for _ in range(rnd.randint(1, 3))) for _ in range(35_000)]
+    index = carddb.NameIndex(SNAP_NAMES + filler)
+    for text, want in SNAP_CASES:
+        got = index.snap(text)
+        assert got == want, (text, want, got, index.match(text))
+        if want is None:
+            assert index.match(text)[1] < carddb.MATCH_MIN_CONF
+    queries = [t for t, _ in SNAP_CASES] * 50
+    _, dt = _timed(lambda: [index.match(q) for q in queries])
+    per = dt / len(queries)
+    assert per < 5e-3, f"{per * 1e6:.0f} us per lookup"
+    print(f"names: {len(SNAP_CASES)} OCR cases snap as expected (threshold {carddb.MATCH_MIN_CONF}) "
+          f"over {len(index)} names, {per * 1e6:.0f} us per lookup")
+
+
+def check_import():
+    """magisort_web.parse_import for each format (malformed lines included), then a 10k-line
+    import through /cards/collection on the stub Scryfall."""
+    import math
+
+    import magisort_web as w
+    import scryclient
+    import scryhttp
+
+    deck = ("Deck\n4 Lightning Bolt\n4x Lightning Bolt (M10) 146\n2X Counterspell (2XM)\nOpt\n1 Fire // Ice\n"
+            "# comment\n// comment\n\nSideboard:\n0 Shock\n4\n   3    Opt   \n")
+    assert w.detect_import_format(deck) == "decklist"
+    entries, failures = w.parse_import(deck)
+    assert entries == [
+        (2, {"name": "Lightning Bolt", "set": None, "number": None}, 4),
+        (3, {"name": "Lightning Bolt", "set": "M10", "number": "146"}, 4),
+        (4, {"name": "Counterspell", "set": "2XM", "number": None}, 2),
+        (5, {"name": "Opt", "set": None, "number": None}, 1),
+        (6, {"name": "Fire // Ice", "set": None, "number": None}, 1),
+        (11, {"name": "Shock", "set": None, "number": None}, 0),
+        (13, {"name": "Opt", "set": None, "number": None}, 3),
+    ], entries
+    assert [(f["line"], f["error"]) for f in failures] == [(12, "Unparseable line")], failures
+
+    text = ("Quantity,Name,Set,Collector Number\n2,Lightning Bolt,m10,146\n,Opt,,\n1,,2xm,117\n"
+            "1,,2xm,\n,,,\n3,\"Fire // Ice\",mh2,290\n")
+    assert w.detect_import_format(text) == "csv"
+    entries, failures = w.parse_import(text)
+    assert entries == [
+        (2, {"name": "Lightning Bolt", "set": "m10", "number": "146"}, 2),
+        (3, {"name": "Opt", "set": None, "number": None}, 1),
+        (4, {"name": None, "set": "2xm", "number": "117"}, 1),
+        (7, {"name": "Fire // Ice", "set": "mh2", "number": "290"}, 3),
+    ], entries
+    assert [(f["line"], f["error"]) for f in failures] == [(5, "No name or set+number")], failures
+    entries, failures = w.parse_import("foo,bar\n1,2\n", "csv")
+    assert not entries and failures[0]["error"] == "CSV needs a name or set+number column"
+
+    text = ('{"name": "Lightning Bolt", "qty": 3}\n{"set": "m10", "number": 146}\n{bad json\n[1, 2]\n'
+            '{"qty": 2}\n\n{"name": "Opt", "quantity": "2"}\n')
+    assert w.detect_import_format(text) == "ndjson"
+    entries, failures = w.parse_import(text)
+    assert entries == [
+        (1, {"name": "Lightning Bolt", "set": None, "number": None}, 3),
+        (2, {"name": None, "set": "m10", "number": "146"}, 1),
+        (7, {"name": "Opt", "set": None, "number": None}, 2),
+    ], entries
+    assert [(f["line"], f["error"].split(":")[0]) for f in failures] == \
+        [(3, "Bad JSON"), (4, "Bad JSON"), (5, "No name or set+number")], failures
+    print("import: decklist / csv / ndjson parse cases OK (malformed lines reported with line numbers)")
+
+    # 10k lines, ~3k distinct cards, 2% unknown: one transaction, <= 75 identifiers per POST
+    rnd = random.Random(15)
+    lines, want_qty, want_missing = [], 0, 0
+    for i in range(10_000):
+        k, qty = rnd.randrange(3000), rnd.randint(1, 4)
+        if k % 50 == 0:
+            lines.append(f"{qty} Missing {k}")
+            want_missing += 1
+        elif k % 4 == 0:
+            lines.append(f"{qty} Card {k} (TST) {k}")
+            want_qty += qty
+        else:
+            lines.append(f"{qty}x Card {k}")
+            want_qty += qty
+    srv, base, hits = _stub_scryfall(0)
+    bucket = scryhttp.shared_bucket()
+    saved = (scryclient.SCRY_API_BASE, bucket.rate, bucket.burst)
+    with tempfile.TemporaryDirectory() as tmp:
+        w.DB_PATH = os.path.join(tmp, "import.db")
+        w.CACHE_PATH = None
+        w.BULK_DATA_PATH = os.path.join(tmp, "no-bulk.json")
+        scryclient.SCRY_API_BASE = base
+        bucket.rate, bucket.burst = 1e9, 1 << 20
+        try:
+            w.init_db_if_needed()
+            entries, failures = w.parse_import("\n".join(lines))
+            conn = w.connect_db()
+            result, dt = _timed(w.import_cards, conn, entries)
+            stored = conn.execute("SELECT SUM(qty), COUNT(*) FROM cards").fetchone()
+            conn.close()
+        finally:
+            scryclient.SCRY_API_BASE, bucket.rate, bucket.burst = saved
+            srv.shutdown()
+    assert not failures and len(entries) == 10_000
+    assert result["imported"] == want_qty == stored[0], (result["imported"], want_qty, tuple(stored))
+    assert len(result["failed"]) == want_missing and all(f["error"] == "Card not found" for f in result["failed"])
+    chunks = math.ceil(len(entries) / w.IMPORT_CHUNK)
+    assert hits["max_batch"] <= scryclient.COLLECTION_BATCH and hits["collection"] <= chunks * 10, hits
+    print(f"import: 10000 lines -> {stored[1]} printings / {want_qty} copies, {want_missing} not found, "
+          f"{hits['collection']} POSTs, {dt:.2f}s")
+
+
+# The cards table as v1 shipped it: one row per physical copy, no qty / vbin, no indexes.
+_V1_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE cards (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  name TEXT NOT NULL,
+  set_code TEXT,
+  collector_number TEXT,
+  scryfall_id TEXT,
+  colors TEXT,
+  mana_value REAL,
+  type_line TEXT,
+  pile_index INTEGER NOT NULL,
+  image_url TEXT,
+  added_at TEXT NOT NULL
+);
+"""
+
+
+def check_migration():
+    """A v1 database with duplicate copies migrates to one row per printing with summed qty;
+    a migration that dies half way leaves it at v1 and the rerun gives the same result."""
+    import sqlite3
+
+    import magisort_web as w
+
+    rnd = random.Random(16)
+    rows = [(f"Card {k}", "tst", str(k), f"sid-{k}", "U", k % 7, "Instant", k % 3)
+            for k in rnd.choices(range(40), k=200)]
+    rows += [(f"Token {i}", None, None, None, "", 0, "Token", 0) for i in range(3)]   # no printing: never merged
+    want = {}
+    for r in rows:
+        if r[3] is not None:
+            want[r[3]] = want.get(r[3], 0) + 1
+
+    def build_v1(path):
+        conn = sqlite3.connect(path)
+        conn.executescript(_V1_SCHEMA)
+        conn.executemany("INSERT INTO cards(name, set_code, collector_number, scryfall_id, colors, mana_value,"
+                         " type_line, pile_index, added_at) VALUES (?,?,?,?,?,?,?,?,'2024-01-01T00:00:00Z')", rows)
+        conn.execute("INSERT INTO meta VALUES ('piles', '3')")
+        conn.commit()
+        conn.close()
+
+    def verify(path):
+        conn = w.connect_db(path)
+        got = {r["scryfall_id"]: r["qty"] for r in conn.execute("SELECT scryfall_id, qty FROM cards WHERE scryfall_id IS NOT NULL")}
+        total = conn.execute("SELECT COUNT(*), SUM(qty) FROM cards").fetchone()
+        version = w.get_meta(conn, "schema_version")
+        unique = conn.execute("SELECT 1 FROM sqlite_master WHERE name='idx_cards_printing'").fetchone()
+        conn.close()
+        assert got == want, "merged qty per printing differs"
+        assert tuple(total) == (len(want) + 3, len(rows)), tuple(total)
+        assert version == str(w.SCHEMA_VERSION), version
+        assert unique is not None
+
+    orig = w.MIGRATE_QTY_SQL
+    with tempfile.TemporaryDirectory() as tmp:
+        w.DB_PATH = os.path.join(tmp, "v1.db")
+        build_v1(w.DB_PATH)
+        w.init_db_if_needed()
+        verify(w.DB_PATH)
+
+        w.DB_PATH = os.path.join(tmp, "v1-interrupted.db")
+        build_v1(w.DB_PATH)
+        w.MIGRATE_QTY_SQL = orig[:3] + ("SELECT no_such_function()",)   # dies after the qty UPDATE
+        try:
+            w.init_db_if_needed()
+            raise AssertionError("broken migration did not raise")
+        except sqlite3.OperationalError:
+            pass
+        finally:
+            w.MIGRATE_QTY_SQL = orig
+        conn = w.connect_db()
+        assert w.get_meta(conn, "schema_version", "1") == "1"
+        assert conn.execute("SELECT COUNT(*) FROM cards").fetchone()[0] == len(rows)
+        assert not w._col_exists(conn, "cards", "qty"), "half-applied migration was committed"
+        conn.close()
+        w.init_db_if_needed()
+        verify(w.DB_PATH)
+    print(f"migration: v1 with {len(rows)} copies -> {len(want)} printings + 3 tokens at v{w.SCHEMA_VERSION}, "
+          f"interrupted run rolled back and redone OK")
+
+
+CHECKS = {
+    "collection": check_collection,
+    "cardstore": check_cardstore,
+    "scrycache": check_scrycache,
+    "journal": check_journal,
+    "names": check_names,
+    "import": check_import,
+    "migration": check_migration,
+}
+
+
+def bench_check(args):
+    unknown = [n for n in args.only if n not in CHECKS]
+    if unknown:
+        raise SystemExit(f"unknown check(s): {', '.join(unknown)} (have: {', '.join(CHECKS)})")
+    for name in args.only or CHECKS:
+        CHECKS[name]()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="MagiSort benchmarks")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("load", help="sort.load() on synthetic catalogs (should scale linearly)")
+    p.add_argument("--rows", type=int, nargs="+", default=[10_000, 50_000, 100_000])
+    p.set_defaults(fn=bench_load)
+
+    p = sub.add_parser("ocr", help="full-frame two-pass OCR vs. title-band single pass on saved frames")
+    p.add_argument("--dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "captures"))
+    p.add_argument("--title-height", type=int, default=64)
+    p.set_defaults(fn=bench_ocr)
+
+    p = sub.add_parser("web", help="threaded load test of magisort_web (pool size 0 = connect per request)")
+    p.add_argument("--rows", type=int, default=5000)
+    p.add_argument("--seconds", type=float, default=5.0)
+    p.add_argument("--clients", type=int, default=8)
+    p.set_defaults(fn=bench_web)
+
+    p = sub.add_parser("sql", help="cards-table queries with and without INDEX_SQL (asserts query plans)")
+    p.add_argument("--rows", type=int, default=500_000)
+    p.add_argument("--piles", type=int, default=3, help="how many piles to list per timing")
+    p.set_defaults(fn=bench_sql)
+
+    p = sub.add_parser("piles", help="batch vs. scalar pile assignment (asserts identical results)")
+    p.add_argument("--rows", type=int, default=1_000_000)
+    p.add_argument("--trials", type=int, default=20)
+    p.add_argument("--seed", type=int, default=0)
+    p.set_defaults(fn=bench_piles)
+
+    p = sub.add_parser("micro", help="ns/call of norm/h32/pile assignment and catalog ops, cached vs. not")
+    p.add_argument("--n", type=int, default=20_000)
+    p.set_defaults(fn=bench_micro)
+
+    p = sub.add_parser("snapshot", help="sort.save()/load() with catalog.json vs. catalog.bin (asserts round trip)")
+    p.add_argument("--rows", type=int, default=1_000_000)
+    p.set_defaults(fn=bench_snapshot)
+
+    p = sub.add_parser("catalog", help="catalog vs. colcatalog: random-op equivalence and bytes per card")
+    p.add_argument("--rows", type=int, default=1_000_000)
+    p.add_argument("--trials", type=int, default=20)
+    p.add_argument("--seed", type=int, default=0)
+    p.set_defaults(fn=bench_catalog)
+
+    p = sub.add_parser("asgi", help="magisort_web (fixed worker pool) vs. magisort_asgi against a slow stub Scryfall")
+    p.add_argument("--delay", type=float, default=0.2, help="seconds the stub takes per lookup")
+    p.add_argument("--clients", type=int, default=32)
+    p.add_argument("--workers", type=int, default=4, help="worker threads for the sync server")
+    p.add_argument("--seconds", type=float, default=5.0)
+    p.add_argument("--rounds", type=int, default=5)
+    p.set_defaults(fn=bench_asgi)
+
+    p = sub.add_parser("http", help="scryhttp against a scripted mock: keep-alive, retry/backoff, Retry-After, pacing")
+    p.add_argument("--n", type=int, default=300)
+    p.add_argument("--paced", type=int, default=22)
+    p.set_defaults(fn=bench_http)
+
+    p = sub.add_parser("check", help="correctness checks against stubs and small fixtures (asserts, no timing)")
+    p.add_argument("only", nargs="*", help=f"run just these checks ({', '.join(CHECKS)})")
+    p.set_defaults(fn=bench_check)
+
+    args = ap.parse_args()
+    args.fn(args)
+
+
+if __name__ == "__main__":
+    main()
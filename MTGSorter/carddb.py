@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# carddb.py — offline card store built from a Scryfall bulk-data dump
+#   python carddb.py download [oracle_cards|default_cards]
+#   python carddb.py names        (name list only, for fuzzy matching without a full dump)
+import json
+import sys
+from collections import Counter, defaultdict
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Tuple
+
+import scryhttp
+
+BULK_DATA_PATH = "scryfall-cards.json"
+NAMES_PATH = "scryfall-names.json"
+SCRY_BULK_URL = "https://api.scryfall.com/bulk-data/{kind}"
+SCRY_NAMES_URL = "https://api.scryfall.com/catalog/card-names"
+HTTP_TIMEOUT = 15
+
+# Only what sort.py / magisort_web.py actually read; bulk files carry ~60 fields per card.
+_KEEP_FIELDS = ("object", "id", "oracle_id", "name", "set", "collector_number", "cmc",
+                "colors", "color_identity", "type_line", "lang")
+
+@lru_cache(maxsize=1 << 16)
+def norm(s: str) -> str:
+    s = "".join(c.lower() for c in s if c.isalnum() or c.isspace())
+    return " ".join(s.split())
+
+def _slim_images(uris: Optional[dict]) -> Optional[dict]:
+    if not uris:
+        return None
+    return {k: uris[k] for k in ("normal", "large") if k in uris}
+
+def slim_card(card: dict) -> dict:
+    out = {k: card[k] for k in _KEEP_FIELDS if k in card}
+    if card.get("image_uris"):
+        out["image_uris"] = _slim_images(card["image_uris"])
+    faces = card.get("card_faces")
+    if faces:
+        out["card_faces"] = [{"name": f.get("name", ""), "image_uris": _slim_images(f.get("image_uris"))}
+                             for f in faces]
+        # oracle_id lives on the faces for reversible cards
+        if "oracle_id" not in out:
+            for f in faces:
+                if f.get("oracle_id"):
+                    out["oracle_id"] = f["oracle_id"]
+                    break
+    return out
+
+class CardStore:
+    """In-memory card lookup keyed by normalized name, oracle ID and set+collector number."""
+
+    def __init__(self):
+        self._by_name = {}
+        self._by_oracle = {}
+        self._by_setnum = {}
+
+    @classmethod
+    def from_file(cls, path: str = BULK_DATA_PATH) -> "CardStore":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        store = cls()
+        for card in data:
+            store.add(card)
+        return store
+
+    def add(self, card: dict):
+        if card.get("object", "card") != "card" or not card.get("name"):
+            return
+        card = slim_card(card)
+        english = card.get("lang", "en") == "en"
+
+        keys = {norm(card["name"])}
+        # "Fire // Ice" is also reachable as "Fire"
+        keys.add(norm(card["name"].split(" // ")[0]))
+        for k in keys:
+            if k and (k not in self._by_name or (english and self._by_name[k].get("lang", "en") != "en")):
+                self._by_name[k] = card
+
+        oracle = (card.get("oracle_id") or "").lower()
+        if oracle and oracle not in self._by_oracle:
+            self._by_oracle[oracle] = card
+
+        if card.get("set") and card.get("collector_number") is not None:
+            self._by_setnum.setdefault((card["set"].lower(), str(card["collector_number"]).lower()), card)
+
+    def by_name(self, name: str) -> Optional[dict]:
+        return self._by_name.get(norm(name or ""))
+
+    def by_oracle(self, oracle_id: str) -> Optional[dict]:
+        return self._by_oracle.get((oracle_id or "").lower())
+
+    def by_set_number(self, set_code: str, number) -> Optional[dict]:
+        return self._by_setnum.get(((set_code or "").lower(), str(number).lower()))
+
+    def names(self) -> list[str]:
+        return list(self._by_name)
+
+    def __len__(self):
+        return len(self._by_oracle)
+
+# -------------------- fuzzy name index --------------------
+MATCH_MIN_CONF = 0.75     # below this, callers should ask Scryfall's fuzzy endpoint instead
+
+def _trigrams(s: str) -> frozenset:
+    s = f"  {s} "
+    return frozenset(s[i:i + 3] for i in range(len(s) - 2))
+
+class NameIndex:
+    """Approximate name lookup for OCR output: trigram postings over normalized names.
+
+    Candidates are gathered from the query's rarest trigrams (bounded by a postings
+    budget, so common trigrams like " th" never get scanned) and ranked by Dice
+    similarity; a lookup is a few hundred microseconds against ~35k names.
+    """
+
+    def __init__(self, names):
+        self._names = []
+        self._grams = []
+        self._exact = {}
+        self._postings = defaultdict(list)
+        for n in names:
+            k = norm(n)
+            if not k or k in self._exact:
+                continue
+            i = len(self._names)
+            self._exact[k] = i
+            self._names.append(k)
+            g = _trigrams(k)
+            self._grams.append(g)
+            for t in g:
+                self._postings[t].append(i)
+
+    def match(self, text: str, budget: int = 2000, shortlist: int = 20) -> Tuple[Optional[str], float]:
+        """(best normalized name, confidence in [0, 1]); (None, 0.0) when nothing is close."""
+        q = norm(text or "")
+        if not q:
+            return None, 0.0
+        if q in self._exact:
+            return q, 1.0
+        tq = _trigrams(q)
+        lists = sorted((self._postings[t] for t in tq if t in self._postings), key=len)
+        hits = Counter()
+        used = 0
+        for p in lists:
+            if used and used + len(p) > budget:
+                break
+            hits.update(p)
+            used += len(p)
+        best, best_score = None, 0.0
+        for i, _ in hits.most_common(shortlist):
+            g = self._grams[i]
+            score = 2 * len(tq & g) / (len(tq) + len(g))
+            if score > best_score:
+                best, best_score = i, score
+        return (self._names[best], best_score) if best is not None else (None, 0.0)
+
+    def snap(self, text: str) -> Optional[str]:
+        """The known (normalized) name `text` should be read as, or None when the best
+        match is below MATCH_MIN_CONF and Scryfall's fuzzy endpoint should decide."""
+        match, conf = self.match(text)
+        return match if conf >= MATCH_MIN_CONF else None
+
+    def __len__(self):
+        return len(self._names)
+
+_stores = {}
+_indexes = {}
+
+def get_store(path: str = BULK_DATA_PATH) -> Optional[CardStore]:
+    """Shared store for `path`, loaded on first use; None when no bulk file is present."""
+    if path not in _stores:
+        _stores[path] = CardStore.from_file(path) if Path(path).exists() else None
+    return _stores[path]
+
+def get_name_index(store_path: str = BULK_DATA_PATH, names_path: str = NAMES_PATH) -> Optional[NameIndex]:
+    """Shared NameIndex over the bulk store's names, else the card-names catalog; None if neither exists."""
+    key = (store_path, names_path)
+    if key not in _indexes:
+        store = get_store(store_path)
+        if store is not None:
+            _indexes[key] = NameIndex(store.names())
+        elif Path(names_path).exists():
+            with open(names_path, "r", encoding="utf-8") as f:
+                _indexes[key] = NameIndex(json.load(f))
+        else:
+            _indexes[key] = None
+    return _indexes[key]
+
+def download_names(path: str = NAMES_PATH) -> str:
+    r = scryhttp.get(SCRY_NAMES_URL, timeout=HTTP_TIMEOUT)
+    r.raise_for_status()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(r.json().get("data", []), f, ensure_ascii=False)
+    _indexes.clear()
+    return path
+
+def download_bulk(kind: str = "oracle_cards", path: str = BULK_DATA_PATH) -> str:
+    r = scryhttp.get(SCRY_BULK_URL.format(kind=kind), timeout=HTTP_TIMEOUT)
+    r.raise_for_status()
+    uri = r.json()["download_uri"]
+    tmp = path + ".part"
+    with scryhttp.get(uri, stream=True, timeout=HTTP_TIMEOUT) as r, open(tmp, "wb") as f:
+        r.raise_for_status()
+        for chunk in r.iter_content(chunk_size=1 << 20):
+            f.write(chunk)
+    Path(tmp).replace(path)
+    _stores.pop(path, None)
+    _indexes.clear()
+    return path
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "download":
+        kind = sys.argv[2] if len(sys.argv) > 2 else "oracle_cards"
+        print("Saved", download_bulk(kind))
+    elif len(sys.argv) >= 2 and sys.argv[1] == "names":
+        print("Saved", download_names())
+    else:
+        print("usage: python carddb.py download [oracle_cards|default_cards] | names")
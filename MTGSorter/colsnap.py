@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# colsnap.py — compact columnar snapshot files
+#   layout: magic | u32 header length | JSON header | string table | columns
+#   strings are interned into one NUL-separated UTF-8 table and stored as u32 indices;
+#   numeric columns are fixed-width arrays, 8-byte aligned, read back zero-copy from an mmap
+import json
+import mmap
+import struct
+import sys
+from array import array
+
+MAGIC = b"MSCOLS\x00\x01"
+_ALIGN = 8
+
+def _pad(n: int) -> int:
+    return -n % _ALIGN
+
+def write(path: str, meta: dict, columns: dict):
+    """columns: name -> (kind, values) with kind "str" or an array typecode ("i", "h", ...)."""
+    strings, index = [], {}
+    encoded = {}
+    for name, (kind, values) in columns.items():
+        if kind == "str":
+            ids = array("I")
+            for s in values:
+                i = index.get(s)
+                if i is None:
+                    i = index[s] = len(strings)
+                    strings.append(s)
+                ids.append(i)
+            encoded[name] = ("str", ids)
+        else:
+            encoded[name] = (kind, values if isinstance(values, array) else array(kind, values))
+    table = "\0".join(strings).encode("utf-8")
+
+    header = dict(meta, byteorder=sys.byteorder, strings={"count": len(strings), "bytes": len(table)}, columns=[])
+    offset = 0
+    for name, (kind, arr) in encoded.items():
+        size = len(arr) * arr.itemsize
+        header["columns"].append({"name": name, "kind": kind, "typecode": arr.typecode,
+                                  "offset": offset, "length": len(arr)})
+        offset += size + _pad(size)
+    head = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(head)))
+        f.write(head)
+        start = len(MAGIC) + 4 + len(head)
+        f.write(b"\0" * _pad(start))
+        f.write(table)
+        f.write(b"\0" * _pad(len(table)))
+        for _, arr in encoded.values():
+            arr.tofile(f)
+            f.write(b"\0" * _pad(len(arr) * arr.itemsize))
+
+def read(path: str):
+    """-> (meta, columns): str columns come back as lists, numeric ones as memoryviews over the mmap."""
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mm[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a columnar snapshot")
+    (hlen,) = struct.unpack_from("<I", mm, len(MAGIC))
+    pos = len(MAGIC) + 4
+    header = json.loads(mm[pos:pos + hlen].decode("utf-8"))
+    pos += hlen
+    pos += _pad(pos)
+
+    nbytes = header["strings"]["bytes"]
+    strings = mm[pos:pos + nbytes].decode("utf-8").split("\0") if header["strings"]["count"] else []
+    pos += nbytes + _pad(nbytes)
+
+    view = memoryview(mm)
+    swap = header["byteorder"] != sys.byteorder
+    columns = {}
+    for col in header.pop("columns"):
+        itemsize = array(col["typecode"]).itemsize
+        start = pos + col["offset"]
+        data = view[start:start + col["length"] * itemsize]
+        if swap:
+            arr = array(col["typecode"], data.tobytes())
+            arr.byteswap()
+            data = arr
+        else:
+            data = data.cast(col["typecode"])
+        if col["kind"] == "str":
+            columns[col["name"]] = [strings[i] for i in data]
+        else:
+            columns[col["name"]] = data
+    for k in ("byteorder", "strings"):
+        header.pop(k)
+    return header, columns
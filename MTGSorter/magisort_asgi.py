@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# magisort_asgi.py — ASGI front for magisort_web
+#   /api/add and /api/autocomplete run on the event loop and call Scryfall through one
+#   pooled httpx.AsyncClient, so a slow lookup no longer pins a worker thread; identical
+#   lookups already in flight share a single upstream request. Every other route is the
+#   Flask app, mounted via asgiref's WsgiToAsgi.
+#   python magisort_asgi.py            (or: uvicorn magisort_asgi:app --port 5000)
+#   needs: pip install httpx asgiref uvicorn
+import asyncio
+import json
+import time
+from typing import Optional, Tuple
+from urllib.parse import parse_qs
+
+import httpx
+from asgiref.wsgi import WsgiToAsgi
+
+import carddb
+import magisort_web as web
+import scryhttp
+
+POOL_CONNECTIONS = 32     # upstream sockets shared by every request
+POOL_KEEPALIVE = 16
+
+# -------------------- Scryfall client --------------------
+class AsyncScryfall:
+    """Shared pooled AsyncClient with request coalescing.
+
+    Concurrent GETs for the same url + params await one upstream request (run
+    as its own task, so a caller that disconnects doesn't cancel it for the
+    others). Pacing, retries and latency metrics are shared with scryhttp.
+    """
+
+    def __init__(self, max_connections: int = POOL_CONNECTIONS, keepalive: int = POOL_KEEPALIVE,
+                 timeout: float = web.HTTP_TIMEOUT, bucket: Optional[scryhttp.TokenBucket] = None,
+                 retries: int = scryhttp.INTERACTIVE_RETRIES):
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=keepalive)
+        self.timeout = timeout
+        self.bucket = bucket or scryhttp.shared_bucket()
+        self.metrics = scryhttp.shared_stats()
+        self.retries = retries
+        self._client = None
+        self._inflight = {}
+        self.upstream = self.coalesced = 0
+
+    async def start(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout,
+                                             headers={"User-Agent": scryhttp.USER_AGENT, "Accept": "application/json"})
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _fetch(self, url: str, params: dict) -> Tuple[int, str]:
+        """One lookup with scryhttp's interactive retry policy: 429/5xx and connection errors
+        are retried (Retry-After honored), a timeout is raised rather than waited out again."""
+        await self.start()
+        endpoint = scryhttp.endpoint_label(url)
+        attempt = 0
+        while True:
+            await self.bucket.acquire_async()
+            self.upstream += 1
+            t0 = time.perf_counter()
+            try:
+                r = await self._client.get(url, params=params)
+            except httpx.TransportError as e:
+                self.metrics.record(endpoint, time.perf_counter() - t0, False)
+                if attempt >= self.retries or isinstance(e, httpx.TimeoutException):
+                    raise
+                wait = scryhttp.retry_delay(attempt)
+            else:
+                ok = r.status_code not in scryhttp.RETRY_STATUSES
+                self.metrics.record(endpoint, time.perf_counter() - t0, ok)
+                if ok or attempt >= self.retries:
+                    return r.status_code, r.text
+                wait = scryhttp.retry_delay(attempt, r.headers.get("Retry-After"))
+            self.metrics.retried(endpoint)
+            await asyncio.sleep(wait)
+            attempt += 1
+
+    async def get(self, url: str, params: Optional[dict] = None) -> Tuple[int, str]:
+        """-> (status, body text)."""
+        params = params or {}
+        key = (url, tuple(sorted(params.items())))
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(url, params))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {"upstream": self.upstream, "coalesced": self.coalesced, "in_flight": len(self._inflight)}
+
+scry = AsyncScryfall()
+
+def blocking(fn, *args):
+    """Run fn in the default executor: the lookup cache is SQLite behind a lock and
+    the name index may still be loading, neither of which belongs on the event loop."""
+    return asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+async def fetch_card(name: Optional[str] = None, set_code: Optional[str] = None, number: Optional[str] = None) -> dict:
+    """Async web.fetch_card_scryfall: local store and cache first, then one (coalesced) GET."""
+    card, key, url, params = await blocking(web.card_lookup, name, set_code, number)
+    if card is not None:
+        return card
+    status, text = await scry.get(url, params)
+    return await blocking(web.card_from_response, key, status, text)
+
+async def autocomplete_names(prefix: str) -> list[str]:
+    names, key, params = await blocking(web.autocomplete_lookup, prefix)
+    if names is not None:
+        return names
+    status, text = await scry.get(web.SCRY_AUTOCOMPLETE_URL, params)
+    return await blocking(web.names_from_response, key, status, text)
+
+# -------------------- ASGI plumbing --------------------
+async def send_json(send, status: int, obj):
+    body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
+
+async def read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        msg = await receive()
+        chunks.append(msg.get("body", b""))
+        if not msg.get("more_body"):
+            return b"".join(chunks)
+
+def query_arg(scope, name: str, default: str = "") -> str:
+    return parse_qs(scope.get("query_string", b"").decode("latin-1")).get(name, [default])[0]
+
+def store_card(card: dict) -> dict:
+    """web.add_card on a pooled connection (runs in the default executor; SQLite is blocking)."""
+    conn = web.db_pool.acquire()
+    try:
+        return web.add_card(conn, card)
+    finally:
+        web.db_pool.release(conn)
+
+# -------------------- Routes --------------------
+async def api_autocomplete(scope, receive, send):
+    q = query_arg(scope, "q").strip()
+    try:
+        await send_json(send, 200, {"suggestions": await autocomplete_names(q)})
+    except Exception as e:
+        await send_json(send, 200, {"suggestions": [], "error": str(e)})
+
+async def api_add(scope, receive, send):
+    try:
+        data = json.loads(await read_body(receive) or b"{}")
+    except ValueError:
+        data = {}
+    if not isinstance(data, dict):
+        data = {}
+    name, setc, num = data.get("name"), data.get("set"), data.get("number")
+    if not name and not (setc and num):
+        return await send_json(send, 400, {"error": "Require name or set+number"})
+    try:
+        card = await fetch_card(name=name, set_code=setc, number=num)
+        payload = await blocking(store_card, card)
+        await send_json(send, 200, payload)
+    except Exception as e:
+        await send_json(send, 500, {"error": str(e)})
+
+async def api_upstream(scope, receive, send):
+    await send_json(send, 200, scry.stats())
+
+ROUTES = {
+    ("GET", "/api/autocomplete"): api_autocomplete,
+    ("POST", "/api/add"): api_add,
+    ("GET", "/api/upstream"): api_upstream,
+}
+
+flask_app = WsgiToAsgi(web.app)
+
+async def lifespan(receive, send):
+    while True:
+        msg = await receive()
+        if msg["type"] == "lifespan.startup":
+            await blocking(web.init_db_if_needed)
+            await blocking(carddb.get_store, web.BULK_DATA_PATH)
+            await blocking(carddb.get_name_index, web.BULK_DATA_PATH)   # snap_name builds it otherwise
+            await scry.start()
+            await send({"type": "lifespan.startup.complete"})
+        elif msg["type"] == "lifespan.shutdown":
+            await scry.close()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    if scope["type"] == "http":
+        route = ROUTES.get((scope["method"], scope["path"]))
+        if route is not None:
+            return await route(scope, receive, send)
+    return await flask_app(scope, receive, send)
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="127.0.0.1", port=5000)
@@ -1,14 +1,32 @@
 #!/usr/bin/env python3
 # magisort_web.py (v2)
+import argparse
+import base64
+import csv
 import hashlib
+import io
+import queue
+import re
 import sqlite3
 import json
+import math
+import sys
+import threading
+import time
 from pathlib import Path
 from datetime import datetime
+from functools import lru_cache
 from typing import Iterable, Optional, Tuple
 
-import requests
-from flask import Flask, request, jsonify, render_template_string, send_from_directory
+import numpy as np
+from flask import (Flask, Response, g, has_app_context, request, jsonify, render_template_string,
+                   send_from_directory, stream_with_context)
+
+import carddb
+import scryclient
+import scrycache
+import scryhttp
+import vbins as vbinmap
 
 # -------------------- Config --------------------
 DB_PATH = "magisort.db"
@@ -16,6 +34,11 @@ DEFAULT_PILES = 12
 DEFAULT_VBINS = 1024
 DEFAULT_SALT = "2025-v1"
 HTTP_TIMEOUT = 15
+DB_POOL_SIZE = 8   # idle connections kept open between requests
+LIST_PAGE_SIZE = 200
+LIST_MAX_PAGE_SIZE = 1000
+BULK_DATA_PATH = carddb.BULK_DATA_PATH  # local Scryfall bulk dump; see carddb.py
+CACHE_PATH = scrycache.CACHE_PATH       # on-disk lookup cache; see scrycache.py
 
 SCRY_NAMED_URL = "https://api.scryfall.com/cards/named"
 SCRY_SETNUM_URL = "https://api.scryfall.com/cards/{code}/{number}"
@@ -26,29 +49,70 @@ app = Flask(__name__)
 app.config["TRUSTED_HOSTS"] = ["localhost", "127.0.0.1", "::1"]
 
 # -------------------- Hashing / Piles --------------------
+# Names, type lines and hash payloads repeat constantly (every add, import, re-pile);
+# each memo is bounded so arbitrary input can't grow it without limit.
+MEMO_SIZE = 1 << 16
+
+@lru_cache(maxsize=MEMO_SIZE)
 def norm(s: str) -> str:
     return "".join(c.lower() for c in s if c.isalnum() or c.isspace()).strip()
 
+@lru_cache(maxsize=MEMO_SIZE)
 def h32(payload: str) -> int:
-    return int(hashlib.blake2s(payload.encode("utf-8"), digest_size=4).hexdigest(), 16)
+    return int.from_bytes(hashlib.blake2s(payload.encode("utf-8"), digest_size=4).digest(), "big")
 
 def canonical_colors(colors: Iterable[str]) -> str:
     return "".join(sorted(colors)) if colors else "C"
 
-def compute_pile_index(*, name: str, mana_value: float, colors: Iterable[str], type_line: str,
-                       K: int, virtual_bins: int, salt: str) -> int:
-    name_n = norm(name)
-    type_n = norm(type_line)
-    colors_n = canonical_colors(colors)
+def compute_vbin(*, name: str, mana_value: float, colors: Iterable[str], type_line: str,
+                 virtual_bins: int, salt: str) -> int:
+    return _vbin(name, int(mana_value) if mana_value is not None else -1, canonical_colors(colors),
+                 type_line, virtual_bins, salt)
 
-    h_name  = h32(f"{salt}|name:{name_n}")
-    h_type  = h32(f"{salt}|type:{type_n}")
+@lru_cache(maxsize=MEMO_SIZE)
+def _vbin(name: str, mv: int, colors_n: str, type_line: str, virtual_bins: int, salt: str) -> int:
+    h_name  = h32(f"{salt}|name:{norm(name)}")
+    h_type  = h32(f"{salt}|type:{norm(type_line)}")
     h_color = h32(f"{salt}|color:{colors_n}")
-    h_mv    = h32(f"{salt}|mv:{int(mana_value) if mana_value is not None else -1}")
+    h_mv    = h32(f"{salt}|mv:{mv}")
+
+    h = (h_name ^ (h_type << 1) ^ (h_color << 2) ^ (h_mv << 3)) & 0xFFFFFFFF
+    return h % virtual_bins
+
+def compute_pile_index(*, name: str, mana_value: float, colors: Iterable[str], type_line: str,
+                       K: int, virtual_bins: int, salt: str, pile_map: Optional[list] = None) -> int:
+    vbin = compute_vbin(name=name, mana_value=mana_value, colors=colors, type_line=type_line,
+                        virtual_bins=virtual_bins, salt=salt)
+    return pile_map[vbin] if pile_map is not None else vbin % K
+
+def _h32_many(payloads):
+    """h32 over a sequence of strings -> uint64 array (the digests are big-endian u32s)."""
+    digests = b"".join(hashlib.blake2s(p.encode("utf-8"), digest_size=4).digest() for p in payloads)
+    return np.frombuffer(digests, dtype=">u4").astype(np.uint64)
+
+def _hash_column(values, key, payload):
+    """uint64 array of h32(payload(key(v))), hashing each distinct key once."""
+    keys = [key(v) for v in values]
+    distinct = list(set(keys))
+    slot = {k: i for i, k in enumerate(distinct)}
+    hashes = _h32_many([payload(k) for k in distinct])
+    return hashes[np.fromiter((slot[k] for k in keys), dtype=np.int64, count=len(keys))]
+
+def compute_vbins(names, mana_values, colors, type_lines, *, virtual_bins: int, salt: str):
+    """Virtual bin of every card, as an int64 NumPy array.
+
+    Only distinct values are hashed (types, colors and mana values repeat heavily),
+    the mixing and bin arithmetic is vectorized.
+    """
+    h_name  = _hash_column(names, lambda n: n, lambda n: f"{salt}|name:{norm(n)}")
+    h_type  = _hash_column(type_lines, lambda t: t, lambda t: f"{salt}|type:{norm(t)}")
+    h_color = _hash_column(colors, lambda c: c if isinstance(c, str) else tuple(c or ()),
+                           lambda c: f"{salt}|color:{canonical_colors(c)}")
+    h_mv    = _hash_column(mana_values, lambda mv: int(mv) if mv is not None else -1,
+                           lambda mv: f"{salt}|mv:{mv}")
 
     h = (h_name ^ (h_type << 1) ^ (h_color << 2) ^ (h_mv << 3)) & 0xFFFFFFFF
-    vbin = h % virtual_bins
-    return vbin % K
+    return (h % virtual_bins).astype(np.int64)
 
 # -------------------- DB --------------------
 SCHEMA_SQL = """
@@ -68,15 +132,126 @@ CREATE TABLE IF NOT EXISTS cards (
   type_line TEXT,
   pile_index INTEGER NOT NULL,
   image_url TEXT,
-  added_at TEXT NOT NULL
+  added_at TEXT NOT NULL,
+  qty INTEGER NOT NULL DEFAULT 1,
+  vbin INTEGER
 );
 """
 
-def open_db():
-    conn = sqlite3.connect(DB_PATH)
+# v2: one row per printing (scryfall_id) with a copy count; v1 stored one row per physical copy.
+# v3: each row remembers its virtual bin, so bin weights are one grouped query.
+# v4: type-line full-text index (cards_types) for /api/search.
+SCHEMA_VERSION = 4
+
+# Created after column migrations so older DBs pick them up too.
+INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS idx_cards_pile_name ON cards(pile_index, name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_cards_pile_colors_qty ON cards(pile_index, colors, qty);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_cards_printing ON cards(scryfall_id);
+CREATE INDEX IF NOT EXISTS idx_cards_vbin_qty ON cards(vbin, qty);
+CREATE INDEX IF NOT EXISTS idx_cards_colors_mv ON cards(colors, mana_value);
+CREATE INDEX IF NOT EXISTS idx_cards_set ON cards(set_code);
+"""
+
+# Type-line words for /api/search: an external-content FTS5 table over cards.type_line,
+# kept in step by triggers (the qty upsert doesn't touch type_line, so it never fires them).
+SEARCH_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS cards_types USING fts5(type_line, content='cards', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS cards_types_ai AFTER INSERT ON cards BEGIN
+  INSERT INTO cards_types(rowid, type_line) VALUES (new.id, new.type_line);
+END;
+CREATE TRIGGER IF NOT EXISTS cards_types_ad AFTER DELETE ON cards BEGIN
+  INSERT INTO cards_types(cards_types, rowid, type_line) VALUES ('delete', old.id, old.type_line);
+END;
+CREATE TRIGGER IF NOT EXISTS cards_types_au AFTER UPDATE OF type_line ON cards BEGIN
+  INSERT INTO cards_types(cards_types, rowid, type_line) VALUES ('delete', old.id, old.type_line);
+  INSERT INTO cards_types(rowid, type_line) VALUES (new.id, new.type_line);
+END;
+"""
+
+# v1 -> v2: fold duplicate printings into the lowest id, summing their copies.
+# Run statement by statement inside one transaction (executescript would commit between them).
+MIGRATE_QTY_SQL = (
+    "DROP INDEX IF EXISTS idx_cards_scryfall",
+    "DROP INDEX IF EXISTS idx_cards_pile_colors",
+    """UPDATE cards SET qty = (SELECT SUM(c2.qty) FROM cards c2 WHERE c2.scryfall_id = cards.scryfall_id)
+ WHERE id IN (SELECT MIN(id) FROM cards WHERE scryfall_id IS NOT NULL GROUP BY scryfall_id HAVING COUNT(*) > 1)""",
+    """DELETE FROM cards
+ WHERE scryfall_id IS NOT NULL
+   AND id NOT IN (SELECT MIN(id) FROM cards WHERE scryfall_id IS NOT NULL GROUP BY scryfall_id)""",
+)
+
+# Applied once per connection, not per request.
+DB_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",     # safe with WAL; fsync only at checkpoints
+    "PRAGMA cache_size=-16000",      # 16 MB page cache
+    "PRAGMA mmap_size=268435456",    # 256 MB memory-mapped reads
+    "PRAGMA temp_store=MEMORY",
+)
+
+def connect_db(path: Optional[str] = None):
+    conn = sqlite3.connect(path or DB_PATH, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    for p in DB_PRAGMAS:
+        conn.execute(p)
     return conn
 
+class ConnectionPool:
+    """LIFO pool of ready connections; a request checks one out and returns it on teardown."""
+
+    def __init__(self, size: int = DB_POOL_SIZE):
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self.created = 0
+
+    def acquire(self):
+        while True:
+            try:
+                path, conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if path == DB_PATH:
+                return conn
+            conn.close()   # DB_PATH was switched under us
+        with self._lock:
+            self.created += 1
+        return connect_db()
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        if self._idle.qsize() < self.size:
+            self._idle.put((DB_PATH, conn))
+        else:
+            conn.close()
+
+    def close_all(self):
+        while True:
+            try:
+                _, conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            conn.close()
+
+db_pool = ConnectionPool()
+
+def open_db():
+    """Inside a request: the request's pooled connection (released on teardown).
+    Outside one: a fresh connection the caller must close."""
+    if has_app_context():
+        if "db" not in g:
+            g.db = db_pool.acquire()
+        return g.db
+    return connect_db()
+
+@app.teardown_appcontext
+def release_db(exc):
+    conn = g.pop("db", None)
+    if conn is not None:
+        db_pool.release(conn)
+
 def _col_exists(conn, table: str, column: str) -> bool:
     r = conn.execute(f"PRAGMA table_info({table})").fetchall()
     return any(row["name"] == column for row in r)
@@ -89,6 +264,26 @@ def init_db_if_needed():
         # Migration: add image_url if missing (for older DBs)
         if not _col_exists(conn, "cards", "image_url"):
             conn.execute("ALTER TABLE cards ADD COLUMN image_url TEXT")
+        version = int(get_meta(conn, "schema_version", "1"))
+        if version < 2:
+            # all or nothing, version included: rerunning a half-applied merge would sum the copies twice
+            if not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")
+            if not _col_exists(conn, "cards", "qty"):
+                conn.execute("ALTER TABLE cards ADD COLUMN qty INTEGER NOT NULL DEFAULT 1")
+            for stmt in MIGRATE_QTY_SQL:
+                conn.execute(stmt)
+            set_meta(conn, "schema_version", "2")
+            conn.commit()
+        if version < 3:
+            if not _col_exists(conn, "cards", "vbin"):
+                conn.execute("ALTER TABLE cards ADD COLUMN vbin INTEGER")
+            fill_vbins(conn)
+        conn.executescript(SEARCH_SQL)
+        if version < 4:
+            conn.execute("INSERT INTO cards_types(cards_types) VALUES ('rebuild')")
+        set_meta(conn, "schema_version", str(SCHEMA_VERSION))
+        conn.executescript(INDEX_SQL)
         if first_time or conn.execute("SELECT 1 FROM meta WHERE key='piles'").fetchone() is None:
             set_meta(conn, "piles", str(DEFAULT_PILES))
             set_meta(conn, "virtual_bins", str(DEFAULT_VBINS))
@@ -112,47 +307,367 @@ def read_config(conn) -> Tuple[int, int, str]:
     salt  = get_meta(conn, "salt", DEFAULT_SALT)
     return piles, vbins, salt
 
-def insert_card(conn, card: dict, pile_index: int, image_url: Optional[str]) -> int:
-    name = card.get("name")
-    set_code = card.get("set")
+def read_layout(conn) -> dict:
+    """Keyword arguments for compute_pile_index: config plus the persisted vbin -> pile map.
+    Databases without a map use vbin % K, which is what the map defaults to."""
+    piles, vbins, salt = read_config(conn)
+    raw = get_meta(conn, "pile_map")
+    pile_map = json.loads(raw) if raw else None
+    if not vbinmap.valid_map(pile_map, vbins, piles):
+        pile_map = vbinmap.default_map(vbins, piles)
+    return {"K": piles, "virtual_bins": vbins, "salt": salt, "pile_map": pile_map}
+
+# Adding a printing that is already stored bumps its quantity instead of adding a row.
+INSERT_CARD_SQL = """INSERT INTO cards
+           (name, set_code, collector_number, scryfall_id, colors, mana_value, type_line, pile_index, image_url, added_at,
+            qty, vbin)
+           VALUES (?,?,?,?,?,?,?,?,?,?,?,?)
+           ON CONFLICT(scryfall_id) DO UPDATE SET qty = cards.qty + excluded.qty"""
+
+def card_row(card: dict, pile_index: int, image_url: Optional[str], added_at: Optional[str] = None,
+             qty: int = 1, vbin: Optional[int] = None) -> tuple:
     collector_number = card.get("collector_number")
-    scryfall_id = card.get("id")
-    colors = canonical_colors(card.get("color_identity") or card.get("colors") or [])
-    mana_value = card.get("cmc", card.get("mana_value"))
-    type_line = card.get("type_line")
-    added_at = datetime.utcnow().isoformat(timespec="seconds") + "Z"
-    cur = conn.execute(
-        """INSERT INTO cards
-           (name, set_code, collector_number, scryfall_id, colors, mana_value, type_line, pile_index, image_url, added_at)
-           VALUES (?,?,?,?,?,?,?,?,?,?)""",
-        (name, set_code, str(collector_number) if collector_number is not None else None,
-         scryfall_id, colors, mana_value, type_line, pile_index, image_url, added_at)
+    return (
+        card.get("name"),
+        card.get("set"),
+        str(collector_number) if collector_number is not None else None,
+        card.get("id"),
+        canonical_colors(card.get("color_identity") or card.get("colors") or []),
+        card.get("cmc", card.get("mana_value")),
+        card.get("type_line"),
+        pile_index,
+        image_url,
+        added_at or datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        qty,
+        vbin,
     )
-    return cur.lastrowid
+
+def insert_card(conn, card: dict, pile_index: int, image_url: Optional[str], qty: int = 1,
+                vbin: Optional[int] = None) -> Tuple[int, int]:
+    """-> (row id, copies now stored)."""
+    r = conn.execute(INSERT_CARD_SQL + " RETURNING id, qty",
+                     card_row(card, pile_index, image_url, qty=qty, vbin=vbin)).fetchone()
+    return r["id"], r["qty"]
+
+def remove_copies(conn, cid: int, qty: int = 1) -> Optional[int]:
+    """Take qty copies off a row, deleting it at zero. -> copies left, None if the row doesn't exist."""
+    r = conn.execute("UPDATE cards SET qty = qty - ? WHERE id = ? RETURNING qty", (qty, cid)).fetchone()
+    if r is None:
+        return None
+    if r["qty"] <= 0:
+        conn.execute("DELETE FROM cards WHERE id = ?", (cid,))
+        return 0
+    return r["qty"]
+
+def row_vbins(rows, layout: dict):
+    """Virtual bins for cards rows (needs name, mana_value, colors, type_line)."""
+    return compute_vbins([r["name"].split(" // ")[0] for r in rows], [r["mana_value"] for r in rows],
+                         [r["colors"] or "C" for r in rows], [r["type_line"] or "" for r in rows],
+                         virtual_bins=layout["virtual_bins"], salt=layout["salt"])
+
+def fill_vbins(conn):
+    """Store every row's virtual bin (schema v3 migration; also after salt/bin changes)."""
+    rows = conn.execute("SELECT id, name, mana_value, colors, type_line FROM cards").fetchall()
+    if rows:
+        conn.executemany("UPDATE cards SET vbin = ? WHERE id = ?",
+                         zip(row_vbins(rows, read_layout(conn)).tolist(), (r["id"] for r in rows)))
+
+def repile(conn) -> int:
+    """Recompute vbin and pile_index for every row from the current layout. -> rows that moved."""
+    layout = read_layout(conn)
+    rows = conn.execute("SELECT id, name, mana_value, colors, type_line, pile_index FROM cards").fetchall()
+    if not rows:
+        return 0
+    pile_map = layout["pile_map"]
+    vbins = row_vbins(rows, layout).tolist()
+    moved = sum(pile_map[v] != r["pile_index"] for r, v in zip(rows, vbins))
+    with conn:
+        conn.executemany("UPDATE cards SET pile_index = ?, vbin = ? WHERE id = ?",
+                         ((pile_map[v], v, r["id"]) for r, v in zip(rows, vbins)))
+    return moved
+
+def bin_weights(conn, virtual_bins: int) -> list[int]:
+    """Copies stored per virtual bin."""
+    weights = [0] * virtual_bins
+    for r in conn.execute("SELECT vbin, SUM(qty) AS c FROM cards WHERE vbin IS NOT NULL GROUP BY vbin"):
+        if 0 <= r["vbin"] < virtual_bins:
+            weights[r["vbin"]] = r["c"]
+    return weights
+
+def pile_heights(conn, piles: int) -> list[int]:
+    heights = [0] * piles
+    for r in conn.execute("SELECT pile_index, SUM(qty) AS c FROM cards GROUP BY pile_index"):
+        if 0 <= r["pile_index"] < piles:
+            heights[r["pile_index"]] = r["c"]
+    return heights
+
+def place_cards(conn, vbins: list, qtys: list) -> list[int]:
+    """Pile for each incoming card; call inside the transaction that inserts them.
+
+    The map and K are read here, after BEGIN IMMEDIATE, so a concurrent add or
+    repile can't leave us editing (and writing back) a stale copy. In balanced
+    mode a card whose bin holds nothing yet first hands that bin to the
+    currently lightest pile (vbins.place_bin), so piles stay level as the
+    collection grows without moving anything already stored.
+    """
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")   # read-decide-write must not interleave with another add
+    layout = read_layout(conn)
+    pile_map = layout["pile_map"]
+    if get_meta(conn, "balance_mode", "hash") != "balanced":
+        return [pile_map[v] for v in vbins]
+    occupied = {v for v in set(vbins)
+                if conn.execute("SELECT 1 FROM cards WHERE vbin = ? LIMIT 1", (v,)).fetchone()}
+    loads = pile_heights(conn, layout["K"])
+    changed = False
+    out = []
+    for v, q in zip(vbins, qtys):
+        if vbinmap.place_bin(pile_map, loads, v, v not in occupied):
+            changed = True
+        occupied.add(v)
+        loads[pile_map[v]] += q
+        out.append(pile_map[v])
+    if changed:
+        set_meta(conn, "pile_map", json.dumps(pile_map, separators=(",", ":")))
+    return out
+
+def plan_layout(conn, piles: int, new_map: list) -> Tuple[dict, list, dict]:
+    """What switching to `new_map` over `piles` piles would do. -> (new layout, moves, summary).
+
+    moves is [(src, dst, row), ...] for every stored printing whose pile changes;
+    summary carries bin/card move counts and pile heights (max/mean) before and after.
+    """
+    layout = read_layout(conn)
+    rows = conn.execute("SELECT id, name, set_code, collector_number, mana_value, colors, type_line, "
+                        "pile_index, qty FROM cards").fetchall()
+    weights = [0] * layout["virtual_bins"]
+    before = [0] * max(layout["K"], 1)
+    moves = []
+    for r, v in zip(rows, row_vbins(rows, layout).tolist() if rows else []):
+        weights[v] += r["qty"]
+        if 0 <= r["pile_index"] < len(before):
+            before[r["pile_index"]] += r["qty"]
+        if new_map[v] != r["pile_index"]:
+            moves.append((r["pile_index"], new_map[v], r))
+    summary = {
+        "piles": [layout["K"], piles],
+        "moved_bins": len(vbinmap.moved_bins(layout["pile_map"], new_map)),
+        "virtual_bins": layout["virtual_bins"],
+        "moved_cards": sum(r["qty"] for _, _, r in moves),
+        "total_cards": sum(weights),
+        "height_before": vbinmap.height_report(before),
+        "height_after": vbinmap.height_report(vbinmap.pile_loads(new_map, weights, piles)),
+    }
+    return dict(layout, K=piles, pile_map=new_map), moves, summary
+
+def plan_rebalance(conn, piles: int) -> Tuple[dict, list, dict]:
+    """Change to `piles` piles. The vbin -> pile map is re-levelled with
+    vbins.rebalance_map (by copies in balanced mode), so only about 1/K of the cards move."""
+    layout = read_layout(conn)
+    if get_meta(conn, "balance_mode", "hash") == "balanced":
+        new_map = vbinmap.balance_map(layout["pile_map"], piles, bin_weights(conn, layout["virtual_bins"]))
+    else:
+        new_map = vbinmap.rebalance_map(layout["pile_map"], piles)
+    return plan_layout(conn, piles, new_map)
+
+def plan_balance(conn, mode: str) -> Tuple[dict, list, dict]:
+    """Re-lay the current piles: "balanced" levels them by copy count (vbins.balance_map),
+    "hash" goes back to plain vbin % K."""
+    layout = read_layout(conn)
+    if mode == "balanced":
+        new_map = vbinmap.balance_map(layout["pile_map"], layout["K"], bin_weights(conn, layout["virtual_bins"]))
+    else:
+        new_map = vbinmap.default_map(layout["virtual_bins"], layout["K"])
+    return plan_layout(conn, layout["K"], new_map)
+
+def apply_layout(conn, layout: dict, moves: list, mode: Optional[str] = None):
+    """Write a planned layout; call inside the transaction that planned it (see run_layout)."""
+    set_meta(conn, "piles", str(layout["K"]))
+    set_meta(conn, "pile_map", json.dumps(layout["pile_map"], separators=(",", ":")))
+    if mode is not None:
+        set_meta(conn, "balance_mode", mode)
+    conn.executemany("UPDATE cards SET pile_index = ? WHERE id = ?", [(dst, r["id"]) for _, dst, r in moves])
+
+def run_layout(conn, plan, apply: bool, mode: Optional[str] = None) -> Tuple[list, dict]:
+    """plan(conn) -> (layout, moves, summary), written when apply is set. -> (moves, summary).
+
+    Applying plans and writes under one BEGIN IMMEDIATE, like place_cards, so an add
+    can't land a new bin on the old map between reading the layout and replacing it.
+    """
+    if not apply:
+        _, moves, summary = plan(conn)
+        return moves, summary
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        layout, moves, summary = plan(conn)
+        apply_layout(conn, layout, moves, mode)
+    return moves, summary
+
+def move_row(dst: int, r) -> dict:
+    return {"to": dst, "id": r["id"], "name": r["name"], "set": r["set_code"],
+            "collector_number": r["collector_number"], "qty": r["qty"]}
+
+def plan_payload(moves: list, summary: dict, applied: bool) -> dict:
+    grouped = vbinmap.group_moves(moves)
+    return dict(summary, applied=applied,
+                moves={src: [move_row(dst, r) for dst, r in ms] for src, ms in grouped.items()})
+
+# -------------------- Stats --------------------
+# The cached /api/stats payload is reused until the database changes. It is keyed on
+# PRAGMA data_version of a connection that never writes: that moves whenever any other
+# connection commits, including CLI import/repile/rebalance runs in another process.
+_stats_lock = threading.Lock()
+_stats_cache = {"path": None, "conn": None, "version": None, "payload": None}
+
+def compute_stats(conn) -> dict:
+    piles, vbins, salt = read_config(conn)
+    counts = [0] * piles
+    mixes = [[] for _ in range(piles)]
+    printings = 0
+    for r in conn.execute("SELECT pile_index, colors, SUM(qty) AS c, COUNT(*) AS n FROM cards "
+                          "GROUP BY pile_index, colors"):
+        i = r["pile_index"]
+        if 0 <= i < piles:
+            counts[i] += r["c"]
+            printings += r["n"]
+            mixes[i].append((r["colors"] or "C", r["c"]))
+    total = sum(counts)
+    height = vbinmap.height_report(counts)
+    cmix = {}
+    for i, mix in enumerate(mixes):
+        mix.sort(key=lambda x: -x[1])
+        cmix[i] = ", ".join(f"{colors}:{c}" for colors, c in mix) or "-"
+    return {"total": total, "printings": printings, "piles": piles,
+            "balance_mode": get_meta(conn, "balance_mode", "hash"), "height": height, "virtual_bins": vbins, "salt": salt,
+            "per_pile": list(enumerate(counts)), "color_mix": cmix}
+
+def cached_stats() -> dict:
+    with _stats_lock:
+        if _stats_cache["path"] != DB_PATH:
+            if _stats_cache["conn"] is not None:
+                _stats_cache["conn"].close()
+            _stats_cache.update(path=DB_PATH, conn=connect_db(), version=None)
+        conn = _stats_cache["conn"]
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if _stats_cache["version"] != version:
+            _stats_cache["payload"] = compute_stats(conn)
+            _stats_cache["version"] = version
+        return _stats_cache["payload"]
 
 # -------------------- Scryfall helpers --------------------
-def fetch_card_scryfall(name: Optional[str]=None, set_code: Optional[str]=None, number: Optional[str]=None) -> dict:
+def fetch_card_local(name: Optional[str]=None, set_code: Optional[str]=None, number: Optional[str]=None) -> Optional[dict]:
+    store = carddb.get_store(BULK_DATA_PATH)
+    if store is None:
+        return None
+    if set_code and number:
+        return store.by_set_number(set_code, number)
+    return store.by_name(name) if name else None
+
+def snap_name(name: str) -> str:
+    """Closest known card name when the local index is confident, else name unchanged."""
+    index = carddb.get_name_index(BULK_DATA_PATH)
+    if index is None or not name:
+        return name
+    return index.snap(name) or name
+
+# The lookups below are split into "answer locally or say what to ask Scryfall" and
+# "handle Scryfall's reply", so magisort_asgi.py can make the request asynchronously.
+def card_lookup(name: Optional[str]=None, set_code: Optional[str]=None,
+                number: Optional[str]=None) -> Tuple[Optional[dict], str, str, dict]:
+    """-> (card, None, None, None) from the local store or cache, else (None, cache key, url, params)."""
+    local = fetch_card_local(name=name, set_code=set_code, number=number)
+    if local is not None:
+        return local, None, None, None
+    if name and not (set_code and number):
+        name = snap_name(name)
+        local = fetch_card_local(name=name)
+        if local is not None:
+            return local, None, None, None
     if set_code and number:
-        url = SCRY_SETNUM_URL.format(code=set_code.lower(), number=str(number))
-        r = requests.get(url, timeout=HTTP_TIMEOUT)
+        key = scrycache.setnum_key(set_code, number)
+    elif name:
+        key = scrycache.named_key(name)
     else:
-        if not name:
-            raise ValueError("Provide name or set+number")
-        r = requests.get(SCRY_NAMED_URL, params={"fuzzy": name}, timeout=HTTP_TIMEOUT)
-    if r.status_code != 200:
-        raise RuntimeError(f"Scryfall error {r.status_code}: {r.text}")
-    data = r.json()
+        raise ValueError("Provide name or set+number")
+    cached = scrycache.get_cache(CACHE_PATH).get(key)
+    if cached is not None:
+        return cached, None, None, None
+    if set_code and number:
+        return None, key, SCRY_SETNUM_URL.format(code=set_code.lower(), number=str(number)), {}
+    return None, key, SCRY_NAMED_URL, {"fuzzy": name}
+
+def card_from_response(key: str, status: int, text: str) -> dict:
+    if status != 200:
+        raise RuntimeError(f"Scryfall error {status}: {text}")
+    data = json.loads(text)
     if data.get("object") == "error":
         raise RuntimeError(data.get("details", "Scryfall error"))
+    data = carddb.slim_card(data)
+    scrycache.get_cache(CACHE_PATH).put(key, data)
     return data
 
-def autocomplete_names(prefix: str) -> list[str]:
+def fetch_card_scryfall(name: Optional[str]=None, set_code: Optional[str]=None, number: Optional[str]=None) -> dict:
+    card, key, url, params = card_lookup(name, set_code, number)
+    if card is not None:
+        return card
+    r = scryhttp.get(url, params=params, timeout=HTTP_TIMEOUT,
+                     retries=scryhttp.INTERACTIVE_RETRIES, retry_timeouts=False)
+    return card_from_response(key, r.status_code, r.text)
+
+def fetch_cards_scryfall(specs: list[dict]) -> list[Optional[dict]]:
+    """Batched fetch_card_scryfall over [{"name", "set", "number"}, ...].
+
+    Local store and cache first, then /cards/collection in groups of 75;
+    results are in input order, None where nothing matched.
+    """
+    cache = scrycache.get_cache(CACHE_PATH)
+    found: list[Optional[dict]] = [None] * len(specs)
+    missing = []
+    for i, spec in enumerate(specs):
+        name, set_code, number = spec.get("name"), spec.get("set"), spec.get("number")
+        if not name and not (set_code and number):
+            continue
+        card = fetch_card_local(name=name, set_code=set_code, number=number)
+        key = scrycache.setnum_key(set_code, number) if set_code and number else scrycache.named_key(name or "")
+        if card is None:
+            card = cache.get(key)
+        if card is None:
+            missing.append((i, key))
+        else:
+            found[i] = card
+    if missing:
+        idents = [scryclient.identifier(name=specs[i].get("name"), set_code=specs[i].get("set"),
+                                        number=specs[i].get("number")) for i, _ in missing]
+        for (i, key), card in zip(missing, scryclient.resolve_collection(idents)):
+            if card is not None:
+                cache.put(key, card)
+                found[i] = card
+    return found
+
+def autocomplete_lookup(prefix: str) -> Tuple[Optional[list], str, dict]:
+    """-> (names, None, None) when answerable without Scryfall, else (None, cache key, params)."""
     if not prefix.strip():
+        return [], None, None
+    key = scrycache.autocomplete_key(prefix)
+    cached = scrycache.get_cache(CACHE_PATH).get(key)
+    if cached is not None:
+        return cached, None, None
+    return None, key, {"q": prefix, "include_extras": "true"}
+
+def names_from_response(key: str, status: int, text: str) -> list[str]:
+    if status != 200:
         return []
-    r = requests.get(SCRY_AUTOCOMPLETE_URL, params={"q": prefix, "include_extras": "true"}, timeout=HTTP_TIMEOUT)
-    if r.status_code != 200:
-        return []
-    return r.json().get("data", [])[:20]
+    names = json.loads(text).get("data", [])[:20]
+    scrycache.get_cache(CACHE_PATH).put(key, names, ttl=scrycache.AUTOCOMPLETE_TTL)
+    return names
+
+def autocomplete_names(prefix: str) -> list[str]:
+    names, key, params = autocomplete_lookup(prefix)
+    if names is not None:
+        return names
+    r = scryhttp.get(SCRY_AUTOCOMPLETE_URL, params=params, timeout=HTTP_TIMEOUT,
+                     retries=scryhttp.INTERACTIVE_RETRIES, retry_timeouts=False)
+    return names_from_response(key, r.status_code, r.text)
 
 def extract_image_url(card: dict) -> Optional[str]:
     if "image_uris" in card and card["image_uris"]:
@@ -170,6 +685,120 @@ def card_key_fields(card: dict) -> Tuple[str, float, Iterable[str], str]:
     type_line = card.get("type_line", "")
     return name, mv, colors, type_line
 
+# -------------------- Bulk import --------------------
+IMPORT_CHUNK = 750   # specs resolved per progress step (10 /cards/collection requests at most)
+
+# "4 Lightning Bolt", "4x Lightning Bolt (M10) 146", "Lightning Bolt"; a name needs at least one letter
+_DECK_LINE = re.compile(r"^\s*(?:(\d+)\s*[xX]?\s+)?(.*?[^\W\d_].*?)(?:\s+\(([A-Za-z0-9]+)\)(?:\s+(\S+))?)?\s*$")
+_DECK_SKIP = {"deck", "sideboard", "commander", "companion", "maybeboard"}
+_CSV_ALIASES = {
+    "name": ("name", "card", "card name"),
+    "set": ("set", "set code", "set_code", "edition"),
+    "number": ("number", "collector number", "collector_number", "cn"),
+    "qty": ("qty", "quantity", "count", "amount"),
+}
+
+def detect_import_format(text: str) -> str:
+    first = next((ln.strip() for ln in text.splitlines() if ln.strip()), "")
+    if first.startswith("{"):
+        return "ndjson"
+    if "," in first and any(a in [c.strip().lower() for c in first.split(",")] for a in _CSV_ALIASES["name"]):
+        return "csv"
+    return "decklist"
+
+def _qty(v) -> int:
+    try:
+        return max(int(v), 0)
+    except (TypeError, ValueError):
+        return 1
+
+def parse_import(text: str, fmt: Optional[str] = None) -> Tuple[list, list]:
+    """-> (entries, failures); entries are (line_no, spec, qty) with spec = {name, set, number}."""
+    fmt = fmt or detect_import_format(text)
+    entries, failures = [], []
+    if fmt == "csv":
+        reader = csv.reader(io.StringIO(text))
+        header = [h.strip().lower() for h in next(reader, [])]
+        col = {k: next((header.index(a) for a in aliases if a in header), None) for k, aliases in _CSV_ALIASES.items()}
+        if col["name"] is None and (col["set"] is None or col["number"] is None):
+            return [], [{"line": 1, "text": ",".join(header), "error": "CSV needs a name or set+number column"}]
+        for line_no, row in enumerate(reader, start=2):
+            get = lambda k: row[col[k]].strip() if col[k] is not None and col[k] < len(row) else None
+            spec = {"name": get("name") or None, "set": get("set") or None, "number": get("number") or None}
+            if not spec["name"] and not (spec["set"] and spec["number"]):
+                if any(c.strip() for c in row):
+                    failures.append({"line": line_no, "text": ",".join(row), "error": "No name or set+number"})
+                continue
+            entries.append((line_no, spec, _qty(get("qty")) if col["qty"] is not None else 1))
+    elif fmt == "ndjson":
+        for line_no, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                d = json.loads(line)
+                spec = {"name": d.get("name"), "set": d.get("set"),
+                        "number": str(d["number"]) if d.get("number") is not None else None}
+            except (ValueError, AttributeError) as e:
+                failures.append({"line": line_no, "text": line, "error": f"Bad JSON: {e}"})
+                continue
+            if not spec["name"] and not (spec["set"] and spec["number"]):
+                failures.append({"line": line_no, "text": line, "error": "No name or set+number"})
+                continue
+            entries.append((line_no, spec, _qty(d.get("qty", d.get("quantity", 1)))))
+    else:
+        for line_no, line in enumerate(text.splitlines(), start=1):
+            stripped = line.strip()
+            if not stripped or stripped.startswith(("#", "//")) or stripped.rstrip(":").lower() in _DECK_SKIP:
+                continue
+            m = _DECK_LINE.match(stripped)
+            if not m:
+                failures.append({"line": line_no, "text": line, "error": "Unparseable line"})
+                continue
+            qty, name, set_code, number = m.groups()
+            entries.append((line_no, {"name": name, "set": set_code, "number": number}, _qty(qty or 1)))
+    return entries, failures
+
+def import_cards(conn, entries: list, progress=None) -> dict:
+    """Resolve entries in batches, compute piles and insert everything in one transaction.
+
+    progress(done, total) is called after each resolved chunk.
+    """
+    t0 = time.perf_counter()
+    layout = read_layout(conn)
+    added_at = datetime.utcnow().isoformat(timespec="seconds") + "Z"
+    pending, vbins, failures = [], [], []
+    total = len(entries)
+    for i in range(0, total, IMPORT_CHUNK):
+        chunk = entries[i:i + IMPORT_CHUNK]
+        try:
+            cards = fetch_cards_scryfall([spec for _, spec, _ in chunk])
+        except Exception as e:
+            # Scryfall unreachable: keep whatever the local store can answer, fail the rest
+            cards = [fetch_card_local(name=spec.get("name"), set_code=spec.get("set"), number=spec.get("number"))
+                     for _, spec, _ in chunk]
+            err = str(e)
+        else:
+            err = "Card not found"
+        resolved = []
+        for (line_no, spec, qty), card in zip(chunk, cards):
+            if card is None:
+                failures.append({"line": line_no, "text": spec.get("name") or f"{spec.get('set')} {spec.get('number')}",
+                                 "error": err})
+            elif qty:
+                resolved.append((card, qty))
+        if resolved:
+            keys = list(zip(*(card_key_fields(card) for card, _ in resolved)))
+            vbins.extend(compute_vbins(*keys, virtual_bins=layout["virtual_bins"], salt=layout["salt"]).tolist())
+            pending.extend(resolved)
+        if progress:
+            progress(min(i + IMPORT_CHUNK, total), total)
+    with conn:
+        piles = place_cards(conn, vbins, [qty for _, qty in pending])
+        conn.executemany(INSERT_CARD_SQL, (card_row(card, p, extract_image_url(card), added_at, qty, v)
+                                           for (card, qty), p, v in zip(pending, piles, vbins)))
+    return {"lines": total, "imported": sum(qty for _, qty in pending), "failed": failures,
+            "seconds": round(time.perf_counter() - t0, 3)}
+
 # -------------------- Routes: UI --------------------
 INDEX_HTML = """
 <!doctype html>
@@ -192,7 +821,7 @@ INDEX_HTML = """
     input, select, button { background:#0f1330; color:var(--text); border:1px solid #2a2f55; border-radius:8px; padding:10px 12px; }
     button { background: var(--accent); color:#0b1024; border:none; font-weight:600; cursor:pointer; }
     button:disabled { opacity:0.6; cursor:not-allowed; }
-    .grid { display:grid; grid-template-columns: 110px 1fr 70px 90px 70px 80px; gap:6px; padding:8px; }
+    .grid { display:grid; grid-template-columns: 110px 1fr 50px 70px 90px 70px 80px; gap:6px; padding:8px; }
     .grid.header { font-weight:700; color:var(--muted); }
     .rowitem { padding:8px 10px; border:1px solid #2a2f55; border-radius:8px; background:#101437; }
     .rowitem.clickable { cursor:pointer; color:#9ec0ff; }
@@ -233,9 +862,12 @@ INDEX_HTML = """
 
     <div style="margin-top:12px;">
       <div class="grid header">
-        <div>ID</div><div>Name</div><div>Set</div><div>Number</div><div>MV</div><div>Colors</div>
+        <div>ID</div><div>Name</div><div>Qty</div><div>Set</div><div>Number</div><div>MV</div><div>Colors</div>
       </div>
       <div id="listBox"></div>
+      <div style="margin-top:8px; text-align:center;">
+        <button id="moreBtn" onclick="loadMore()" style="display:none;">Load more</button>
+      </div>
     </div>
   </div>
 
@@ -248,7 +880,7 @@ INDEX_HTML = """
     <div style="margin-top:12px;">
       <div class="stats" id="infoBox">Select a card to preview.</div>
       <div style="margin-top:8px; text-align:right;">
-        <button class="del" id="removeBtn" onclick="removeSelected()" disabled>Remove Selected</button>
+        <button class="del" id="removeBtn" onclick="removeSelected()" disabled>Remove One Copy</button>
       </div>
     </div>
   </div>
@@ -298,20 +930,27 @@ document.getElementById('name').addEventListener('input', (e)=>{
   }, 180);
 });
 
+let lastStats = null;
+
 async function init() {
   await refreshStats();
-  await populatePileSelect();
+  populatePileSelect();
   await loadPile();
 }
 async function refreshStats(){
-  const s = await api('/api/stats');
+  lastStats = await api('/api/stats');
+  renderStats();
+}
+function renderStats(){
+  const s = lastStats;
+  if (!s) return;
   document.getElementById('statsBox').textContent =
-    `Total cards: ${s.total}\nPiles: ${s.piles} | Virtual bins: ${s.virtual_bins} | Salt: ${s.salt}\n\nPer-pile counts:\n` +
+    `Total cards: ${s.total} (${s.printings} printings)\nPiles: ${s.piles} | Virtual bins: ${s.virtual_bins} | Salt: ${s.salt}\nLayout: ${s.balance_mode} | tallest pile ${s.height.max} vs mean ${s.height.mean}\n\nPer-pile counts:\n` +
     s.per_pile.map(([i,c])=>`  Pile ${i}: ${c}`).join('\\n') +
     `\\n\\nSelected pile ${selectedPile} color mix: ${s.color_mix[selectedPile] || '-'}`;
 }
-async function populatePileSelect(){
-  const s = await api('/api/stats');
+function populatePileSelect(){
+  const s = lastStats;
   const sel = document.getElementById('pileSel');
   sel.innerHTML = '';
   for (let i=0;i<s.piles;i++){
@@ -321,13 +960,11 @@ async function populatePileSelect(){
   }
   sel.value = selectedPile;
 }
-async function loadPile(){
-  const val = document.getElementById('pileSel').value;
-  selectedPile = parseInt(val || '0');
-  const data = await api('/api/list?pile=' + selectedPile);
-  const box = document.getElementById('listBox');
-  box.innerHTML = '';
-  data.cards.forEach(row=>{
+let nextCursor = null;
+
+function renderRows(cards){
+  const frag = document.createDocumentFragment();
+  cards.forEach(row=>{
     const wrap = document.createElement('div');
     wrap.className = 'grid';
     wrap.style.alignItems = 'center';
@@ -335,19 +972,39 @@ async function loadPile(){
     wrap.innerHTML = `
       <div class="rowitem">${row.id}</div>
       <div class="rowitem clickable">${row.name}</div>
+      <div class="rowitem">${row.qty}</div>
       <div class="rowitem">${(row.set||'').toUpperCase()}</div>
       <div class="rowitem">${row.collector_number||''}</div>
       <div class="rowitem">${row.mana_value ?? ''}</div>
       <div class="rowitem">${row.colors || 'C'}</div>
     `;
-    box.appendChild(wrap);
+    frag.appendChild(wrap);
   });
+  document.getElementById('listBox').appendChild(frag);
+}
+async function fetchPage(){
+  let url = '/api/list?pile=' + selectedPile;
+  if (nextCursor) url += '&cursor=' + encodeURIComponent(nextCursor);
+  const data = await api(url);
+  renderRows(data.cards);
+  nextCursor = data.next_cursor;
+  document.getElementById('moreBtn').style.display = nextCursor ? 'inline-block' : 'none';
+}
+async function loadMore(){
+  if (nextCursor) await fetchPage();
+}
+async function loadPile(){
+  const val = document.getElementById('pileSel').value;
+  selectedPile = parseInt(val || '0');
+  document.getElementById('listBox').innerHTML = '';
+  nextCursor = null;
+  await fetchPage();
   document.getElementById('pileBadge').textContent = 'Pile: -';
   document.getElementById('cardImg').src = '';
   document.getElementById('infoBox').textContent = 'Select a card to preview.';
   selectedId = null;
   document.getElementById('removeBtn').disabled = true;
-  await refreshStats();
+  renderStats();
 }
 
 async function addCard(){
@@ -359,13 +1016,14 @@ async function addCard(){
   try{
     const body = JSON.stringify({ name: name || null, set: setc || null, number: num || null });
     const res = await api('/api/add', { method:'POST', body });
-    alert(`Added [${res.id}] ${res.name} → Pile ${res.pile}`);
+    alert(`Added [${res.id}] ${res.name} → Pile ${res.pile} (now ${res.qty})`);
     document.getElementById('name').value=''; document.getElementById('set').value=''; document.getElementById('num').value='';
+    await refreshStats();
     await loadPile();
   }catch(e){
     alert('Add failed: ' + e.message);
     // Still reload – in case insert succeeded but response failed
-    try { await loadPile(); } catch(_) {}
+    try { await refreshStats(); await loadPile(); } catch(_) {}
   }finally{
     document.getElementById('addBtn').disabled = false;
   }
@@ -384,6 +1042,7 @@ Set: ${(res.set||'-').toUpperCase()}  No: ${res.collector_number||'-'}
 Mana Value: ${res.mana_value}
 Colors: ${res.colors||'C'}
 Type: ${res.type_line}
+Copies: ${res.qty}
 Scryfall ID: ${res.scryfall_id}`;
   }catch(e){
     alert('Preview failed: ' + e.message);
@@ -392,9 +1051,10 @@ Scryfall ID: ${res.scryfall_id}`;
 
 async function removeSelected(){
   if (!selectedId){ alert('Select a card first.'); return; }
-  if (!confirm('Remove card id ' + selectedId + '?')) return;
+  if (!confirm('Remove one copy of card id ' + selectedId + '?')) return;
   try{
     await api('/api/remove', { method:'POST', body: JSON.stringify({ id: selectedId }) });
+    await refreshStats();
     await loadPile();
   }catch(e){
     alert('Remove failed: ' + e.message);
@@ -431,22 +1091,96 @@ def api_add():
             return jsonify({"error": "Require name or set+number"}), 400
 
         card = fetch_card_scryfall(name=name, set_code=setc, number=num)
-        nm, mv, colors, type_line = card_key_fields(card)
-        img_url = extract_image_url(card)  # capture now; no need to re-fetch later
-        conn = open_db()
-        piles, vbins, salt = read_config(conn)
-        pile = compute_pile_index(name=nm, mana_value=mv, colors=colors, type_line=type_line,
-                                  K=piles, virtual_bins=vbins, salt=salt)
-        with conn:
-            rowid = insert_card(conn, card, pile, img_url)
-        return jsonify({
-            "id": rowid,
-            "name": card.get("name"),
-            "set": card.get("set"),
-            "collector_number": card.get("collector_number"),
-            "scryfall_id": card.get("id"),
-            "pile": pile
-        }), 200
+        return jsonify(add_card(open_db(), card)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def add_card(conn, card: dict) -> dict:
+    """Store one copy of a resolved card. -> the /api/add response body."""
+    nm, mv, colors, type_line = card_key_fields(card)
+    img_url = extract_image_url(card)  # capture now; no need to re-fetch later
+    layout = read_layout(conn)
+    vbin = compute_vbin(name=nm, mana_value=mv, colors=colors, type_line=type_line,
+                        virtual_bins=layout["virtual_bins"], salt=layout["salt"])
+    with conn:
+        pile = place_cards(conn, [vbin], [1])[0]
+        rowid, qty = insert_card(conn, card, pile, img_url, vbin=vbin)
+    return {
+        "id": rowid,
+        "qty": qty,
+        "name": card.get("name"),
+        "set": card.get("set"),
+        "collector_number": card.get("collector_number"),
+        "scryfall_id": card.get("id"),
+        "pile": pile
+    }
+
+@app.route("/api/import", methods=["POST"])
+def api_import():
+    """Decklist, CSV or NDJSON as the raw body (or JSON {"text", "format"}); ?format= overrides detection.
+    With ?stream=1 the reply is NDJSON progress events followed by the summary."""
+    try:
+        data = request.get_json(silent=True) if request.is_json else None
+        text = data.get("text", "") if isinstance(data, dict) else request.get_data(as_text=True)
+        fmt = request.args.get("format") or (data.get("format") if isinstance(data, dict) else None)
+        if fmt not in (None, "decklist", "csv", "ndjson"):
+            return jsonify({"error": f"Unknown format {fmt}"}), 400
+        entries, failures = parse_import(text, fmt)
+
+        if request.args.get("stream"):
+            def generate():
+                events = queue.Queue()
+                result = {}
+
+                def work():
+                    # own connection: the request's one goes back to the pool if the client disconnects
+                    conn = connect_db()
+                    try:
+                        result.update(import_cards(conn, entries, lambda d, t: events.put({"done": d, "total": t})))
+                    except Exception as e:
+                        result["error"] = str(e)
+                    finally:
+                        conn.close()
+                    events.put(None)
+
+                threading.Thread(target=work, daemon=True).start()
+                while (ev := events.get()) is not None:
+                    yield json.dumps(ev) + "\n"
+                result["failed"] = failures + result.get("failed", [])
+                yield json.dumps(result) + "\n"
+            return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+        result = import_cards(open_db(), entries)
+        result["failed"] = failures + result["failed"]
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/rebalance", methods=["POST"])
+def api_rebalance():
+    """{"piles": K, "apply": bool} -> summary plus the move list grouped by source pile.
+    Without apply nothing is written (a dry run)."""
+    try:
+        data = request.get_json(force=True, silent=True) or {}
+        piles = int(data.get("piles", 0))
+        if piles < 1:
+            return jsonify({"error": "piles must be a positive integer"}), 400
+        moves, summary = run_layout(open_db(), lambda conn: plan_rebalance(conn, piles), bool(data.get("apply")))
+        return jsonify(plan_payload(moves, summary, bool(data.get("apply")))), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/balance", methods=["POST"])
+def api_balance():
+    """{"mode": "balanced"|"hash", "apply": bool} -> same shape as /api/rebalance, with pile
+    heights before/after. Applying also switches how new cards are placed (see place_cards)."""
+    try:
+        data = request.get_json(force=True, silent=True) or {}
+        mode = data.get("mode", "balanced")
+        if mode not in ("balanced", "hash"):
+            return jsonify({"error": f"Unknown mode {mode}"}), 400
+        moves, summary = run_layout(open_db(), lambda conn: plan_balance(conn, mode), bool(data.get("apply")), mode)
+        return jsonify(plan_payload(moves, summary, bool(data.get("apply")))), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -457,32 +1191,167 @@ def api_remove():
         cid = data.get("id")
         if not cid:
             return jsonify({"error": "Missing id"}), 400
+        qty = data.get("qty", 1)
+        if isinstance(qty, (bool, float)):
+            return jsonify({"error": "qty must be an integer"}), 400
+        try:
+            qty = int(qty)
+        except (TypeError, ValueError):
+            return jsonify({"error": "qty must be an integer"}), 400
+        if qty < 1:
+            return jsonify({"error": "qty must be positive"}), 400
         conn = open_db()
         with conn:
-            cur = conn.execute("DELETE FROM cards WHERE id=?", (cid,))
-            ok = cur.rowcount > 0
-        return jsonify({"removed": ok}), 200
+            left = remove_copies(conn, cid, qty)
+        return jsonify({"removed": left is not None, "qty": left or 0}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def encode_cursor(name: str, cid: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([name, cid]).encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    name, cid = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    return str(name), int(cid)
+
+def list_pile(conn, pile: int, after: Optional[Tuple[str, int]] = None, limit: Optional[int] = None):
+    """Cursor over a pile in (name NOCASE, id) order, starting after `after`.
+
+    The keyset predicate is written as a plain range on name plus a tiebreak so
+    SQLite seeks idx_cards_pile_name instead of skipping rows (cost is O(page),
+    not O(offset)).
+    """
+    sql = ("SELECT id, name, set_code AS \"set\", collector_number, mana_value, colors, type_line, qty "
+           "FROM cards WHERE pile_index = ?")
+    params: list = [pile]
+    if after is not None:
+        sql += " AND name >= ? COLLATE NOCASE AND (name > ? COLLATE NOCASE OR id > ?)"
+        params += [after[0], after[0], after[1]]
+    sql += " ORDER BY name COLLATE NOCASE, id"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return conn.execute(sql, params)
+
+def list_row(r) -> dict:
+    return {
+        "id": r["id"], "name": r["name"], "set": r["set"],
+        "collector_number": r["collector_number"], "mana_value": r["mana_value"],
+        "colors": r["colors"], "type_line": r["type_line"], "qty": r["qty"]
+    }
+
 @app.route("/api/list")
 def api_list():
+    """One page of a pile: ?pile=&limit=&cursor=  ->  {"cards": [...], "next_cursor": str|null}.
+    With ?format=ndjson the rest of the pile (from cursor, if given) is streamed, one card per line."""
     try:
         pile = int(request.args.get("pile", "0"))
     except ValueError:
         pile = 0
+    try:
+        limit = min(max(int(request.args.get("limit", LIST_PAGE_SIZE)), 1), LIST_MAX_PAGE_SIZE)
+    except ValueError:
+        limit = LIST_PAGE_SIZE
+    cursor = request.args.get("cursor")
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except (ValueError, TypeError):
+        return jsonify({"error": "Bad cursor"}), 400
     conn = open_db()
-    rows = conn.execute(
-        "SELECT id, name, set_code AS set, collector_number, mana_value, colors, type_line "
-        "FROM cards WHERE pile_index = ? ORDER BY name COLLATE NOCASE",
-        (pile,)
-    ).fetchall()
-    cards = [{
-        "id": r["id"], "name": r["name"], "set": r["set"],
-        "collector_number": r["collector_number"], "mana_value": r["mana_value"],
-        "colors": r["colors"], "type_line": r["type_line"]
-    } for r in rows]
-    return jsonify({"cards": cards}), 200
+
+    if request.args.get("format") == "ndjson":
+        def generate():
+            cur = list_pile(conn, pile, after)
+            while True:
+                rows = cur.fetchmany(limit)
+                if not rows:
+                    break
+                yield "".join(json.dumps(list_row(r), ensure_ascii=False) + "\n" for r in rows)
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    rows = list_pile(conn, pile, after, limit + 1).fetchall()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1]["name"], rows[-1]["id"]) if more else None
+    return jsonify({"cards": [list_row(r) for r in rows], "next_cursor": next_cursor}), 200
+
+COLOR_LETTERS = "WUBRG"
+
+def color_values(include: str) -> list[str]:
+    """Every canonical colors value containing all the letters in `include`
+    ("C" alone = colorless), so the filter is an IN list on idx_cards_colors_mv."""
+    want = set(include.upper()) - {"C"}
+    if not want and "C" in include.upper():
+        return ["C"]
+    out = []
+    for mask in range(1, 1 << len(COLOR_LETTERS)):
+        combo = {c for i, c in enumerate(COLOR_LETTERS) if mask >> i & 1}
+        if want <= combo:
+            out.append(canonical_colors(combo))
+    return out
+
+def search_where(colors: str = "", mv_min: Optional[float] = None, mv_max: Optional[float] = None,
+                 types: Iterable[str] = (), set_code: Optional[str] = None) -> Tuple[str, list]:
+    """WHERE clause + params for a combined filter; every term can be answered from an index."""
+    terms, params = [], []
+    if colors:
+        vals = color_values(colors)
+        terms.append(f"colors IN ({','.join('?' * len(vals))})")
+        params += vals
+    if mv_min is not None:
+        terms.append("mana_value >= ?")
+        params.append(mv_min)
+    if mv_max is not None:
+        terms.append("mana_value <= ?")
+        params.append(mv_max)
+    if set_code:
+        terms.append("set_code = ?")
+        params.append(set_code.lower())
+    words = [w for t in types for w in norm(t).split()]
+    if words:
+        terms.append("id IN (SELECT rowid FROM cards_types WHERE cards_types MATCH ?)")
+        params.append(" AND ".join(f'"{w}"' for w in words))
+    return (" WHERE " + " AND ".join(terms)) if terms else "", params
+
+def search_cards(conn, limit: int = LIST_PAGE_SIZE, **filters) -> Tuple[list, dict]:
+    """-> (first `limit` matching rows by pile then name, {pile: {"printings", "copies"}} over all matches)."""
+    where, params = search_where(**filters)
+    rows = conn.execute("SELECT id, name, set_code AS \"set\", collector_number, mana_value, colors, type_line, qty, "
+                        f"pile_index FROM cards{where} ORDER BY pile_index, name COLLATE NOCASE, id LIMIT ?",
+                        params + [limit]).fetchall()
+    piles = {r["pile_index"]: {"printings": r["n"], "copies": r["c"]} for r in conn.execute(
+        f"SELECT pile_index, COUNT(*) AS n, SUM(qty) AS c FROM cards{where} GROUP BY pile_index", params)}
+    return rows, piles
+
+def _opt_float(v: Optional[str]) -> Optional[float]:
+    if v in (None, ""):
+        return None
+    f = float(v)
+    if not math.isfinite(f):
+        raise ValueError(f"not a finite number: {v}")
+    return f
+
+@app.route("/api/search")
+def api_search():
+    """?colors=U&type=instant&mv_min=&mv_max=2&set=&limit=  ->  {"cards": [...], "piles": {...}, "total": n}.
+    colors must all be present (U matches UR; C = colorless); type words must all appear in the type line."""
+    try:
+        mv_min = _opt_float(request.args.get("mv_min"))
+        mv_max = _opt_float(request.args.get("mv_max"))
+        limit = min(max(int(request.args.get("limit", LIST_PAGE_SIZE)), 1), LIST_MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": "mv_min, mv_max and limit must be numbers"}), 400
+    try:
+        types = [t for v in request.args.getlist("type") for t in v.replace(",", " ").split()]
+        rows, piles = search_cards(open_db(), limit, colors=request.args.get("colors", "").strip(),
+                                   mv_min=mv_min, mv_max=mv_max, types=types, set_code=request.args.get("set"))
+        return jsonify({"cards": [dict(list_row(r), pile=r["pile_index"]) for r in rows],
+                        "piles": piles, "total": sum(p["printings"] for p in piles.values())}), 200
+    except sqlite3.OperationalError as e:
+        # FTS5 rejects some type terms (syntax errors); that's the query, not the server
+        return jsonify({"error": f"Bad search: {e}"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
 @app.route("/api/preview/<int:cid>")
 def api_preview(cid: int):
@@ -502,6 +1371,7 @@ def api_preview(cid: int):
             "colors": r["colors"] or "C",
             "type_line": r["type_line"],
             "pile": r["pile_index"],
+            "qty": r["qty"],
             "image_url": r["image_url"]
         }), 200
     except Exception as e:
@@ -510,29 +1380,91 @@ def api_preview(cid: int):
 @app.route("/api/stats")
 def api_stats():
     try:
-        conn = open_db()
-        piles, vbins, salt = read_config(conn)
-        total = conn.execute("SELECT COUNT(*) AS c FROM cards").fetchone()["c"]
-        per = []
-        cmix = {}
-        for i in range(piles):
-            c = conn.execute("SELECT COUNT(*) AS c FROM cards WHERE pile_index=?", (i,)).fetchone()["c"]
-            per.append((i, c))
-            rows = conn.execute(
-                "SELECT colors, COUNT(*) AS c FROM cards WHERE pile_index=? GROUP BY colors ORDER BY c DESC",
-                (i,)
-            ).fetchall()
-            cmix[i] = ", ".join(f"{(rr['colors'] or 'C')}:{rr['c']}" for rr in rows) or "-"
-        return jsonify({"total": total, "piles": piles, "virtual_bins": vbins, "salt": salt,
-                        "per_pile": per, "color_mix": cmix}), 200
+        return jsonify(cached_stats()), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/api/cache")
+def api_cache():
+    return jsonify(scrycache.get_cache(CACHE_PATH).stats()), 200
+
+@app.route("/api/scryfall")
+def api_scryfall():
+    """Per-endpoint Scryfall request counts, retries, errors and latency (see scryhttp)."""
+    return jsonify(scryhttp.shared_stats().snapshot()), 200
+
 @app.route("/download-db")
 def download_db():
     return send_from_directory(".", DB_PATH, as_attachment=True)
 
 # -------------------- Main --------------------
+def cli_import(path: str, fmt: Optional[str] = None) -> int:
+    with open(path, "r", encoding="utf-8-sig") as f:
+        text = f.read()
+    entries, failures = parse_import(text, fmt)
+    print(f"Parsed {len(entries)} entries ({len(failures)} unparseable) from {path}")
+    conn = connect_db()
+    result = import_cards(conn, entries, lambda d, t: print(f"  resolved {d}/{t}", flush=True))
+    conn.close()
+    failures += result["failed"]
+    for f in failures:
+        print(f"  line {f['line']}: {f['text']!r} — {f['error']}")
+    print(f"Imported {result['imported']} cards in {result['seconds']}s, {len(failures)} failed")
+    return 1 if failures else 0
+
+def print_plan(moves: list, s: dict):
+    for src, ms in vbinmap.group_moves(moves).items():
+        print(f"From pile {src}:")
+        for dst, r in ms:
+            print(f"  {r['qty']}x {r['name']} [{(r['set_code'] or '').upper()} {r['collector_number'] or ''}]"
+                  f" -> pile {dst}")
+    pct = 100 * s["moved_cards"] / s["total_cards"] if s["total_cards"] else 0.0
+    print(f"{s['piles'][0]} -> {s['piles'][1]} piles: {s['moved_bins']}/{s['virtual_bins']} bins and "
+          f"{s['moved_cards']}/{s['total_cards']} cards ({pct:.1f}%) move")
+    b, a = s["height_before"], s["height_after"]
+    print(f"Pile height max/mean: before {b['max']}/{b['mean']} ({b['max_over_mean']}x), "
+          f"after {a['max']}/{a['mean']} ({a['max_over_mean']}x)")
+
+def cli_layout(plan, apply: bool, mode: Optional[str] = None) -> int:
+    conn = connect_db()
+    moves, s = run_layout(conn, plan, apply, mode)
+    print_plan(moves, s)
+    if apply:
+        print("Applied.")
+    else:
+        print("Dry run; pass --apply to save the new layout.")
+    conn.close()
+    return 0
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MagiSort web app")
+    sub = parser.add_subparsers(dest="cmd")
+    sub.add_parser("serve", help="run the web UI (default)")
+    p_imp = sub.add_parser("import", help="bulk-import a decklist, CSV (name,set,number,qty) or NDJSON file")
+    p_imp.add_argument("path")
+    p_imp.add_argument("--format", choices=["decklist", "csv", "ndjson"])
+    sub.add_parser("repile", help="recompute every card's pile from the current piles/bins/salt")
+    p_reb = sub.add_parser("rebalance", help="change the pile count, moving as few cards as possible")
+    p_reb.add_argument("piles", type=int)
+    p_reb.add_argument("--apply", action="store_true", help="save the new layout (default: print the moves only)")
+    p_bal = sub.add_parser("balance", help="re-lay the piles by copy count (balanced) or back to plain hashing")
+    p_bal.add_argument("mode", choices=["balanced", "hash"])
+    p_bal.add_argument("--apply", action="store_true", help="save the new layout and mode")
+    args = parser.parse_args()
+
     init_db_if_needed()
+    carddb.get_store(BULK_DATA_PATH)  # load the bulk dump (if any) before serving / importing
+    if args.cmd == "import":
+        sys.exit(cli_import(args.path, args.format))
+    if args.cmd == "rebalance":
+        if args.piles < 1:
+            parser.error("piles must be a positive integer")
+        sys.exit(cli_layout(lambda conn: plan_rebalance(conn, args.piles), args.apply))
+    if args.cmd == "balance":
+        sys.exit(cli_layout(lambda conn: plan_balance(conn, args.mode), args.apply, args.mode))
+    if args.cmd == "repile":
+        conn = connect_db()
+        print(f"Re-piled: {repile(conn)} printings moved")
+        conn.close()
+        sys.exit(0)
     app.run(host="127.0.0.1", port=5000, debug=True)
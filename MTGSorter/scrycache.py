@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# scrycache.py — persistent lookup cache for Scryfall responses
+#   in-memory LRU in front of a SQLite table; entries expire after a TTL
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+import carddb
+
+CACHE_PATH = "scryfall-cache.db"
+DEFAULT_TTL = 7 * 24 * 3600      # card data barely changes; a week is plenty
+AUTOCOMPLETE_TTL = 24 * 3600
+MEMORY_ENTRIES = 2048
+DISK_ENTRIES = 100_000
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS lookup_cache (
+  key TEXT PRIMARY KEY,
+  value TEXT NOT NULL,
+  expires_at REAL NOT NULL,
+  accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_lookup_cache_accessed ON lookup_cache(accessed_at);
+"""
+
+def named_key(name: str) -> str:
+    return "named:" + carddb.norm(name or "")
+
+def setnum_key(set_code: str, number) -> str:
+    return f"setnum:{(set_code or '').lower()}/{str(number).lower()}"
+
+def autocomplete_key(prefix: str) -> str:
+    return "ac:" + carddb.norm(prefix or "")
+
+class LookupCache:
+    def __init__(self, path: Optional[str] = CACHE_PATH, ttl: float = DEFAULT_TTL,
+                 memory_entries: int = MEMORY_ENTRIES, disk_entries: int = DISK_ENTRIES, clock=time.time):
+        self.ttl = ttl
+        self.clock = clock          # seconds; swapped for a fake one in bench.py check
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self._mem = OrderedDict()   # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._disk_count = 0
+        self.hits = self.misses = self.disk_hits = self.evictions = 0
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            with self._conn:
+                self._conn.executescript(SCHEMA_SQL)
+                self._conn.execute("DELETE FROM lookup_cache WHERE expires_at <= ?", (self.clock(),))
+            self._disk_count = self._conn.execute("SELECT COUNT(*) FROM lookup_cache").fetchone()[0]
+
+    def get(self, key: str) -> Optional[Any]:
+        now = self.clock()
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None:
+                if hit[0] > now:
+                    self._mem.move_to_end(key)
+                    self.hits += 1
+                    return hit[1]
+                del self._mem[key]
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT value, expires_at FROM lookup_cache WHERE key=?", (key,)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    with self._conn:
+                        self._conn.execute("UPDATE lookup_cache SET accessed_at=? WHERE key=?", (now, key))
+                    value = json.loads(row[0])
+                    self._remember(key, row[1], value)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: Any, ttl: Optional[float] = None):
+        now = self.clock()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._remember(key, expires_at, value)
+            if self._conn is None:
+                return
+            payload = json.dumps(value, ensure_ascii=False)
+            with self._conn:
+                cur = self._conn.execute(
+                    "UPDATE lookup_cache SET value=?, expires_at=?, accessed_at=? WHERE key=?",
+                    (payload, expires_at, now, key)
+                )
+                if not cur.rowcount:
+                    self._conn.execute(
+                        "INSERT INTO lookup_cache(key,value,expires_at,accessed_at) VALUES (?,?,?,?)",
+                        (key, payload, expires_at, now)
+                    )
+                    self._disk_count += 1
+                if self._disk_count > self.disk_entries:
+                    self._evict_disk(now)
+
+    def _remember(self, key: str, expires_at: float, value: Any):
+        self._mem[key] = (expires_at, value)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.memory_entries:
+            self._mem.popitem(last=False)
+            self.evictions += 1
+
+    def _evict_disk(self, now: float):
+        # expired rows first, then least recently used down to 90% of the cap
+        self._conn.execute("DELETE FROM lookup_cache WHERE expires_at <= ?", (now,))
+        count = self._conn.execute("SELECT COUNT(*) FROM lookup_cache").fetchone()[0]
+        excess = count - int(self.disk_entries * 0.9)
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM lookup_cache WHERE key IN "
+                "(SELECT key FROM lookup_cache ORDER BY accessed_at LIMIT ?)", (excess,)
+            )
+            self.evictions += excess
+            count -= excess
+        self._disk_count = count
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute("DELETE FROM lookup_cache")
+                self._disk_count = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "memory_entries": len(self._mem),
+            "disk_entries": self._disk_count,
+        }
+
+_caches = {}
+
+def get_cache(path: Optional[str] = CACHE_PATH) -> LookupCache:
+    """Shared cache for `path` (None keeps it memory-only), opened on first use."""
+    if path not in _caches:
+        _caches[path] = LookupCache(path)
+    return _caches[path]
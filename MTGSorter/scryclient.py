@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# scryclient.py — batched Scryfall lookups via POST /cards/collection
+#   up to 75 identifiers per request; paced, retried and timed by scryhttp
+from typing import Optional
+
+import carddb
+import scryhttp
+
+SCRY_API_BASE = "https://api.scryfall.com"
+COLLECTION_BATCH = 75       # hard limit per /cards/collection request
+HTTP_TIMEOUT = 15
+
+# -------------------- identifier matching --------------------
+def identifier(name: Optional[str] = None, set_code: Optional[str] = None, number=None,
+               oracle_id: Optional[str] = None, scryfall_id: Optional[str] = None) -> dict:
+    """Build a /cards/collection identifier from whichever keys are known (most specific wins)."""
+    if scryfall_id:
+        return {"id": scryfall_id}
+    if set_code and number is not None and str(number) != "":
+        return {"set": set_code.lower(), "collector_number": str(number)}
+    if oracle_id:
+        return {"oracle_id": oracle_id}
+    if name:
+        return {"name": name}
+    raise ValueError("Provide name, set+number, oracle_id or id")
+
+def identifier_key(ident: dict) -> tuple:
+    if ident.get("id"):
+        return ("id", ident["id"].lower())
+    if ident.get("set") and ident.get("collector_number") is not None:
+        return ("setnum", ident["set"].lower(), str(ident["collector_number"]).lower())
+    if ident.get("oracle_id"):
+        return ("oracle", ident["oracle_id"].lower())
+    return ("name", carddb.norm(ident.get("name", "")))
+
+def card_keys(card: dict) -> list[tuple]:
+    """Every identifier_key() a returned card answers."""
+    keys = [("id", (card.get("id") or "").lower()),
+            ("oracle", (card.get("oracle_id") or "").lower()),
+            ("setnum", (card.get("set") or "").lower(), str(card.get("collector_number", "")).lower()),
+            ("name", carddb.norm(card.get("name", ""))),
+            ("name", carddb.norm(card.get("name", "").split(" // ")[0]))]
+    for f in card.get("card_faces") or []:
+        keys.append(("name", carddb.norm(f.get("name", ""))))
+    return keys
+
+# -------------------- resolver --------------------
+class CollectionResolver:
+    def __init__(self, base_url: str = SCRY_API_BASE, bucket: Optional[scryhttp.TokenBucket] = None,
+                 batch_size: int = COLLECTION_BATCH, timeout: float = HTTP_TIMEOUT):
+        self.base_url = base_url
+        self.url = base_url.rstrip("/") + "/cards/collection"
+        self.bucket = bucket or scryhttp.shared_bucket()
+        self.batch_size = min(batch_size, COLLECTION_BATCH)
+        self.timeout = timeout
+
+    def _post(self, identifiers: list[dict]) -> list[dict]:
+        r = scryhttp.post(self.url, json={"identifiers": identifiers}, timeout=self.timeout, bucket=self.bucket)
+        if r.status_code != 200:
+            raise RuntimeError(f"Scryfall error {r.status_code}: {r.text}")
+        data = r.json()
+        if data.get("object") == "error":
+            raise RuntimeError(data.get("details", "Scryfall error"))
+        return data.get("data", [])
+
+    def resolve(self, identifiers: list[dict]) -> list[Optional[dict]]:
+        """Look up every identifier; results come back in input order, None where not found."""
+        wanted = {}
+        for ident in identifiers:
+            wanted.setdefault(identifier_key(ident), ident)
+        unique = list(wanted.values())
+
+        found = {}
+        for i in range(0, len(unique), self.batch_size):
+            batch = unique[i:i + self.batch_size]
+            keys = {identifier_key(x) for x in batch}
+            for card in self._post(batch):
+                card = carddb.slim_card(card)
+                for k in card_keys(card):
+                    if k in keys and k not in found:
+                        found[k] = card
+        return [found.get(identifier_key(ident)) for ident in identifiers]
+
+_resolver = None
+
+def shared_resolver() -> CollectionResolver:
+    """Module-wide resolver against SCRY_API_BASE (rebuilt if that is pointed elsewhere, e.g. a stub)."""
+    global _resolver
+    if _resolver is None or _resolver.base_url != SCRY_API_BASE:
+        _resolver = CollectionResolver(SCRY_API_BASE)
+    return _resolver
+
+def resolve_collection(identifiers: list[dict]) -> list[Optional[dict]]:
+    return shared_resolver().resolve(identifiers)
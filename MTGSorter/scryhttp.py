@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# scryhttp.py — the one HTTP client every Scryfall call goes through
+#   pooled keep-alive requests.Session, token-bucket pacing (Scryfall asks for 50-100 ms
+#   between requests), retry with exponential backoff on 429/5xx and connection errors
+#   (Retry-After honored), and per-endpoint latency metrics
+import asyncio
+import random
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+HTTP_TIMEOUT = 15
+USER_AGENT = "MagiSort/1.0"
+# Scryfall asks for 50-100 ms between requests, i.e. roughly 10 per second
+DEFAULT_RATE = 10.0
+DEFAULT_BURST = 2
+POOL_SIZE = 16                  # keep-alive connections per host
+RETRIES = 4                     # attempts after the first
+INTERACTIVE_RETRIES = 1         # someone is waiting on the reply (web routes, the CLI prompt)
+BACKOFF = 0.5                   # seconds before the first retry, doubling each time
+BACKOFF_MAX = 8.0
+RETRY_AFTER_MAX = 60.0          # never sleep longer than this on a server's say-so
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# -------------------- rate limiting --------------------
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is available (acquire_async() awaits)."""
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self, n: float) -> float:
+        """Take n tokens if available (-> 0.0), else the seconds until they will be."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens >= n:
+                self._tokens -= n
+                return 0.0
+            return (n - self._tokens) / self.rate
+
+    def acquire(self, n: float = 1.0):
+        while True:
+            wait = self._take(n)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, n: float = 1.0):
+        """acquire() for event-loop code: waits with asyncio.sleep instead of blocking the loop."""
+        while True:
+            wait = self._take(n)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+_bucket = TokenBucket()
+
+def shared_bucket() -> TokenBucket:
+    return _bucket
+
+# -------------------- retry policy --------------------
+def retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds or an HTTP date); None if absent or unparseable."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+def retry_delay(attempt: int, retry_after_header: Optional[str] = None, backoff: float = BACKOFF,
+                backoff_max: float = BACKOFF_MAX) -> float:
+    """Sleep before retry number `attempt` (0-based): the server's Retry-After if it sent one,
+    else backoff * 2**attempt with jitter, capped at backoff_max."""
+    told = retry_after(retry_after_header)
+    if told is not None:
+        return min(told, RETRY_AFTER_MAX)
+    delay = min(backoff * (2 ** attempt), backoff_max)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+# -------------------- metrics --------------------
+_SET_NUMBER = re.compile(r"^/cards/(?!named$|autocomplete$|collection$|search$|random$)[^/]+/[^/]+$")
+
+def endpoint_label(url: str) -> str:
+    """Group URLs by endpoint: /cards/m21/146 -> /cards/:set/:number, bulk files -> host/:file."""
+    parts = urlsplit(url)
+    path = parts.path.rstrip("/") or "/"
+    if parts.netloc != "api.scryfall.com" and not parts.netloc.startswith(("127.0.0.1", "localhost")):
+        return parts.netloc + "/:file"
+    if _SET_NUMBER.match(path):
+        return "/cards/:set/:number"
+    if path.startswith("/bulk-data/"):
+        return "/bulk-data/:kind"
+    return path
+
+class EndpointStats:
+    """Per-endpoint request counts, retries, errors and latency percentiles over the last `window` calls."""
+
+    def __init__(self, window: int = 512):
+        self.window = window
+        self._lock = threading.Lock()
+        self._lat = defaultdict(lambda: deque(maxlen=self.window))
+        self._count = defaultdict(int)
+        self._retries = defaultdict(int)
+        self._errors = defaultdict(int)
+
+    def record(self, endpoint: str, seconds: float, ok: bool):
+        with self._lock:
+            self._count[endpoint] += 1
+            self._lat[endpoint].append(seconds)
+            if not ok:
+                self._errors[endpoint] += 1
+
+    def retried(self, endpoint: str):
+        with self._lock:
+            self._retries[endpoint] += 1
+
+    def snapshot(self) -> dict:
+        out = {}
+        with self._lock:
+            for ep, lat in self._lat.items():
+                xs = sorted(lat)
+                out[ep] = {
+                    "requests": self._count[ep], "retries": self._retries[ep], "errors": self._errors[ep],
+                    "p50_ms": round(xs[len(xs) // 2] * 1e3, 1),
+                    "p95_ms": round(xs[min(len(xs) - 1, int(len(xs) * 0.95))] * 1e3, 1),
+                    "max_ms": round(xs[-1] * 1e3, 1),
+                }
+        return out
+
+    def reset(self):
+        with self._lock:
+            for d in (self._lat, self._count, self._retries, self._errors):
+                d.clear()
+
+_stats = EndpointStats()
+
+def shared_stats() -> EndpointStats:
+    return _stats
+
+# -------------------- session --------------------
+class ScryfallSession:
+    """Pooled keep-alive session; request() paces, retries and times every attempt.
+
+    Retries cover 429/5xx responses and connection errors/timeouts. The final
+    response is returned whatever its status (callers keep their own handling);
+    a connection error on the last attempt is raised. Interactive callers pass
+    retries=INTERACTIVE_RETRIES and retry_timeouts=False so one lookup can't hold
+    a worker for minutes: a request that already used its whole timeout is raised
+    rather than repeated.
+    """
+
+    def __init__(self, bucket: Optional[TokenBucket] = None, stats: Optional[EndpointStats] = None,
+                 retries: int = RETRIES, backoff: float = BACKOFF, pool_size: int = POOL_SIZE):
+        self.bucket = bucket or shared_bucket()
+        self.stats = stats or shared_stats()
+        self.retries = retries
+        self.backoff = backoff
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.http.mount("https://", adapter)
+        self.http.mount("http://", adapter)
+        self.http.headers.update({"User-Agent": USER_AGENT, "Accept": "application/json"})
+
+    def request(self, method: str, url: str, bucket: Optional[TokenBucket] = None, retries: Optional[int] = None,
+                retry_timeouts: bool = True, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", HTTP_TIMEOUT)
+        retries = self.retries if retries is None else retries
+        endpoint = endpoint_label(url)
+        attempt = 0
+        while True:
+            (bucket or self.bucket).acquire()
+            t0 = time.perf_counter()
+            try:
+                r = self.http.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.stats.record(endpoint, time.perf_counter() - t0, False)
+                if attempt >= retries or (isinstance(e, requests.Timeout) and not retry_timeouts):
+                    raise
+                wait = retry_delay(attempt, None, self.backoff)
+            else:
+                ok = r.status_code not in RETRY_STATUSES
+                self.stats.record(endpoint, time.perf_counter() - t0, ok)
+                if ok or attempt >= retries:
+                    return r
+                wait = retry_delay(attempt, r.headers.get("Retry-After"), self.backoff)
+                r.close()
+            self.stats.retried(endpoint)
+            time.sleep(wait)
+            attempt += 1
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        self.http.close()
+
+_session = None
+_session_lock = threading.Lock()
+
+def shared_session() -> ScryfallSession:
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = ScryfallSession()
+    return _session
+
+def get(url: str, **kwargs) -> requests.Response:
+    return shared_session().get(url, **kwargs)
+
+def post(url: str, **kwargs) -> requests.Response:
+    return shared_session().post(url, **kwargs)
@@ -1,33 +1,71 @@
 import cv2
 import easyocr
+import numpy as np
 import os
 from datetime import datetime
 import time
-import requests
 import hashlib
 import json
-from collections import Counter
+import queue
+import threading
+from array import array
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+import carddb
+import colsnap
+import scryclient
+import scrycache
+import scryhttp
+import vbins
 
 # =========================
 # util / hashing
 # =========================
 
+# bounded memos: the same names / oracle IDs / type lines come through over and over
+MEMO_SIZE = 1 << 16
+
+@lru_cache(maxsize=MEMO_SIZE)
 def norm(s):
     return ''.join(c.lower() for c in s if c.isalnum() or c.isspace()).strip()
 
+@lru_cache(maxsize=MEMO_SIZE)
 def h32(s):
-    return int(hashlib.blake2s(s.encode('utf-8'), digest_size=4).hexdigest(), 16)
+    return int.from_bytes(hashlib.blake2s(s.encode('utf-8'), digest_size=4).digest(), 'big')
 
-def pile_index_oracle(oracle_id: str, K: int = 40, virtual_bins: int = 5120):
+def vbin_oracle(oracle_id: str, virtual_bins: int = 5120):
     if not oracle_id:
         raise ValueError("oracle_id is required")
-    h = h32(f"oracle:{oracle_id.lower()}")
-    vbin = h % virtual_bins
-    return vbin % K
+    return h32(f"oracle:{oracle_id.lower()}") % virtual_bins
+
+def pile_index_oracle(oracle_id: str, K: int = 40, virtual_bins: int = 5120, pile_map: list = None):
+    vbin = vbin_oracle(oracle_id, virtual_bins)
+    return pile_map[vbin] if pile_map is not None else vbin % K
+
+def pile_indices_oracle(oracle_ids, K: int = 40, virtual_bins: int = 5120, pile_map: list = None) -> np.ndarray:
+    """pile_index_oracle over a sequence of oracle IDs -> int64 array with the same results.
+
+    Oracle IDs are (nearly) all distinct, so every one is hashed; the digests are
+    collected as big-endian u32s and the bin arithmetic runs in NumPy.
+    """
+    if not all(oracle_ids):
+        raise ValueError("oracle_id is required")
+    digests = b"".join(hashlib.blake2s(f"oracle:{o.lower()}".encode('utf-8'), digest_size=4).digest()
+                       for o in oracle_ids)
+    h = np.frombuffer(digests, dtype=">u4").astype(np.uint64)
+    vbin = (h % virtual_bins).astype(np.int64)
+    return np.asarray(pile_map, dtype=np.int64)[vbin] if pile_map is not None else vbin % K
 
+@lru_cache(maxsize=1024)
 def is_basic_land(type_line: str):
     return "basic land" in norm(type_line)
 
+@lru_cache(maxsize=1024)
+def type_tokens(type_line: str):
+    """"Legendary Creature — Elf Druid" -> ("legendary", "creature", "elf", "druid")."""
+    return tuple(norm(type_line).split())
+
 # def is_commander(type_line: str, scry: scryfall):
 #     return  
 
@@ -37,7 +75,7 @@ def is_basic_land(type_line: str):
 
 class card:
     __slots__ = ("__name", "__setCode", "__collectNum", "__colors", "__mValue",
-                 "__type", "__pile", "__oracleID", "__amount")
+                 "__type", "__pile", "__oracleID", "__amount", "__land", "__vbin")
 
     def __init__(self, name: str, setCode: str, collectNum: int, colors: str,
                  mValue: int, type: str, oracleID: str = "", amount: int = 1):
@@ -50,6 +88,8 @@ class card:
         self.__pile = -1
         self.__oracleID = oracleID
         self.__amount = amount
+        self.__land = is_basic_land(type)
+        self.__vbin = None     # (virtual_bins, bin), filled on first getVBin
 
     def __eq__(self, other):
         if not isinstance(other, card):
@@ -68,6 +108,13 @@ class card:
     def getPile(self): return self.__pile
     def getOracleID(self): return self.__oracleID
     def getAmount(self): return self.__amount
+    def isBasicLand(self): return self.__land
+
+    def getVBin(self, virtual_bins: int):
+        """Virtual bin of this card's oracle ID, hashed once per card."""
+        if self.__vbin is None or self.__vbin[0] != virtual_bins:
+            self.__vbin = (virtual_bins, vbin_oracle(self.__oracleID, virtual_bins))
+        return self.__vbin[1]
 
     def setPile(self, p: int): self.__pile = p
     def addAmount(self, n: int): self.__amount += n
@@ -78,7 +125,8 @@ class pile:
 
     def __init__(self, index: int):
         self.__index = index
-        self.__cards = []
+        # oracleID -> card; dicts keep insertion order, so listCards stays stable
+        self.__cards = {}
         self.__name_counts = Counter()
         self.__type_counts = Counter()
         self.__color_counts = Counter()
@@ -86,52 +134,115 @@ class pile:
 
     def insert(self, c: card):
         # merge fungibly by oracleID
-        for stored in self.__cards:
-            if stored.getOracleID() == c.getOracleID():
-                stored.addAmount(c.getAmount())
-                self.__name_counts[stored.getName()] += c.getAmount()
-                self.__type_counts[stored.getType()] += c.getAmount()
-                self.__color_counts[stored.getColors()] += c.getAmount()
-                return
-        self.__cards.append(c)
-        self.__name_counts[c.getName()] += c.getAmount()
-        self.__type_counts[c.getType()] += c.getAmount()
-        self.__color_counts[c.getColors()] += c.getAmount()
+        stored = self.__cards.get(c.getOracleID())
+        if stored is not None:
+            stored.addAmount(c.getAmount())
+        else:
+            stored = c
+            self.__cards[c.getOracleID()] = c
+        self.__name_counts[stored.getName()] += c.getAmount()
+        self.__type_counts[stored.getType()] += c.getAmount()
+        self.__color_counts[stored.getColors()] += c.getAmount()
 
     def remove(self, c: card):
-        for i, stored in enumerate(self.__cards):
-            if stored.getOracleID() == c.getOracleID():
-                delta = c.getAmount()
-                if stored.getAmount() > delta:
-                    stored.subAmount(delta)
-                else:
-                    delta = stored.getAmount()
-                    self.__cards.pop(i)
-                self.__name_counts[stored.getName()] -= delta
-                if self.__name_counts[stored.getName()] == 0: del self.__name_counts[stored.getName()]
-                self.__type_counts[stored.getType()] -= delta
-                if self.__type_counts[stored.getType()] == 0: del self.__type_counts[stored.getType()]
-                self.__color_counts[stored.getColors()] -= delta
-                if self.__color_counts[stored.getColors()] == 0: del self.__color_counts[stored.getColors()]
-                return True
-        return False
+        stored = self.__cards.get(c.getOracleID())
+        if stored is None:
+            return False
+        delta = c.getAmount()
+        if stored.getAmount() > delta:
+            stored.subAmount(delta)
+        else:
+            delta = stored.getAmount()
+            del self.__cards[c.getOracleID()]
+        self.__name_counts[stored.getName()] -= delta
+        if self.__name_counts[stored.getName()] == 0: del self.__name_counts[stored.getName()]
+        self.__type_counts[stored.getType()] -= delta
+        if self.__type_counts[stored.getType()] == 0: del self.__type_counts[stored.getType()]
+        self.__color_counts[stored.getColors()] -= delta
+        if self.__color_counts[stored.getColors()] == 0: del self.__color_counts[stored.getColors()]
+        return True
 
     def size(self):
         return len(self.__cards)
 
     def getCardAmount(self, c: card):
-        for stored in self.__cards:
-            if stored.getOracleID() == c.getOracleID():
-                return stored.getAmount()
-        return 0
+        return self.getAmountById(c.getOracleID())
+
+    def getAmountById(self, oid: str):
+        stored = self.__cards.get(oid)
+        return stored.getAmount() if stored is not None else 0
+
+    def getCard(self, oid: str):
+        return self.__cards.get(oid)
 
     def listCards(self):
         """Return a list of (name, amount) for all cards in this pile."""
-        return [(c.getName(), c.getAmount()) for c in self.__cards]
+        return [(c.getName(), c.getAmount()) for c in self.__cards.values()]
 
     # internal accessor used by serializer (keeps your style)
     def _cards(self):
-        return self.__cards
+        return list(self.__cards.values())
+
+# =========================
+# secondary index (colors / mana value / type words / set -> ids)
+# =========================
+
+def _index_keys(colors: str, type_line: str, setCode: str):
+    return ([("c", ch) for ch in colors or "C"] + [("t", t) for t in type_tokens(type_line)]
+            + [("s", setCode.lower())])
+
+class cardindex:
+    """Postings over the stored cards so filters never scan every card.
+
+    Only the postings are kept; ids are whatever the catalog hands in (the
+    stored card objects for catalog, row numbers for colcatalog) and the
+    catalog resolves them back to (pile, name, amount). A query takes the
+    postings for each filter (one per color letter and type word, the union
+    of mana values in range, the set code) and intersects them smallest first.
+    """
+
+    def __init__(self):
+        self.__post = defaultdict(set)      # ("c", "U") / ("t", "instant") / ("s", "m21") -> ids
+        self.__mv = defaultdict(set)        # mana value -> ids
+
+    def add(self, i, colors: str, type_line: str, setCode: str, mv: int):
+        for k in _index_keys(colors, type_line, setCode):
+            self.__post[k].add(i)
+        self.__mv[mv].add(i)
+
+    def drop(self, i, colors: str, type_line: str, setCode: str, mv: int):
+        for k in _index_keys(colors, type_line, setCode):
+            ids = self.__post.get(k)
+            if ids is not None:
+                ids.discard(i)
+                if not ids:
+                    del self.__post[k]
+        ids = self.__mv.get(mv)
+        if ids is not None:
+            ids.discard(i)
+            if not ids:
+                del self.__mv[mv]
+
+    def query(self, colors: str = "", mvMin: int = None, mvMax: int = None, types=(), setCode: str = None):
+        """ids matching every given filter, or None when no filter was given;
+        colors must all be present ("UR" matches "BRU")."""
+        sets = [self.__post.get(("c", ch), set()) for ch in colors.upper()]
+        sets += [self.__post.get(("t", t), set()) for phrase in types for t in type_tokens(phrase)]
+        if setCode:
+            sets.append(self.__post.get(("s", setCode.lower()), set()))
+        if mvMin is not None or mvMax is not None:
+            lo = mvMin if mvMin is not None else float("-inf")
+            hi = mvMax if mvMax is not None else float("inf")
+            sets.append(set().union(*(ids for mv, ids in self.__mv.items() if lo <= mv <= hi)))
+        if not sets:
+            return None
+        sets.sort(key=len)
+        out = set(sets[0])
+        for s in sets[1:]:
+            if not out:
+                break
+            out &= s
+        return out
 
 # =========================
 # catalog (uses piles; land pile is the last index)
@@ -139,46 +250,98 @@ class pile:
 
 class catalog:
 
-    def __init__(self, pileNum = 40, vBins = 5120):
+    def __init__(self, pileNum = 40, vBins = 5120, pileMap = None):
         self.__pileNum = pileNum              # number of hashed (non-land) piles
         self.__vBins = vBins
+        # virtual bin -> pile; defaults to vbin % pileNum (see vbins.py)
+        self.__pileMap = pileMap if vbins.valid_map(pileMap, vBins, pileNum) else vbins.default_map(vBins, pileNum)
         # allocate hashed piles [0..pileNum-1] PLUS a final land pile at index = pileNum
         self.__piles = [pile(i) for i in range(pileNum)] + [pile(pileNum)] + [pile(pileNum + 1)]
         self.__land_index = pileNum
         self.__commander_index = pileNum + 1
+        # raw records still missing an oracleID (kept so save() never drops them)
+        self.__unresolved = []
+        # built on the first search() and kept current after that, so plain sorting pays nothing for it
+        self.__index = None
+
+    def pileOf(self, c: card):
+        if c.isBasicLand():
+            return self.__land_index
+        return self.__pileMap[c.getVBin(self.__vBins)]
 
     def insert(self, c: card):
-        if is_basic_land(c.getType()):
-            p = self.__land_index
-        else:
-            p = pile_index_oracle(c.getOracleID(), self.__pileNum, self.__vBins)
+        self.place(c, self.pileOf(c))
+
+    def insertAll(self, cards):
+        """insert() over many cards, hashing their oracle IDs in one pass (whole-catalog loads)."""
+        cards = list(cards)
+        piles = pile_indices_oracle([c.getOracleID() for c in cards], self.__pileNum, self.__vBins, self.__pileMap)
+        for c, p in zip(cards, piles.tolist()):
+            self.place(c, self.__land_index if c.isBasicLand() else p)
+
+    def place(self, c: card, p: int):
+        """Insert into a known pile (snapshot load, when the layout hasn't changed)."""
         c.setPile(p)
+        merged = self.__piles[p].getCard(c.getOracleID()) is not None
         self.__piles[p].insert(c)
+        if self.__index is not None and not merged:
+            self.__index.add(c, c.getColors(), c.getType(), c.getSetCode(), c.getMValue())
 
     def retrieve(self, c: card):
-        if is_basic_land(c.getType()):
-            p = self.__land_index
-        else:
-            p = pile_index_oracle(c.getOracleID(), self.__pileNum, self.__vBins)
+        p = self.pileOf(c)
         amt = self.__piles[p].getCardAmount(c)
         return amt, ("land" if p == self.__land_index else p)
 
     def remove(self, c: card):
-        if is_basic_land(c.getType()):
-            p = self.__land_index
-        else:
-            p = pile_index_oracle(c.getOracleID(), self.__pileNum, self.__vBins)
-        return self.__piles[p].remove(c)
+        p = self.__piles[self.pileOf(c)]
+        stored = p.getCard(c.getOracleID())   # may be another printing; the index holds its fields
+        if not p.remove(c):
+            return False
+        if self.__index is not None and not p.getCardAmount(c):
+            self.__index.drop(stored, stored.getColors(), stored.getType(), stored.getSetCode(), stored.getMValue())
+        return True
+
+    def search(self, colors: str = "", mvMin: int = None, mvMax: int = None, types=(), setCode: str = None):
+        """[(pile, name, amount)] for every stored card matching all the given filters, by pile then name."""
+        if self.__index is None:
+            self.__index = cardindex()
+            for entry in self._indexed():
+                self.__index.add(*entry)
+        hits = self.__index.query(colors, mvMin, mvMax, types, setCode)
+        if hits is None:
+            hits = [entry[0] for entry in self._indexed()]
+        return sorted(self._hit(i) for i in hits)
+
+    def print_search(self, **filters):
+        hits = self.search(**filters)
+        print(f"\n== {len(hits)} matching cards ==\n")
+        last = None
+        for p, name, amount in hits:
+            if p != last:
+                print("\nLand Pile:" if p == self.__land_index else f"\nPile {p + 1}:")
+                last = p
+            print(f" {amount}x {name}")
+        print("\n=============\n")
+
+    # ---- search ids (stored card objects here; colcatalog uses rows) ----
+    def _indexed(self):
+        """(id, colors, type, setCode, mana value) for every stored card."""
+        for p in self.__piles:
+            for c in p._cards():
+                yield c, c.getColors(), c.getType(), c.getSetCode(), c.getMValue()
+
+    def _hit(self, c: card):
+        return c.getPile(), c.getName(), c.getAmount()
 
     def print_pile(self, pile_index):
         # allow "land" or numeric index
         if pile_index == "land":
-            p = self.__piles[self.__land_index]
+            p = self.getPileAt(self.__land_index)
             out = "\n== Land Pile ==\n"
         else:
             i = int(pile_index)
             if i == self.__land_index:
-                p = self.__piles[self.__land_index]
+                p = self.getPileAt(self.__land_index)
                 out = "\n== Land Pile ==\n"
             else:
                 p = self.getPileAt(i)
@@ -197,10 +360,163 @@ class catalog:
             self.print_pile(i)
         self.print_pile("land")          # land pile last
 
+    def queueUnresolved(self, d: dict): self.__unresolved.append(d)
+    def getUnresolved(self): return list(self.__unresolved)
+
+    def dropUnresolved(self, d: dict):
+        """Forget one queued record matching d by name; True if one was queued."""
+        for i, u in enumerate(self.__unresolved):
+            if u.get("name") == d.get("name"):
+                self.__unresolved.pop(i)
+                return True
+        return False
+
     def getPileNum(self): return self.__pileNum
     def getPileAt(self, i): return self.__piles[i]
     def getBins(self): return self.__vBins
+    def getPileMap(self): return self.__pileMap
     def getLandIndex(self): return self.__land_index
+    def getIndex(self): return self.__index
+
+# =========================
+# columnar catalog (same API, no per-card objects held)
+# =========================
+
+class colpile:
+    """View of one colcatalog pile with the pile API (insert/remove/size/listCards/_cards)."""
+    __slots__ = ("__cat", "__index")
+
+    def __init__(self, cat: "colcatalog", index: int):
+        self.__cat = cat
+        self.__index = index
+
+    def insert(self, c: card): self.__cat.place(c, self.__index)
+    def remove(self, c: card): return self.__cat._removeFrom(c, self.__index)
+    def size(self): return len(self.__cat._rowsIn(self.__index))
+    def getCardAmount(self, c: card): return self.__cat._amountIn(c, self.__index)
+
+    def listCards(self):
+        return [self.__cat._nameAmount(r) for r in self.__cat._rowsIn(self.__index)]
+
+    def _cards(self):
+        return [self.__cat._cardAt(r) for r in self.__cat._rowsIn(self.__index)]
+
+class colcatalog(catalog):
+    """catalog that keeps cards in parallel columns instead of card objects.
+
+    Set codes, colors and type lines are interned to u32 ids, numbers live in
+    array columns and oracleID -> row finds a card. card objects only exist at
+    the API boundary (arguments in, _cards()/print out); rows freed by remove()
+    are reused. Piles list in row order rather than insertion order.
+    """
+
+    def __init__(self, pileNum = 40, vBins = 5120, pileMap = None):
+        super().__init__(pileNum, vBins, pileMap)
+        self.__row = {}                 # oracleID -> row
+        self.__free = []
+        self.__oracle = []
+        self.__name = []
+        self.__set = array("I")
+        self.__colors = array("I")
+        self.__type = array("I")
+        self.__num = array("i")
+        self.__mv = array("i")
+        self.__amount = array("i")
+        self.__pile = array("h")        # -1 on free rows
+        self.__strs = []
+        self.__strIds = {}
+        self.__views = [colpile(self, i) for i in range(pileNum + 2)]
+
+    def __intern(self, s: str) -> int:
+        i = self.__strIds.get(s)
+        if i is None:
+            i = self.__strIds[s] = len(self.__strs)
+            self.__strs.append(s)
+        return i
+
+    def place(self, c: card, p: int):
+        c.setPile(p)
+        r = self.__row.get(c.getOracleID())
+        if r is not None:
+            self.__amount[r] += c.getAmount()
+            return
+        vals = (c.getOracleID(), c.getName(), self.__intern(c.getSetCode()), self.__intern(c.getColors()),
+                self.__intern(c.getType()), c.getCollectNum(), c.getMValue(), c.getAmount(), p)
+        cols = (self.__oracle, self.__name, self.__set, self.__colors, self.__type,
+                self.__num, self.__mv, self.__amount, self.__pile)
+        if self.__free:
+            r = self.__free.pop()
+            for col, v in zip(cols, vals):
+                col[r] = v
+        else:
+            r = len(self.__oracle)
+            for col, v in zip(cols, vals):
+                col.append(v)
+        self.__row[c.getOracleID()] = r
+        idx = self.getIndex()
+        if idx is not None:
+            idx.add(r, c.getColors(), c.getType(), c.getSetCode(), c.getMValue())
+
+    def retrieve(self, c: card):
+        p = self.pileOf(c)
+        return self._amountIn(c, p), ("land" if p == self.getLandIndex() else p)
+
+    def remove(self, c: card):
+        return self._removeFrom(c, self.pileOf(c))
+
+    def getPileAt(self, i): return self.__views[i]
+
+    # ---- row access (used by colpile) ----
+    def _amountIn(self, c: card, p: int):
+        return self._amountById(c.getOracleID(), p)
+
+    def _amountById(self, oid: str, p: int):
+        r = self.__row.get(oid)
+        return self.__amount[r] if r is not None and self.__pile[r] == p else 0
+
+    def _removeFrom(self, c: card, p: int):
+        r = self.__row.get(c.getOracleID())
+        if r is None or self.__pile[r] != p:
+            return False
+        if self.__amount[r] > c.getAmount():
+            self.__amount[r] -= c.getAmount()
+            return True
+        del self.__row[self.__oracle[r]]
+        idx = self.getIndex()
+        if idx is not None:
+            idx.drop(*self.__indexEntry(r))
+        self.__oracle[r] = self.__name[r] = None
+        self.__amount[r] = 0
+        self.__pile[r] = -1
+        self.__free.append(r)
+        return True
+
+    def _rowsIn(self, p: int):
+        # tobytes() copies, so no buffer export is left open while another thread appends
+        return np.flatnonzero(np.frombuffer(self.__pile.tobytes(), dtype=np.int16) == p).tolist()
+
+    def _nameAmount(self, r: int):
+        return self.__name[r], self.__amount[r]
+
+    # ---- search ids: rows, read back from the interned columns ----
+    def __indexEntry(self, r: int):
+        s = self.__strs
+        return r, s[self.__colors[r]], s[self.__type[r]], s[self.__set[r]], self.__mv[r]
+
+    def _indexed(self):
+        for r in range(len(self.__pile)):
+            if self.__pile[r] != -1:
+                yield self.__indexEntry(r)
+
+    def _hit(self, r: int):
+        return self.__pile[r], self.__name[r], self.__amount[r]
+
+    def _cardAt(self, r: int) -> card:
+        s = self.__strs
+        c = card(self.__name[r], s[self.__set[r]], self.__num[r], s[self.__colors[r]],
+                 self.__mv[r], s[self.__type[r]], self.__oracle[r], self.__amount[r])
+        c.setPile(self.__pile[r])
+        return c
 
 # =========================
 # scryfall client
@@ -220,14 +536,14 @@ class scryfall:
         except Exception:
             return default
 
-    def fetch_card_by_name(self, name: str) -> card:
-        r = requests.get(self.SCRY_NAMED_URL, params={"fuzzy": name}, timeout=self._HTTP_TIMEOUT)
-        if r.status_code != 200:
-            raise RuntimeError(f"Scryfall error {r.status_code}: {r.text}")
-        data = r.json()
-        if data.get("object") == "error":
-            raise RuntimeError(data.get("details", "Unknown Scryfall error"))
+    def __init__(self, store: carddb.CardStore = None, cache: scrycache.LookupCache = None,
+                 names: carddb.NameIndex = None):
+        # offline bulk-data store is consulted first, then the lookup cache; network only on a miss
+        self._store = store if store is not None else carddb.get_store()
+        self._cache = cache if cache is not None else scrycache.get_cache()
+        self._names = names if names is not None else carddb.get_name_index()
 
+    def _card_from_json(self, data: dict, name: str = "") -> card:
         name_out = data.get("name", name)
         set_code = data.get("set", "") or ""
         collect_num = data.get("collector_number", "")
@@ -240,6 +556,51 @@ class scryfall:
 
         return card(name_out, set_code, collect_num_int, colors_str, mv_int, type_line, oracle_id, 1)
 
+    def fetch_card_by_name(self, name: str) -> card:
+        data = self._store.by_name(name) if self._store else None
+        if data is None and self._names is not None:
+            # OCR output is often a letter or two off; snap it to a known name locally
+            match = self._names.snap(name)
+            if match is not None:
+                name = match
+                data = self._store.by_name(match) if self._store else None
+        if data is None:
+            data = self._cache.get(scrycache.named_key(name))
+        if data is None:
+            r = scryhttp.get(self.SCRY_NAMED_URL, params={"fuzzy": name}, timeout=self._HTTP_TIMEOUT,
+                             retries=scryhttp.INTERACTIVE_RETRIES, retry_timeouts=False)
+            if r.status_code != 200:
+                raise RuntimeError(f"Scryfall error {r.status_code}: {r.text}")
+            data = r.json()
+            if data.get("object") == "error":
+                raise RuntimeError(data.get("details", "Unknown Scryfall error"))
+            data = carddb.slim_card(data)
+            self._cache.put(scrycache.named_key(name), data)
+        return self._card_from_json(data, name)
+
+    def fetch_cards_by_name(self, names: list) -> list:
+        """Batched fetch_card_by_name: store and cache first, then /cards/collection for the rest.
+
+        Results are in input order, None where Scryfall has no exact name match.
+        """
+        found = [None] * len(names)
+        missing = []
+        for i, name in enumerate(names):
+            data = self._store.by_name(name) if self._store else None
+            if data is None:
+                data = self._cache.get(scrycache.named_key(name))
+            if data is None:
+                missing.append(i)
+            else:
+                found[i] = data
+        if missing:
+            fetched = scryclient.resolve_collection([{"name": names[i]} for i in missing])
+            for i, data in zip(missing, fetched):
+                if data is not None:
+                    self._cache.put(scrycache.named_key(names[i]), data)
+                    found[i] = data
+        return [self._card_from_json(d, n) if d is not None else None for d, n in zip(found, names)]
+
 # =========================
 # storage (save / load)
 # =========================
@@ -256,13 +617,58 @@ def _card_to_dict(c: card) -> dict:
         "amount": c.getAmount(),
     }
 
-def _serialize_catalog(cat: catalog) -> dict:
+def _dict_to_card(d: dict, oracleID: str = None) -> card:
+    return card(
+        d["name"],
+        d.get("setCode", ""),
+        int(d.get("collectNum", 0)),
+        d.get("colors", "C"),
+        int(d.get("mValue", 0)),
+        d.get("type", ""),
+        oracleID if oracleID is not None else d.get("oracleID", ""),
+        int(d.get("amount", 1)),
+    )
+
+# snapshots named *.bin are written as columnar binaries (colsnap.py) instead of JSON
+BINARY_SNAPSHOT_EXT = ".bin"
+
+def _is_binary(path: str) -> bool:
+    return path.endswith(BINARY_SNAPSHOT_EXT)
+
+def _snapshot_meta(cat: catalog, journalGen: int) -> dict:
     data = {
         "pileNum": cat.getPileNum(),
         "vBins": cat.getBins(),
-        "cards": [],
-        "landCards": [],
+        "journalGen": journalGen,
     }
+    # only written once a rebalance has moved it off the vbin % pileNum default
+    if cat.getPileMap() != vbins.default_map(cat.getBins(), cat.getPileNum()):
+        data["pileMap"] = cat.getPileMap()
+    return data
+
+_COLUMNS = (("name", "str"), ("setCode", "str"), ("collectNum", "i"), ("colors", "str"), ("mValue", "i"),
+            ("type", "str"), ("oracleID", "str"), ("amount", "i"), ("pile", "h"))
+
+def _catalog_columns(cat: catalog) -> dict:
+    """One row per stored card (hashed piles, then the land pile), with its pile index."""
+    cols = {name: [] for name, _ in _COLUMNS}
+    for i in list(range(cat.getPileNum())) + [cat.getLandIndex()]:
+        for c in cat.getPileAt(i)._cards():
+            cols["name"].append(c.getName())
+            cols["setCode"].append(c.getSetCode())
+            cols["collectNum"].append(c.getCollectNum())
+            cols["colors"].append(c.getColors())
+            cols["mValue"].append(c.getMValue())
+            cols["type"].append(c.getType())
+            cols["oracleID"].append(c.getOracleID())
+            cols["amount"].append(c.getAmount())
+            cols["pile"].append(i)
+    return {name: (kind, cols[name]) for name, kind in _COLUMNS}
+
+def _serialize_catalog(cat: catalog, journalGen: int = 0) -> dict:
+    data = _snapshot_meta(cat, journalGen)
+    data["cards"] = []
+    data["landCards"] = []
     # hashed piles only
     for i in range(cat.getPileNum()):
         p = cat.getPileAt(i)
@@ -272,69 +678,361 @@ def _serialize_catalog(cat: catalog) -> dict:
     land_pile = cat.getPileAt(cat.getLandIndex())
     for c in land_pile._cards():
         data["landCards"].append(_card_to_dict(c))
+    # records still waiting on a Scryfall lookup stay in the file as-is
+    data["cards"].extend(cat.getUnresolved())
     return data
 
-def save(cat: catalog, path: str = "catalog.json") -> None:
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(_serialize_catalog(cat), f, indent=2, ensure_ascii=False)
+def save(cat: catalog, path: str = "catalog.json", journalGen: int = 0) -> None:
+    # write-then-rename so a crash mid-save never leaves a truncated snapshot
+    tmp = path + ".tmp"
+    if _is_binary(path):
+        meta = _snapshot_meta(cat, journalGen)
+        meta["landPile"] = cat.getLandIndex()
+        meta["unresolved"] = cat.getUnresolved()
+        colsnap.write(tmp, meta, _catalog_columns(cat))
+    else:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(_serialize_catalog(cat, journalGen), f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+def convert_snapshot(src: str, dst: str, pileNum: int = 40, vBins: int = 5120) -> catalog:
+    """Fold src (plus its journal) into a fresh snapshot at dst, e.g. catalog.json -> catalog.bin."""
+    if os.path.exists(dst + ".journal"):
+        raise FileExistsError(f"{dst}.journal exists; it belongs to the snapshot being replaced")
+    jr = journal(src)
+    cat = load(src, pileNum, vBins, jr, offline=True)
+    jr.close()
+    save(cat, dst, 0)
+    return cat
+
+def load(path: str = "catalog.json", pileNum: int = 40, vBins: int = 5120, jr: "journal" = None,
+         offline: bool = False, backend: type = catalog) -> catalog:
+    """Rebuild the catalog from the snapshot plus journal.
 
-def load(path: str = "catalog.json", pileNum: int = 40, vBins: int = 5120) -> catalog:
+    Records missing an oracleID are looked up on Scryfall one at a time, unless
+    offline is set: then they are queued on the catalog (see resolver) and
+    startup never touches the network. backend is catalog or colcatalog.
+    """
+    if jr is None:
+        jr = journal(path)
     if not os.path.exists(path):
         print("\nMAKING NEW FILE")
-        cat = catalog(pileNum, vBins)
+        cat = backend(pileNum, vBins)
         save(cat, path)
+        jr.replay(cat, 0)
         return cat
 
     print("\nFILE FOUND")
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    # Always rebuild using the requested pileNum/vBins (ignore persisted ones)
-    cat = catalog(pileNum, vBins)
-
-    sf = scryfall()
+    cols = None
+    if _is_binary(path):
+        data, cols = colsnap.read(path)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+    # Rebuild with the requested pileNum/vBins. The saved vbin -> pile map is carried
+    # over, re-levelled if pileNum changed, so only ~1/pileNum of the cards move.
+    oldPileNum = int(data.get("pileNum", pileNum))
+    oldMap = None
+    if int(data.get("vBins", vBins)) == vBins:
+        oldMap = data.get("pileMap")
+        if not vbins.valid_map(oldMap, vBins, oldPileNum):
+            oldMap = vbins.default_map(vBins, oldPileNum)
+    if oldMap is None:
+        print("\nVIRTUAL BIN COUNT CHANGED: EVERY PILE WILL BE RE-SORTED")
+        pileMap = None
+    elif oldPileNum != pileNum:
+        pileMap = vbins.rebalance_map(oldMap, pileNum)
+    else:
+        pileMap = oldMap
+    cat = backend(pileNum, vBins, pileMap)
+
+    sf = None
 
     def build_card(d: dict) -> card:
+        nonlocal sf
         oracle = d.get("oracleID", "") or ""
         if not oracle:
+            if offline:
+                cat.queueUnresolved(d)
+                return None
             try:
-                fetched = sf.fetch_card_by_name(d["name"])
-                oracle = fetched.getOracleID()
-                if not oracle:
-                    return None
+                sf = sf or scryfall()
+                oracle = sf.fetch_card_by_name(d["name"]).getOracleID()
             except Exception:
+                oracle = ""
+            if not oracle:
+                cat.queueUnresolved(d)
                 return None
-        return card(
-            d["name"],
-            d.get("setCode", ""),
-            int(d.get("collectNum", 0)),
-            d.get("colors", "C"),
-            int(d.get("mValue", 0)),
-            d.get("type", ""),
-            oracle,
-            int(d.get("amount", 1)),
-        )
+        return _dict_to_card(d, oracle)
+
+    if cols is not None:
+        # columnar snapshot: rows carry their pile, so with an unchanged layout nothing is re-hashed
+        same = oldMap is not None and oldPileNum == pileNum
+        land = int(data.get("landPile", oldPileNum))
+        rehash = []
+        for name, setCode, num, colors, mv, type_, oracle, amt, p in zip(*(cols[n] for n, _ in _COLUMNS)):
+            c = card(name, setCode, num, colors, mv, type_, oracle, amt)
+            if p == land:
+                cat.place(c, cat.getLandIndex())
+            elif same:
+                cat.place(c, p)
+            else:
+                rehash.append(c)
+        cat.insertAll(rehash)
+        cat.insertAll(c for c in map(build_card, data.get("unresolved", [])) if c is not None)
 
     # regular hashed piles
-    for d in data.get("cards", []):
-        c = build_card(d)
-        if c is not None:
-            cat.insert(c)
+    cat.insertAll(c for c in map(build_card, data.get("cards", [])) if c is not None)
 
     # land pile (explicitly add to last pile to preserve JSON split)
     for d in data.get("landCards", []):
         c = build_card(d)
         if c is not None:
-            cat.getPileAt(cat.getLandIndex()).insert(c)
-
+            cat.place(c, cat.getLandIndex())
+
+    # deltas recorded since the snapshot was written
+    jr.replay(cat, int(data.get("journalGen", 0)))
+    if oldMap is not None and oldPileNum != pileNum:
+        print_moves(rebalance_moves(cat, oldMap), oldPileNum, pileNum)
+    if cat.getUnresolved():
+        print(f"\n{len(cat.getUnresolved())} RECORDS UNRESOLVED (missing oracleID)")
     return cat
 
+def rebalance_moves(cat: catalog, oldMap: list) -> dict:
+    """{old pile: [(new pile, card), ...]} for every hashed card the current map placed elsewhere."""
+    moves = []
+    for i in range(cat.getPileNum()):
+        cards = cat.getPileAt(i)._cards()
+        olds = pile_indices_oracle([c.getOracleID() for c in cards], virtual_bins=cat.getBins(), pile_map=oldMap)
+        for c, old in zip(cards, olds.tolist()):
+            if old != i:
+                moves.append((old, i, c))
+    return vbins.group_moves(moves)
+
+def print_moves(moves: dict, oldPileNum: int, pileNum: int):
+    moved = 0
+    print(f"\n== Rebalance: {oldPileNum} -> {pileNum} piles ==")
+    for src, ms in moves.items():
+        print(f"\nFrom pile {src + 1}:")
+        for dst, c in ms:
+            print(f" {c.getAmount()}x {c.getName()} -> pile {dst + 1}")
+            moved += c.getAmount()
+    print(f"\n{moved} cards to move\n")
+
+# =========================
+# journal (append-only deltas between snapshots)
+# =========================
+
+class journal:
+    """Per-card insert/remove log next to the snapshot; compacted into it every N entries.
+
+    Each line carries the generation of the snapshot it applies to, so entries
+    already folded into a newer snapshot are skipped on replay.
+    """
+
+    def __init__(self, path: str = "catalog.json", compact_every: int = 500):
+        self.__snapshot = path
+        self.__path = path + ".journal"
+        self.__compact_every = compact_every
+        self.__gen = 0
+        self.__entries = 0
+        self.__f = None
+
+    def replay(self, cat: catalog, gen: int) -> int:
+        """Apply this snapshot generation's entries to cat; returns how many were applied."""
+        self.__gen = gen
+        self.__entries = 0
+        if not os.path.exists(self.__path):
+            return 0
+        with open(self.__path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    e = json.loads(line)
+                except ValueError:
+                    break  # torn final write
+                if e.get("gen") != gen:
+                    continue
+                c = _dict_to_card(e["card"])
+                if e["op"] == "insert":
+                    cat.insert(c)
+                elif e["op"] == "resolve":
+                    # only if the record is still queued (it may have been resolved during load)
+                    if cat.dropUnresolved(e["record"]):
+                        cat.insert(c)
+                else:
+                    cat.remove(c)
+                self.__entries += 1
+        if self.__entries:
+            print(f"\nREPLAYED {self.__entries} JOURNAL ENTRIES")
+        return self.__entries
+
+    def append(self, cat: catalog, op: str, c: card, record: dict = None):
+        if self.__f is None:
+            self.__f = open(self.__path, "a", encoding="utf-8")
+        e = {"gen": self.__gen, "op": op, "card": _card_to_dict(c)}
+        if record is not None:
+            e["record"] = record
+        self.__f.write(json.dumps(e, ensure_ascii=False) + "\n")
+        self.__f.flush()
+        self.__entries += 1
+        if self.__entries >= self.__compact_every:
+            self.compact(cat)
+
+    def compact(self, cat: catalog):
+        """Fold everything into a fresh snapshot and start an empty journal."""
+        self.__gen += 1
+        save(cat, self.__snapshot, self.__gen)
+        if self.__f is not None:
+            self.__f.close()
+        self.__f = open(self.__path, "w", encoding="utf-8")
+        self.__entries = 0
+
+    def close(self):
+        if self.__f is not None:
+            self.__f.close()
+            self.__f = None
+
+# =========================
+# background resolution of records missing an oracleID
+# =========================
+
+class resolver:
+    """Looks up unresolved records on a worker thread; results are applied by drain()
+    on the caller's thread so the catalog is only ever mutated from one place."""
+
+    def __init__(self, scry: "scryfall" = None):
+        self.__scry = scry
+        self.__done = queue.Queue()
+        self.__thread = None
+        self.__outstanding = 0
+
+    def start(self, records: list):
+        if not records:
+            return
+        self.__outstanding += len(records)
+        print(f"\nResolving {len(records)} records in the background")
+        self.__thread = threading.Thread(target=self.__work, args=(list(records),), daemon=True)
+        self.__thread.start()
+
+    def __work(self, records: list):
+        sf = self.__scry or scryfall()
+        step = scryclient.COLLECTION_BATCH
+        for i in range(0, len(records), step):
+            chunk = records[i:i + step]
+            try:
+                fetched = sf.fetch_cards_by_name([d["name"] for d in chunk])
+            except Exception:
+                fetched = [None] * len(chunk)
+            for d, c in zip(chunk, fetched):
+                if c is None:
+                    # collection lookups are exact; give typos one fuzzy try
+                    try:
+                        c = sf.fetch_card_by_name(d["name"])
+                    except Exception:
+                        c = None
+                self.__done.put((d, c))
+
+    def drain(self, cat: catalog, jr: journal):
+        """Apply finished lookups; returns (resolved, failed) counts for this call."""
+        resolved = failed = 0
+        while True:
+            try:
+                d, fetched = self.__done.get_nowait()
+            except queue.Empty:
+                break
+            self.__outstanding -= 1
+            if fetched is None or not fetched.getOracleID():
+                failed += 1  # stays queued on the catalog and in the next snapshot
+                continue
+            if cat.dropUnresolved(d):
+                c = _dict_to_card(d, fetched.getOracleID())
+                cat.insert(c)
+                jr.append(cat, "resolve", c, record=d)
+                resolved += 1
+        if resolved or failed:
+            print(f"\nResolved {resolved} records, {failed} failed, {self.__outstanding} pending")
+        return resolved, failed
+
+    def pending(self): return self.__outstanding
+
+# =========================
+# title-band location (cheap OpenCV; runs before any OCR)
+# =========================
+
+CARD_W, CARD_H = 630, 880             # 63 x 88 mm at 10 px/mm
+TITLE_BAND = (0.035, 0.11, 0.05, 0.80)  # y0, y1, x0, x1 as fractions of the card (skips mana cost)
+OCR_ALLOWLIST = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz-' "
+
+def _order_corners(pts):
+    pts = pts.reshape(4, 2).astype(np.float32)
+    s = pts.sum(axis=1)
+    d = np.diff(pts, axis=1).ravel()
+    return np.array([pts[np.argmin(s)], pts[np.argmin(d)], pts[np.argmax(s)], pts[np.argmax(d)]], dtype=np.float32)
+
+def _card_title_band(frame, small, scale):
+    """Whole card visible: warp its outline upright and cut the title band out of it."""
+    gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+    edges = cv2.dilate(cv2.Canny(gray, 40, 120), None, iterations=1)
+    cnts, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    min_area = 0.08 * small.shape[0] * small.shape[1]
+    for c in sorted(cnts, key=cv2.contourArea, reverse=True)[:5]:
+        if cv2.contourArea(c) < min_area:
+            break
+        approx = cv2.approxPolyDP(c, 0.02 * cv2.arcLength(c, True), True)
+        if len(approx) != 4 or not cv2.isContourConvex(approx):
+            continue
+        corners = _order_corners(approx) / scale
+        tl, tr, br, bl = corners
+        if np.linalg.norm(tr - tl) > np.linalg.norm(bl - tl):
+            corners = np.array([tr, br, bl, tl], dtype=np.float32)  # card lying sideways
+        dst = np.array([[0, 0], [CARD_W, 0], [CARD_W, CARD_H], [0, CARD_H]], dtype=np.float32)
+        card_img = cv2.warpPerspective(frame, cv2.getPerspectiveTransform(corners, dst), (CARD_W, CARD_H))
+        y0, y1, x0, x1 = TITLE_BAND
+        return card_img[int(y0 * CARD_H):int(y1 * CARD_H), int(x0 * CARD_W):int(x1 * CARD_W)]
+    return None
+
+def _text_line_band(frame, small, scale, pad: int = 6):
+    """Card partly out of frame: take the biggest dark-on-light text line instead."""
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    bh = cv2.morphologyEx(gray, cv2.MORPH_BLACKHAT, cv2.getStructuringElement(cv2.MORPH_RECT, (13, 5)))
+    gx = cv2.convertScaleAbs(cv2.Sobel(bh, cv2.CV_16S, 1, 0, ksize=3))
+    gx = cv2.morphologyEx(gx, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (21, 5)))
+    _, th = cv2.threshold(gx, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    th = cv2.dilate(cv2.erode(th, None, iterations=1), None, iterations=2)
+    cnts, _ = cv2.findContours(th, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    best = None
+    for c in cnts:
+        x, y, w, h = cv2.boundingRect(c)
+        if h > 6 and w > 3 * h and w > 0.08 * small.shape[1] and (best is None or w * h > best[2] * best[3]):
+            best = (x, y, w, h)
+    if best is None:
+        return None
+    x, y, w, h = (int(v / scale) for v in best)
+    return frame[max(y - pad, 0):y + h + pad, max(x - pad, 0):x + w + pad]
+
+def locate_title_band(frame, work_width: int = 640):
+    """Crop of the card's title line from a full-resolution BGR frame, or None."""
+    scale = min(1.0, work_width / frame.shape[1])
+    small = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    band = _card_title_band(frame, small, scale)
+    if band is None:
+        band = _text_line_band(frame, small, scale)
+    return band if band is not None and band.size else None
+
 # =========================
 # OCR camera (kept modular)
 # =========================
 
 class OCRCamera:
-    def __init__(self, camera_index: int = -1):
+    def __init__(self, camera_index: int = -1, title_mode: bool = True, title_height: int = 64,
+                 min_conf: float = 0.3):
+        # title_mode: OCR only the located title band (one pass), falling back to the
+        # full-frame two-pass read when no band is found or the read is unsure.
+        # title_height: downscale taller bands to this many pixels (0 keeps full size).
+        self.title_mode = title_mode
+        self.title_height = title_height
+        self.min_conf = min_conf
         if camera_index == -1:
             print(self.list_available_cameras())
             self.camera_index = int(input("Which camera?"))
@@ -368,14 +1066,55 @@ class OCRCamera:
         return frame
 
     def capture_text(self, save: bool = False, save_dir: str = "captures", pad: int = 6):
-        frame = self.capture()
+        return self.read_text(self.capture(), save, save_dir, pad)
+
+    def read_text(self, frame, save: bool = False, save_dir: str = "captures", pad: int = 6):
+        best_text, crop = None, None
+        if self.title_mode:
+            best_text, crop = self._read_title(frame)
+        if best_text is None:
+            best_text, crop = self._read_full(frame, pad)
+        if best_text is None:
+            return "", None, None
+        text = norm(" ".join(best_text.split()).strip("-'\".,;:()[]{}"))
+        saved_path = None
+        if save:
+            os.makedirs(save_dir, exist_ok=True)
+            ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+            saved_path = os.path.join(save_dir, f"crop_{ts}.png")
+            cv2.imwrite(saved_path, crop)
+            saved_path = os.path.join(save_dir, f"full_{ts}.png")
+            cv2.imwrite(saved_path, frame)
+        return text, crop, saved_path
+
+    def _read_title(self, frame):
+        """Single recognition pass over the title band; (None, None) if it can't be trusted."""
+        band = locate_title_band(frame)
+        if band is None:
+            return None, None
+        h, w = band.shape[:2]
+        if self.title_height and h > self.title_height:
+            f = self.title_height / h
+            band = cv2.resize(band, (max(1, int(w * f)), self.title_height), interpolation=cv2.INTER_AREA)
+        results = self.reader.readtext(cv2.cvtColor(band, cv2.COLOR_BGR2RGB), detail=1, paragraph=False,
+                                       allowlist=OCR_ALLOWLIST)
+        if not results:
+            return None, None
+        # the band is one line of text; easyocr may still split it into words
+        results.sort(key=lambda x: min(p[0] for p in x[0]))
+        conf = min(r[2] for r in results)
+        if conf < self.min_conf:
+            return None, None
+        return " ".join(r[1] for r in results), band
+
+    def _read_full(self, frame, pad: int = 6):
         rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         results = self.reader.readtext(
             rgb, detail=1, paragraph=False,
-            allowlist="ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz-' "
+            allowlist=OCR_ALLOWLIST
         )
         if not results:
-            return "", None, None
+            return None, None
         best_box, best_text, best_conf = max(results, key=lambda x: x[2])
         xs = [int(p[0]) for p in best_box]
         ys = [int(p[1]) for p in best_box]
@@ -385,29 +1124,22 @@ class OCRCamera:
         crop_rgb = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
         r2 = self.reader.readtext(
             crop_rgb, detail=1, paragraph=False,
-            allowlist="ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz-' "
+            allowlist=OCR_ALLOWLIST
         )
         if r2:
             best_text = max(r2, key=lambda x: x[2])[1]
-        text = norm(" ".join(best_text.split()).strip("-'\".,;:()[]{}"))
-        saved_path = None
-        if save:
-            os.makedirs(save_dir, exist_ok=True)
-            ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-            saved_path = os.path.join(save_dir, f"crop_{ts}.png")
-            cv2.imwrite(saved_path, crop)
-            saved_path = os.path.join(save_dir, f"full_{ts}.png")
-            cv2.imwrite(saved_path, frame)
-        return text, crop, saved_path
+        return best_text, crop
 
-    def camLoop(self, cat, scry):
+    def camLoop(self, cat, scry, jr):
         self.startUp()
         loop = -1
-        while(loop != "3"):
+        while(loop != "5"):
             print("\n= Scan Card =\n")
             print("1) Scan\n")
             print("2) Scan (Save)\n")
-            print("3) Exit\n")
+            print("3) Continuous Scan\n")
+            print("4) Auto Scan (on card change)\n")
+            print("5) Exit\n")
             print("=============\n")
             loop = input("")
             os.system('cls' if os.name == 'nt' else 'clear')
@@ -415,17 +1147,51 @@ class OCRCamera:
                 case "1":
                     text, img, path = self.capture_text(False)
                     print("\n" + str(text))
-                    cat.insert(scry.fetch_card_by_name(text))
-                    save(cat)
+                    c = scry.fetch_card_by_name(text)
+                    cat.insert(c)
+                    jr.append(cat, "insert", c)
                 case "2":
                     text, img, path = self.capture_text(True)
                     print("\n" + str(text))
-                    cat.insert(scry.fetch_card_by_name(text))
-                    save(cat)
+                    c = scry.fetch_card_by_name(text)
+                    cat.insert(c)
+                    jr.append(cat, "insert", c)
+                case "3":
+                    self.continuousScan(cat, scry, jr)
+                case "4":
+                    self.continuousScan(cat, scry, jr, interval=0.1)
                 case _:
                     continue
         self.release()
 
+    def continuousScan(self, cat, scry, jr, interval: float = None):
+        """Capture on Enter while OCR, lookup and saving run behind it on their own workers.
+
+        With `interval`, frames are polled instead and a FrameGate lets through only
+        new cards that have settled; clear the tray to show it (call it empty) first.
+        """
+        gate = None
+        if interval is not None:
+            gate = FrameGate()
+            input("\nClear the tray and press Enter...")
+            gate.set_background(self.capture())
+        pipe = ScanPipeline(self, cat, scry, jr, interval=interval, gate=gate)
+        pipe.start()
+        if interval is None:
+            print("\nEnter = capture, 's' + Enter = stats, 'q' + Enter = stop\n")
+        else:
+            print("\nScanning on card change. 's' + Enter = stats, 'q' + Enter = stop\n")
+        while True:
+            cmd = input("").strip().lower()
+            if cmd == "q":
+                break
+            if cmd == "s":
+                pipe.print_stats()
+            elif interval is None:
+                pipe.trigger()
+        pipe.stop()
+        pipe.print_stats()
+
     #meow moeow meow meow meow meow 
     # /^--^\     /
     #( o .o )
@@ -435,11 +1201,230 @@ class OCRCamera:
             self.cap.release()
             self.cap = None
 
+# =========================
+# scan pipeline (capture -> OCR -> lookup -> persist)
+# =========================
+
+class stageStats:
+    __slots__ = ("name", "count", "busy", "max", "errors")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.busy = 0.0
+        self.max = 0.0
+        self.errors = 0
+
+    def record(self, dt: float):
+        self.count += 1
+        self.busy += dt
+        self.max = max(self.max, dt)
+
+    def mean(self):
+        return self.busy / self.count if self.count else 0.0
+
+def dhash(frame, size: int = 16) -> int:
+    """size*size-bit difference hash; near-identical frames differ in only a few bits."""
+    # a strided view first keeps the area resize cheap on full-HD frames (~2 ms)
+    step = max(1, min(frame.shape[0], frame.shape[1]) // (size * 8))
+    small = cv2.resize(frame[::step, ::step], (size + 1, size), interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+    bits = (gray[:, 1:] > gray[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+class FrameGate:
+    """Cheap per-frame filter in front of OCR.
+
+    A frame is let through once it differs from the last accepted card, looks
+    unlike the empty tray, and has held still for `stable` consecutive frames.
+    Seeing the empty tray re-arms the gate, so a second copy of the same card
+    still counts.
+    """
+
+    def __init__(self, still_bits: int = 20, change_bits: int = 40, stable: int = 3):
+        self.still_bits = still_bits      # hamming distance (of 256) that still counts as "same frame"
+        self.change_bits = change_bits    # distance from the last card / empty tray that means "different"
+        self.stable = stable
+        self.__background = None
+        self.__prev = None
+        self.__still = 0
+        self.__last = None
+        self.__cleared = True
+        self.checked = self.passed = 0
+
+    def set_background(self, frame):
+        self.__background = dhash(frame)
+
+    def feed(self, frame):
+        """(fire, cleared): fire when this frame should be OCR'd; cleared when the tray
+        was seen empty since the previous fire (so a repeat read is a real second copy)."""
+        self.checked += 1
+        h = dhash(frame)
+        if self.__prev is not None and (h ^ self.__prev).bit_count() <= self.still_bits:
+            self.__still += 1
+        else:
+            self.__still = 0
+        self.__prev = h
+        if self.__background is not None and (h ^ self.__background).bit_count() <= self.change_bits:
+            self.__cleared = True
+            self.__last = None
+            return False, False
+        if self.__still + 1 < self.stable:
+            return False, False
+        if self.__last is not None and (h ^ self.__last).bit_count() <= self.change_bits:
+            return False, False
+        self.__last = h
+        cleared, self.__cleared = self.__cleared, False
+        self.passed += 1
+        return True, cleared
+
+class ScanPipeline:
+    """Bounded producer/consumer chain; each stage has its own thread and input queue,
+    so throughput is set by the slowest stage rather than the sum of all four."""
+
+    _STOP = object()
+
+    def __init__(self, cam: "OCRCamera", cat: catalog, scry: scryfall, jr: journal,
+                 interval: float = None, depth: int = 4, save_images: bool = False,
+                 gate: FrameGate = None):
+        self.cam = cam
+        self.gate = gate
+        self.cat = cat
+        self.scry = scry
+        self.jr = jr
+        self.interval = interval
+        self.save_images = save_images
+        self.frames = queue.Queue(maxsize=depth)   # capture -> OCR
+        self.texts = queue.Queue(maxsize=depth)    # OCR -> lookup
+        self.cards = queue.Queue(maxsize=depth)    # lookup -> persist
+        self.stats = {n: stageStats(n) for n in ("capture", "ocr", "lookup", "persist")}
+        self.dropped = 0
+        self.duplicates = 0
+        self.__last_read = (None, None)   # (text, oracleID) of the previous accepted read
+        self.__triggers = threading.Semaphore(0)
+        self.__running = threading.Event()
+        self.__threads = []
+
+    def start(self):
+        self.__running.set()
+        self.__threads = [
+            threading.Thread(target=self.__capture, daemon=True),
+            threading.Thread(target=self.__stage, args=("ocr", self.__ocr, self.frames, self.texts), daemon=True),
+            threading.Thread(target=self.__stage, args=("lookup", self.__lookup, self.texts, self.cards), daemon=True),
+            threading.Thread(target=self.__stage, args=("persist", self.__persist, self.cards, None), daemon=True),
+        ]
+        for t in self.__threads:
+            t.start()
+
+    def trigger(self):
+        self.__triggers.release()
+
+    def stop(self):
+        """Stop capturing and let everything already captured finish."""
+        self.__running.clear()
+        self.__triggers.release()
+        for t in self.__threads:
+            t.join()
+
+    # ---- stages ----
+    def __capture(self):
+        st = self.stats["capture"]
+        behind = False
+        while True:
+            if self.interval is None:
+                self.__triggers.acquire()
+            else:
+                time.sleep(self.interval)
+            if not self.__running.is_set():
+                break
+            t0 = time.perf_counter()
+            try:
+                frame = self.cam.capture()
+            except RuntimeError:
+                st.errors += 1
+                continue
+            # manual triggers always count as a new physical card
+            fire, fresh = self.gate.feed(frame) if self.gate is not None else (True, True)
+            st.record(time.perf_counter() - t0)
+            if not fire:
+                continue
+            if self.interval is None:
+                # each trigger is a card already pulled off the stack: wait for OCR rather than lose it
+                self.frames.put((frame, fresh))
+                continue
+            try:
+                self.frames.put_nowait((frame, fresh))
+                behind = False
+            except queue.Full:
+                self.dropped += 1   # OCR is behind; the next poll sees the tray again
+                if not behind:      # once per run of drops, not once per poll
+                    print(f"\n[capture] OCR is behind, dropping frames ({self.dropped} so far); "
+                          "leave the card on the tray until it is read")
+                behind = True
+        self.frames.put(self._STOP)
+
+    def __stage(self, name: str, fn, inq: queue.Queue, outq: queue.Queue):
+        st = self.stats[name]
+        while True:
+            item = inq.get()
+            if item is self._STOP:
+                if outq is not None:
+                    outq.put(self._STOP)
+                return
+            t0 = time.perf_counter()
+            try:
+                out = fn(item)
+            except Exception as e:
+                st.errors += 1
+                print(f"\n[{name}] {e}")
+                continue
+            st.record(time.perf_counter() - t0)
+            if out is not None and outq is not None:
+                outq.put(out)
+
+    def __ocr(self, item):
+        frame, fresh = item
+        text, _, _ = self.cam.read_text(frame, self.save_images)
+        return (text, fresh) if text else None
+
+    def __lookup(self, item):
+        text, fresh = item
+        last_text, last_oracle = self.__last_read
+        # same card still on the tray (no empty frame in between): count it once
+        if not fresh and text == last_text:
+            self.duplicates += 1
+            return None
+        c = self.scry.fetch_card_by_name(text)
+        if not fresh and c.getOracleID() == last_oracle:
+            self.duplicates += 1
+            return None
+        self.__last_read = (text, c.getOracleID())
+        return c
+
+    def __persist(self, c: card):
+        self.cat.insert(c)
+        self.jr.append(self.cat, "insert", c)
+        print(f"\n+ {c.getName()}")
+
+    # ---- reporting ----
+    def depths(self) -> dict:
+        return {"frames": self.frames.qsize(), "texts": self.texts.qsize(), "cards": self.cards.qsize()}
+
+    def print_stats(self):
+        print("\n== Pipeline ==")
+        for st in self.stats.values():
+            print(f" {st.name:<8} n={st.count:<5} mean={st.mean() * 1000:7.1f}ms "
+                  f"max={st.max * 1000:7.1f}ms err={st.errors}")
+        print(f" queues   {self.depths()}  dropped frames={self.dropped}  duplicates={self.duplicates}")
+        if self.gate is not None:
+            print(f" gate     checked={self.gate.checked} passed={self.gate.passed}")
+        print("==============\n")
+
 # =========================
 # simple CLI UI (thin)
 # =========================
 
-def addCard(cat: catalog, scry: scryfall):
+def addCard(cat: catalog, scry: scryfall, jr: journal):
     loop = -1
     while(loop != "2"):
         print("\n= Type Card =\n")
@@ -468,12 +1453,13 @@ def addCard(cat: catalog, scry: scryfall):
             )
             print("\nAdding card: " + name + " x" + str(n))
             cat.insert(c)
-            save(cat)
+            jr.append(cat, "insert", c)
 
 
-def userInput(cam, scry, cat):
+def userInput(cam, scry, cat, jr, res):
     running = True
     while(running):
+        res.drain(cat, jr)
         print("\n=== MTG Sorter ===\n")
         print("1) Upload Card")
         print("2) Remove Card")
@@ -493,9 +1479,9 @@ def userInput(cam, scry, cat):
                 os.system('cls' if os.name == 'nt' else 'clear')
                 match(choice):
                     case "1":
-                        cam.camLoop(cat, scry)
+                        cam.camLoop(cat, scry, jr)
                     case "2":
-                        addCard(cat, scry)
+                        addCard(cat, scry, jr)
                     case _:
                         continue
             case "2":
@@ -516,19 +1502,21 @@ def userInput(cam, scry, cat):
                             c = card(c.getName(), c.getSetCode(), c.getCollectNum(), c.getColors(),
                                      c.getMValue(), c.getType(), c.getOracleID(), n)
                             ok = cat.remove(c)
-                            save(cat)
-                            if not ok:
+                            if ok:
+                                jr.append(cat, "remove", c)
+                            else:
                                 print("\nCard not found.")
                         case _:
                             continue
             case "3":
                 loop = -1
-                while loop != "4":
+                while loop != "5":
                     print("\n== Retrieve ==\n")
                     print("1) Enter Card")
                     print("2) Enter Pile")
                     print("3) All Cards")
-                    print("4) Exit")
+                    print("4) Search")
+                    print("5) Exit")
                     print("\n==============\n")
                     loop = input("")
                     os.system('cls' if os.name == 'nt' else 'clear')
@@ -550,6 +1538,15 @@ def userInput(cam, scry, cat):
                                 cat.print_pile(int(pile_in) - 1)
                         case "3":
                             cat.print_all_cards_by_pile()
+                        case "4":
+                            colors = input("\nColors (e.g. U, UR, C; blank = any): ").strip()
+                            types = input("\nType words (e.g. instant, elf): ").replace(",", " ").split()
+                            mvMin = input("\nMin mana value (blank = any): ").strip()
+                            mvMax = input("\nMax mana value (blank = any): ").strip()
+                            setCode = input("\nSet code (blank = any): ").strip()
+                            cat.print_search(colors=colors, types=types, setCode=setCode or None,
+                                             mvMin=int(mvMin) if mvMin else None,
+                                             mvMax=int(mvMax) if mvMax else None)
                         case _:
                             continue
 
@@ -566,7 +1563,12 @@ if __name__ == "__main__":
 
     cam = OCRCamera(0)
     scry = scryfall()
-    cat = load(pileNum=40, vBins=5120)
-
-    userInput(cam, scry, cat)
-    save(cat)
+    jr = journal("catalog.json")
+    cat = load(pileNum=40, vBins=5120, jr=jr, offline=True, backend=colcatalog)
+    res = resolver(scry)
+    res.start(cat.getUnresolved())
+
+    userInput(cam, scry, cat, jr, res)
+    res.drain(cat, jr)
+    jr.compact(cat)
+    jr.close()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# vbins.py — virtual-bin -> pile maps shared by sort.py and magisort_web.py
+#   cards hash to one of N virtual bins and a persisted map sends each bin to a pile,
+#   so changing the pile count only moves the bins that have to move
+import heapq
+from collections import Counter, defaultdict
+
+def default_map(virtual_bins: int, K: int) -> list[int]:
+    """The historical layout: bin v lives on pile v % K."""
+    return [v % K for v in range(virtual_bins)]
+
+def valid_map(pile_map, virtual_bins: int, K: int) -> bool:
+    return (isinstance(pile_map, list) and len(pile_map) == virtual_bins
+            and all(isinstance(p, int) and 0 <= p < K for p in pile_map))
+
+def rebalance_map(old_map: list[int], K: int) -> list[int]:
+    """Map onto K piles that keeps as many bins where they are as possible.
+
+    Every pile ends up with floor or ceil(N / K) bins; only bins on removed piles
+    or above their pile's quota move, so going from K to K + 1 piles moves about
+    N / (K + 1) bins and shrinking moves only the removed piles' bins plus leveling.
+    """
+    n = len(old_map)
+    base, extra = divmod(n, K)
+    held = Counter(p for p in old_map if p < K)
+    # the +1 quotas go to the piles already holding the most bins
+    order = sorted(range(K), key=lambda p: (-held[p], p))
+    quota = {p: base + (1 if i < extra else 0) for i, p in enumerate(order)}
+
+    new = list(old_map)
+    kept = Counter()
+    freed = []
+    for v, p in enumerate(old_map):
+        if p < K and kept[p] < quota[p]:
+            kept[p] += 1
+        else:
+            freed.append(v)
+    needy = (p for p in range(K) for _ in range(quota[p] - kept[p]))
+    for v, p in zip(freed, needy):
+        new[v] = p
+    return new
+
+def moved_bins(old_map: list[int], new_map: list[int]) -> list[int]:
+    return [v for v, (a, b) in enumerate(zip(old_map, new_map)) if a != b]
+
+def group_moves(moves):
+    """[(src, dst, item), ...] -> {src: [(dst, item), ...]} with sources and destinations ascending."""
+    out = defaultdict(list)
+    for src, dst, item in moves:
+        out[src].append((dst, item))
+    return {src: sorted(out[src], key=lambda m: m[0]) for src in sorted(out)}
+
+# -------------------- load-aware (balanced) layout --------------------
+def balance_map(old_map: list[int], K: int, weights: list) -> list[int]:
+    """Map onto K piles that evens out copies; weights[v] is the number of copies in bin v.
+
+    Each surviving pile keeps its bins (heaviest first) up to the mean height;
+    bins on removed piles or past that mark are packed greedily, heaviest first,
+    onto the currently lightest pile. Starting from the existing map means only
+    the excess moves, rather than re-packing everything from scratch.
+    """
+    target = sum(weights) / K
+    new = list(old_map)
+    loads = [0] * K
+    freed = []
+    for v in sorted(range(len(old_map)), key=lambda v: -weights[v]):
+        p = old_map[v]
+        if not weights[v]:
+            if p >= K:
+                new[v] = v % K      # empty: nothing physical moves
+        elif p < K and (loads[p] == 0 or loads[p] + weights[v] <= target):
+            loads[p] += weights[v]
+        else:
+            freed.append(v)
+    heap = [(loads[p], p) for p in range(K)]
+    heapq.heapify(heap)
+    for v in freed:
+        load, p = heapq.heappop(heap)
+        new[v] = p
+        heapq.heappush(heap, (load + weights[v], p))
+    return new
+
+def place_bin(pile_map: list[int], loads: list[int], v: int, bin_empty: bool) -> bool:
+    """Balanced-mode insert: an empty bin is handed to the lightest pile before its
+    first card lands (nothing stored has to move). True if pile_map changed."""
+    if not bin_empty:
+        return False
+    p = min(range(len(loads)), key=loads.__getitem__)
+    if pile_map[v] == p:
+        return False
+    pile_map[v] = p
+    return True
+
+def pile_loads(pile_map: list[int], weights: list, K: int) -> list[int]:
+    loads = [0] * K
+    for v, w in enumerate(weights):
+        if w:
+            loads[pile_map[v]] += w
+    return loads
+
+def height_report(loads: list[int]) -> dict:
+    mean = sum(loads) / len(loads) if loads else 0.0
+    top = max(loads, default=0)
+    return {"max": top, "mean": round(mean, 2), "max_over_mean": round(top / mean, 3) if mean else 0.0}